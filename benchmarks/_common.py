@@ -0,0 +1,143 @@
+"""Shared helpers for the benchmark scripts.
+
+Each script runs against a throwaway Postgres started with testcontainers, exactly as
+the test suite does, unless ``BENCH_DATABASE_URL`` points at an existing database.
+That database is dropped and recreated, so never point it at real data.
+"""
+
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Callable, Generator, Sequence
+
+import sqlalchemy
+from sqlalchemy import Connection, insert
+from testcontainers.postgres import PostgresContainer
+
+from open_cec_api.services.database.models import (
+    Base,
+    Certificate,
+    DeviceClass,
+    DeviceClassAttribute,
+    EntityType,
+    Listing,
+    ListingDeviceClass,
+    ListingDeviceClassAttribute,
+)
+
+DEVICE_CLASSES = 5
+
+
+@contextmanager
+def bench_engine() -> Generator[sqlalchemy.Engine, None, None]:
+    url = os.environ.get("BENCH_DATABASE_URL")
+    if url:
+        engine = sqlalchemy.create_engine(url)
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        yield engine
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+        return
+
+    with PostgresContainer("postgres:16") as postgres:
+        engine = sqlalchemy.create_engine(postgres.get_connection_url())
+        Base.metadata.create_all(bind=engine)
+        yield engine
+        engine.dispose()
+
+
+def seed_reference_data(conn: Connection) -> None:
+    """One entity type and DEVICE_CLASSES device classes with two attributes each."""
+    conn.execute(insert(EntityType), [{"name": "client", "description": ""}])
+    conn.execute(
+        insert(DeviceClass),
+        [{"name": f"class {i}", "description": ""} for i in range(DEVICE_CLASSES)],
+    )
+    conn.execute(
+        insert(DeviceClassAttribute),
+        [
+            {
+                "device_class_id": dc + 1,
+                "attribute_name": f"attr {a}",
+                "attribute_type": "string",
+            }
+            for dc in range(DEVICE_CLASSES)
+            for a in range(2)
+        ],
+    )
+
+
+def seed_listings(conn: Connection, start: int, stop: int) -> None:
+    """Listings start..stop, each with a device class, attributes and certificates."""
+    listing_ids = conn.scalars(
+        insert(Listing).returning(Listing.id),
+        [
+            {"entity_type_id": 1, "manufacturer": f"m{i}", "model": f"x{i}"}
+            for i in range(start, stop)
+        ],
+    ).all()
+    device_class = {lid: lid % DEVICE_CLASSES + 1 for lid in listing_ids}
+    conn.execute(
+        insert(ListingDeviceClass),
+        [
+            {"listing_id": lid, "device_class_id": dc}
+            for lid, dc in device_class.items()
+        ],
+    )
+    conn.execute(
+        insert(ListingDeviceClassAttribute),
+        [
+            {
+                "listing_id": lid,
+                "device_class_id": dc,
+                "attribute_name": f"attr {a}",
+                "attribute_value": str(a),
+            }
+            for lid, dc in device_class.items()
+            for a in range(2)
+        ],
+    )
+    conn.execute(
+        insert(Certificate),
+        [
+            {
+                "listing_id": lid,
+                "expiry": "2030-01-01",
+                "certification_date": "2024-01-01",
+                "certifying_body": "dummy certifier",
+                "test_profiles": ["AS4777"],
+            }
+            for lid in listing_ids
+            for _ in range(2)
+        ],
+    )
+
+
+def time_calls(fn: Callable[[], object], repeat: int) -> dict[str, float]:
+    """Call ``fn`` ``repeat`` times and return latency percentiles in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+def print_table(headers: Sequence[str], rows: list[Sequence[object]]) -> None:
+    widths = [
+        max(len(str(h)), *(len(_fmt(r[i])) for r in rows))
+        for i, h in enumerate(headers)
+    ]
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for r in rows:
+        print("  ".join(_fmt(v).rjust(w) for v, w in zip(r, widths)))
+
+
+def _fmt(value: object) -> str:
+    return f"{value:.3f}" if isinstance(value, float) else str(value)
@@ -0,0 +1,60 @@
+"""Auth latency as the number of stored API keys grows.
+
+Compares ``check_key_header`` with an empty key cache (a fingerprint index probe and
+one des_crypt verification) against a warm cache. Both columns should stay flat from
+1 to 10,000 keys.
+
+    python -m benchmarks.auth_cache
+"""
+
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks._common import bench_engine, print_table, time_calls
+from open_cec_api.api.auth import (
+    check_key_header,
+    get_key_fingerprint,
+    get_key_hash,
+    key_cache,
+)
+from open_cec_api.services.database.models import Key
+
+KEY_COUNTS = [1, 10, 100, 1_000, 10_000]
+
+
+def main() -> None:
+    rows = []
+    with bench_engine() as engine:
+        session_maker = sessionmaker(bind=engine, expire_on_commit=False)
+        stored = 0
+        for count in KEY_COUNTS:
+            with session_maker() as session:
+                session.add_all(
+                    Key(
+                        value=get_key_hash(f"key-{i}"),
+                        fingerprint=get_key_fingerprint(f"key-{i}"),
+                        description="bench",
+                    )
+                    for i in range(stored, count)
+                )
+                session.commit()
+            stored = count
+
+            presented = f"key-{count - 1}"
+
+            def authenticate() -> None:
+                check_key_header(session_maker(), presented)
+
+            def authenticate_cold() -> None:
+                key_cache.clear()
+                authenticate()
+
+            cold = time_calls(authenticate_cold, repeat=100)
+            authenticate()
+            warm = time_calls(authenticate, repeat=1_000)
+            rows.append((count, cold["p50"], warm["p50"], warm["p99"]))
+
+    print_table(["keys", "cold p50 ms", "cached p50 ms", "cached p99 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Autocomplete: in-memory prefix completion against the equivalent database query.
+
+Seeds LISTINGS listings with manufacturers and models from the search benchmark's
+vocabulary, loads them into ``ListingCompletions`` as the API does at startup, then
+times completions of each prefix from memory and with ``ILIKE`` on the trigram
+indexed columns. Also reports the cost of the full load and of patching the index
+for a single write.
+
+    python -m benchmarks.autocomplete
+"""
+
+import random
+import time
+from typing import NamedTuple
+
+from sqlalchemy import Engine, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from benchmarks._common import bench_engine, print_table, time_calls
+from benchmarks.search import MANUFACTURERS, SERIES
+from open_cec_api.api.autocomplete import (
+    DEFAULT_COMPLETIONS,
+    ListingCompletions,
+    listing_completions,
+    load_listing_completions,
+)
+from open_cec_api.services.database.models import EntityType, Listing
+
+LISTINGS = 100_000
+REPEAT = 1000
+
+
+PREFIXES = {
+    "manufacturer": ["v", "volt", "terraw"],
+    "model": ["p", "home", "infinity 99"],
+}
+
+
+class Row(NamedTuple):
+    id: int
+    manufacturer: str
+    model: str
+
+
+def seed_listings(engine: Engine, count: int) -> None:
+    rng = random.Random(0)
+    with engine.begin() as conn:
+        conn.execute(insert(EntityType), [{"name": "client", "description": ""}])
+        conn.execute(
+            insert(Listing),
+            [
+                {
+                    "entity_type_id": 1,
+                    "manufacturer": rng.choice(MANUFACTURERS),
+                    "model": f"{rng.choice(SERIES)} {i} {rng.randint(3, 30)}kW",
+                }
+                for i in range(count)
+            ],
+        )
+
+
+def complete_in_database(session: Session, field: str, prefix: str) -> list[str]:
+    """The query autocomplete would need without the index: a word prefix match."""
+    column = getattr(Listing, field)
+    words = or_(column.ilike(f"{prefix}%"), column.ilike(f"% {prefix}%"))
+    return list(
+        session.scalars(
+            select(column)
+            .where(words)
+            .group_by(column)
+            .order_by(func.lower(column))
+            .limit(DEFAULT_COMPLETIONS)
+        )
+    )
+
+
+def main() -> None:
+    with bench_engine() as engine:
+        seed_listings(engine, LISTINGS)
+        with Session(engine) as session:
+            start = time.perf_counter()
+            load_listing_completions(session)
+            load_ms = (time.perf_counter() - start) * 1000
+
+            rows: list[tuple[object, ...]] = []
+            for field, prefixes in PREFIXES.items():
+                for prefix in prefixes:
+                    memory = time_calls(
+                        lambda: listing_completions.complete(
+                            field,  # type: ignore[arg-type]
+                            prefix,
+                            DEFAULT_COMPLETIONS,
+                        ),
+                        REPEAT,
+                    )
+                    database = time_calls(
+                        lambda: complete_in_database(session, field, prefix),
+                        REPEAT // 10,
+                    )
+                    rows.append(
+                        (
+                            f"{field} {prefix!r}",
+                            round(memory["p50"] * 1000, 1),
+                            round(memory["p99"] * 1000, 1),
+                            database["p50"],
+                            database["p99"],
+                        )
+                    )
+
+    completions = ListingCompletions()
+    completions.load(
+        Row(i, MANUFACTURERS[i % len(MANUFACTURERS)], f"Model {i}")
+        for i in range(LISTINGS)
+    )
+    write = time_calls(lambda: completions.put([Row(1, "Newco", "Fresh 1")]), REPEAT)
+
+    print_table(
+        ["prefix", "memory p50 us", "memory p99 us", "db p50 ms", "db p99 ms"], rows
+    )
+    print(f"\nloading {LISTINGS} listings took {load_ms:.0f} ms")
+    print(f"patching the index for one write: p50 {write['p50'] * 1000:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
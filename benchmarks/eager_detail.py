@@ -0,0 +1,74 @@
+"""Eager listing detail query as the listings table grows.
+
+Times ``eager_get_listings(session, id=...)`` (a listing with its entity type, device
+classes and their attribute definitions, attribute values and certificates) for
+random ids at each table size, first with the foreign-key indexes and then with them
+dropped. With the indexes every child lookup is an index probe and latency stays flat;
+without them the certificate selectinload scans the whole table.
+
+    python -m benchmarks.eager_detail
+"""
+
+import random
+
+from sqlalchemy import Engine, Index, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks._common import (
+    bench_engine,
+    print_table,
+    seed_listings,
+    seed_reference_data,
+    time_calls,
+)
+from open_cec_api.api.crud.extended import eager_get_listings
+from open_cec_api.services.database.models import Listing
+
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = 200
+
+# single-column indexes on foreign keys (composite unique constraints are kept)
+FK_INDEXES: list[Index] = [
+    index
+    for table in Listing.metadata.sorted_tables
+    for index in table.indexes
+    if len(index.columns) == 1 and next(iter(index.columns)).foreign_keys
+]
+
+
+def time_detail(engine: Engine, size: int) -> float:
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+    session_maker = sessionmaker(bind=engine)
+    with session_maker() as session:
+        return time_calls(
+            lambda: eager_get_listings(session, id=random.randint(1, size)), REPEAT
+        )["p50"]
+
+
+def main() -> None:
+    rows = []
+    with bench_engine() as engine:
+        with engine.begin() as conn:
+            seed_reference_data(conn)
+
+        seeded = 0
+        for size in SIZES:
+            with engine.begin() as conn:
+                seed_listings(conn, seeded, size)
+            seeded = size
+
+            indexed = time_detail(engine, size)
+            for index in FK_INDEXES:
+                index.drop(bind=engine)
+            unindexed = time_detail(engine, size)
+            for index in FK_INDEXES:
+                index.create(bind=engine)
+
+            rows.append((size, indexed, unindexed))
+
+    print_table(["listings", "indexed p50 ms", "unindexed p50 ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
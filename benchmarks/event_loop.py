@@ -0,0 +1,88 @@
+"""Event-loop lag while admin list queries run concurrently.
+
+Runs the same slow ``ListingCRUD`` filter (an unindexed ILIKE scan that matches few
+rows) from coroutines, first through the sync ``get`` (how the admin routes used to
+call it) and then through the awaited ``aget``. A ticker coroutine records how late
+the loop wakes it; with the sync path every query stalls the loop while Postgres works.
+
+    python -m benchmarks.event_loop
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from sqlalchemy import Engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks._common import bench_engine, print_table
+from open_cec_api.api.crud.crud import ListingCRUD
+from open_cec_api.services.database.models import EntityType, Listing
+
+LISTINGS = 200_000
+FILTER = {"manufacturer": "m19999"}
+CONCURRENCY = 20
+
+
+async def measure(query: Callable[[], Awaitable[object]]) -> tuple[float, float]:
+    """Return (max loop lag ms, wall time s) for CONCURRENCY concurrent queries."""
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(query() for _ in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await task
+    return max(lags) * 1000, elapsed
+
+
+async def run(engine: Engine) -> list[tuple[object, ...]]:
+    session_maker = sessionmaker(bind=engine)
+    async_engine = create_async_engine(
+        engine.url.set(drivername="postgresql+asyncpg"), pool_size=CONCURRENCY
+    )
+    async_session_maker = async_sessionmaker(bind=async_engine)
+
+    async def blocking() -> None:
+        with session_maker() as session:
+            ListingCRUD.get(session, **FILTER)
+
+    async def awaited() -> None:
+        async with async_session_maker() as session:
+            await ListingCRUD.aget(session, **FILTER)
+
+    rows = []
+    for name, query in [("sync get", blocking), ("async aget", awaited)]:
+        lag, elapsed = await measure(query)
+        rows.append((name, lag, elapsed))
+    await async_engine.dispose()
+    return rows
+
+
+def main() -> None:
+    with bench_engine() as engine:
+        with engine.begin() as conn:
+            conn.execute(insert(EntityType), [{"name": "client", "description": ""}])
+            conn.execute(
+                insert(Listing),
+                [
+                    {"entity_type_id": 1, "manufacturer": f"m{i}", "model": f"x{i}"}
+                    for i in range(LISTINGS)
+                ],
+            )
+        rows = asyncio.run(run(engine))
+
+    print_table(["path", "max loop lag ms", "wall s"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Registry export: peak Python memory of one big page vs the streamed NDJSON export.
+
+For each registry size, builds the body of every listing's detail document first as a
+single ``get_listing_details_json`` page, held in memory whole, and then by draining
+``iter_listing_detail_lines`` through ``gzip_chunks``, which is what
+``/listings/export`` streams. Peak allocations are measured with tracemalloc.
+
+    python -m benchmarks.export
+"""
+
+import time
+import tracemalloc
+from typing import Callable
+
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks._common import (
+    bench_engine,
+    print_table,
+    seed_listings,
+    seed_reference_data,
+)
+from open_cec_api.api.crud.extended import (
+    get_listing_details_json,
+    iter_listing_detail_lines,
+)
+from open_cec_api.api.streaming import gzip_chunks
+
+SIZES = (1_000, 10_000, 100_000)
+MB = 1024 * 1024
+
+
+def peak_memory(fn: Callable[[], object]) -> tuple[float, float]:
+    """Peak traced memory in MB and wall time in ms of one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / MB, elapsed
+
+
+def measure(engine: Engine, size: int) -> tuple[object, ...]:
+    session_maker = sessionmaker(bind=engine)
+
+    def single_page() -> None:
+        with session_maker() as session:
+            get_listing_details_json(session, limit=size).documents.encode()
+
+    def export() -> None:
+        with session_maker() as session:
+            for _ in gzip_chunks(iter_listing_detail_lines(session)):
+                pass
+
+    page_mb, page_ms = peak_memory(single_page)
+    export_mb, export_ms = peak_memory(export)
+    return size, page_mb, page_ms, export_mb, export_ms
+
+
+def main() -> None:
+    rows = []
+    with bench_engine() as engine:
+        with engine.begin() as conn:
+            seed_reference_data(conn)
+
+        seeded = 0
+        for size in SIZES:
+            with engine.begin() as conn:
+                seed_listings(conn, seeded, size)
+                conn.execute(text("ANALYZE"))
+            seeded = size
+            rows.append(measure(engine, size))
+
+    print_table(
+        ["listings", "page peak MB", "page ms", "export peak MB", "export ms"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""List responses: response_model validation vs Core rows encoded with orjson.
+
+Builds the ``/listings`` body for one page at each page size, first as FastAPI did
+before (load ORM objects, validate them into ``ListingBase`` and render with
+``JSONResponse``) and then through the fast path (``ListingCRUD.get_rows`` plus
+``encode_rows``). Both include the query, and the bodies are checked to be identical.
+
+    python -m benchmarks.list_serialization
+"""
+
+from typing import Union
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks._common import (
+    bench_engine,
+    print_table,
+    seed_listings,
+    seed_reference_data,
+    time_calls,
+)
+from open_cec_api.api.crud.crud import ListingCRUD
+from open_cec_api.api.fast_json import encode_rows
+from open_cec_api.api.pagination import MAX_PAGE_SIZE
+from open_cec_api.api.schema.read import ListingBase
+
+LISTINGS = 10_000
+PAGE_SIZES = (10, 100, MAX_PAGE_SIZE)
+REPEAT = 50
+
+# what FastAPI builds for response_model=Union[ListingBase, list[ListingBase]]
+RESPONSE_ADAPTER = TypeAdapter(Union[ListingBase, list[ListingBase]])
+
+
+def measure(engine: Engine, page_size: int) -> tuple[object, ...]:
+    session_maker = sessionmaker(bind=engine)
+
+    def response_model() -> bytes:
+        with session_maker() as session:
+            rows = ListingCRUD.get(session, limit=page_size)
+            value = RESPONSE_ADAPTER.validate_python(rows, from_attributes=True)
+            return JSONResponse(RESPONSE_ADAPTER.dump_python(value, mode="json")).body
+
+    def fast_json() -> bytes:
+        with session_maker() as session:
+            return encode_rows(
+                ListingCRUD.get_rows(session, ListingBase, limit=page_size)
+            )
+
+    assert response_model() == fast_json()
+    response_model_ms = time_calls(response_model, REPEAT)["p50"]
+    fast_json_ms = time_calls(fast_json, REPEAT)["p50"]
+    return page_size, response_model_ms, fast_json_ms, response_model_ms / fast_json_ms
+
+
+def main() -> None:
+    with bench_engine() as engine:
+        with engine.begin() as conn:
+            seed_reference_data(conn)
+            seed_listings(conn, 0, LISTINGS)
+            conn.execute(text("ANALYZE"))
+
+        rows = [measure(engine, page_size) for page_size in PAGE_SIZES]
+
+    print_table(["page size", "response_model ms", "orjson ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Listing detail documents: eager ORM loading vs a single json_agg query.
+
+Builds the JSON body for every listing at each table size, first the old way
+(``eager_get_listings`` plus ``listing_to_detail_dict`` and ``json.dumps``) and then
+with ``get_listing_details_json``, where Postgres builds the documents in one
+statement and the service only passes the text through.
+
+    python -m benchmarks.listing_detail
+"""
+
+import json
+
+from sqlalchemy import Engine, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks._common import (
+    bench_engine,
+    print_table,
+    seed_listings,
+    seed_reference_data,
+    time_calls,
+)
+from open_cec_api.api.crud.extended import (
+    eager_get_listings,
+    get_listing_details_json,
+    listing_to_detail_dict,
+)
+
+SIZES = (1_000, 10_000, 100_000)
+REPEAT = {1_000: 10, 10_000: 3, 100_000: 1}
+
+
+def measure(engine: Engine, size: int) -> tuple[object, ...]:
+    session_maker = sessionmaker(bind=engine)
+
+    def eager() -> bytes:
+        with session_maker() as session:
+            listings: list = eager_get_listings(session)  # type: ignore[assignment]
+            documents = [listing_to_detail_dict(x) for x in listings]
+            return json.dumps(documents).encode()
+
+    def json_agg() -> bytes:
+        with session_maker() as session:
+            return get_listing_details_json(session, limit=size).documents.encode()
+
+    eager_ms = time_calls(eager, REPEAT[size])["p50"]
+    json_agg_ms = time_calls(json_agg, REPEAT[size])["p50"]
+    return size, eager_ms, json_agg_ms, eager_ms / json_agg_ms
+
+
+def main() -> None:
+    rows = []
+    with bench_engine() as engine:
+        with engine.begin() as conn:
+            seed_reference_data(conn)
+
+        seeded = 0
+        for size in SIZES:
+            with engine.begin() as conn:
+                seed_listings(conn, seeded, size)
+                conn.execute(text("ANALYZE"))
+            seeded = size
+            rows.append(measure(engine, size))
+
+    print_table(["listings", "eager ms", "json_agg ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Listing search: latency of ranked full-text queries against the p99 target.
+
+Seeds LISTINGS listings whose manufacturers, models, device classes and attribute
+values are drawn from a small product vocabulary, so queries range from a handful of
+hits to a large share of the registry. Each query fetches the first page, as
+``/listings/search`` does. The queries are then run round robin, and the p99 of that
+mix is checked against P99_TARGET_MS.
+
+    python -m benchmarks.search
+"""
+
+import itertools
+import random
+
+from sqlalchemy import Connection, Engine, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks._common import bench_engine, print_table, time_calls
+from open_cec_api.api.crud.search import search_listings
+from open_cec_api.api.pagination import DEFAULT_PAGE_SIZE
+from open_cec_api.services.database.models import (
+    DeviceClass,
+    EntityType,
+    Listing,
+    ListingDeviceClass,
+    ListingDeviceClassAttribute,
+)
+
+LISTINGS = 100_000
+REPEAT = 100
+P99_TARGET_MS = 100.0
+
+MANUFACTURERS = [
+    f"{prefix}{suffix}"
+    for prefix in ("Sol", "Volt", "Grid", "Amp", "Lumen", "Terra")
+    for suffix in ("ax", "ora", "tek", "wave", "core", "ion", "max")
+]
+SERIES = ("PowerStore", "HomeCell", "FlexHub", "EnergyWall", "SunBox", "Infinity")
+DEVICE_CLASSES = (
+    "battery",
+    "hybrid inverter",
+    "grid inverter",
+    "ev charger",
+    "heat pump",
+)
+CHEMISTRIES = ("LiFePO4", "NMC", "LTO", "sodium ion")
+PHASES = ("single phase", "three phase")
+
+QUERIES = {
+    "model number": "12345",
+    "manufacturer": "Voltwave",
+    "three words": "LiFePO4 5kW hybrid",
+    "phrase": '"three phase" charger',
+    "common word": "inverter",
+    "exclusion": "battery -NMC",
+}
+
+
+def seed_searchable_listings(conn: Connection, count: int) -> None:
+    rng = random.Random(0)
+    conn.execute(insert(EntityType), [{"name": "client", "description": ""}])
+    class_ids = conn.scalars(
+        insert(DeviceClass).returning(DeviceClass.id),
+        [{"name": name, "description": ""} for name in DEVICE_CLASSES],
+    ).all()
+
+    batch = 10_000
+    for start in range(0, count, batch):
+        listing_ids = conn.scalars(
+            insert(Listing).returning(Listing.id),
+            [
+                {
+                    "entity_type_id": 1,
+                    "manufacturer": rng.choice(MANUFACTURERS),
+                    "model": f"{rng.choice(SERIES)} {i} {rng.randint(3, 30)}kW",
+                }
+                for i in range(start, min(start + batch, count))
+            ],
+        ).all()
+        classes = {lid: rng.sample(class_ids, rng.randint(1, 2)) for lid in listing_ids}
+        conn.execute(
+            insert(ListingDeviceClass),
+            [
+                {"listing_id": lid, "device_class_id": dc}
+                for lid, dcs in classes.items()
+                for dc in dcs
+            ],
+        )
+        conn.execute(
+            insert(ListingDeviceClassAttribute),
+            [
+                {
+                    "listing_id": lid,
+                    "device_class_id": dcs[0],
+                    "attribute_name": name,
+                    "attribute_value": value,
+                }
+                for lid, dcs in classes.items()
+                for name, value in (
+                    ("chemistry", rng.choice(CHEMISTRIES)),
+                    ("phases", rng.choice(PHASES)),
+                    ("capacity", f"{rng.randint(5, 40)} kWh"),
+                )
+            ],
+        )
+
+
+def count_hits(engine: Engine, q: str) -> int:
+    with engine.connect() as conn:
+        return conn.scalar(
+            text(
+                "SELECT count(*) FROM listing_search_documents "
+                "WHERE document @@ websearch_to_tsquery('english', :q)"
+            ),
+            {"q": q},
+        )
+
+
+def measure(engine: Engine, queries: list[str]) -> dict[str, float]:
+    """Latency percentiles of first page searches, cycling through the queries."""
+    session_maker = sessionmaker(bind=engine)
+    cycle = itertools.cycle(queries)
+
+    def search() -> None:
+        with session_maker() as session:
+            search_listings(session, next(cycle), limit=DEFAULT_PAGE_SIZE + 1)
+
+    return time_calls(search, REPEAT * len(queries))
+
+
+def main() -> None:
+    with bench_engine() as engine:
+        with engine.begin() as conn:
+            seed_searchable_listings(conn, LISTINGS)
+        # clear the dead versions left by refreshing each document per insert
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM ANALYZE"))
+
+        rows: list[tuple[object, ...]] = []
+        for label, q in QUERIES.items():
+            timings = measure(engine, [q])
+            rows.append((label, count_hits(engine, q), timings["p50"], timings["p99"]))
+        mix = measure(engine, list(QUERIES.values()))
+        rows.append(("mix", "", mix["p50"], mix["p99"]))
+
+    print_table(["query", "hits", "p50 ms", "p99 ms"], rows)
+    verdict = "within" if mix["p99"] <= P99_TARGET_MS else "OVER"
+    print(f"\nmix p99 {mix['p99']:.1f} ms, {verdict} the {P99_TARGET_MS:.0f} ms target")
+
+
+if __name__ == "__main__":
+    main()
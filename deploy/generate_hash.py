@@ -1,8 +1,23 @@
+import hashlib
+import hmac
+import os
 import sys
 
 from passlib.context import CryptContext
 
 key = sys.argv[1]
+# must match the API's OPEN_CEC_API_KEY_FINGERPRINT_SECRET
+secret = sys.argv[2] if len(sys.argv) > 2 else ""
+secret = secret or os.environ.get("OPEN_CEC_API_KEY_FINGERPRINT_SECRET", "")
+if not secret:
+    sys.exit(
+        "Pass the fingerprint secret as the second argument or set "
+        "OPEN_CEC_API_KEY_FINGERPRINT_SECRET"
+    )
+
 pwd_context = CryptContext(schemes=["des_crypt"], deprecated="auto")
 print("Input: ", key)
 print("Hashed Key: ", pwd_context.hash(key))
+print(
+    "Fingerprint: ", hmac.new(secret.encode(), key.encode(), hashlib.sha256).hexdigest()
+)
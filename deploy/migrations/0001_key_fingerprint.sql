@@ -0,0 +1,12 @@
+-- Adds the API key fingerprint column and its unique index.
+--
+-- Existing keys keep working without a fingerprint: check_key_header finds them by a
+-- scan of the keys that lack one and backfills the fingerprint on first use.
+-- Safe to run more than once.
+
+BEGIN;
+
+ALTER TABLE keys ADD COLUMN IF NOT EXISTS fingerprint VARCHAR(64);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_keys_fingerprint ON keys (fingerprint);
+
+COMMIT;
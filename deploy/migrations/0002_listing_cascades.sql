@@ -0,0 +1,48 @@
+-- Makes deleting a listing delete its certificates, device class links and attribute
+-- values, as DELETE /admin/listings/{id} expects.
+--
+-- The listing_id key of each of those tables is dropped and added again with ON DELETE
+-- CASCADE. It is added NOT VALID, which holds its lock only briefly, and then validated
+-- in a second transaction that does not block writes. Keys that already cascade are
+-- left alone. Safe to run more than once.
+
+BEGIN;
+
+DO $$
+DECLARE
+    t text;
+    key name;
+    action "char";
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'certificates', 'listing_device_classes', 'listing_device_class_attributes'
+    ] LOOP
+        SELECT c.conname, c.confdeltype INTO key, action
+        FROM pg_constraint c
+        JOIN pg_attribute a
+            ON a.attrelid = c.conrelid AND a.attnum = ANY (c.conkey)
+        WHERE c.contype = 'f'
+            AND c.conrelid = t::regclass
+            AND c.confrelid = 'listings'::regclass
+            AND c.conkey = ARRAY[a.attnum]
+            AND a.attname = 'listing_id';
+        CONTINUE WHEN action = 'c';
+        IF key IS NOT NULL THEN
+            EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', t, key);
+        END IF;
+        EXECUTE format(
+            'ALTER TABLE %I ADD CONSTRAINT %I FOREIGN KEY (listing_id) '
+            'REFERENCES listings (id) ON DELETE CASCADE NOT VALID',
+            t, t || '_listing_id_fkey'
+        );
+    END LOOP;
+END
+$$;
+
+COMMIT;
+
+ALTER TABLE certificates VALIDATE CONSTRAINT certificates_listing_id_fkey;
+ALTER TABLE listing_device_classes
+    VALIDATE CONSTRAINT listing_device_classes_listing_id_fkey;
+ALTER TABLE listing_device_class_attributes
+    VALIDATE CONSTRAINT listing_device_class_attributes_listing_id_fkey;
@@ -0,0 +1,27 @@
+-- Adds the pg_trgm GIN indexes behind the case-insensitive substring filters (ILIKE
+-- '%term%') on descriptions, manufacturers, models, certifying bodies and attribute
+-- values.
+--
+-- Creating the extension needs a role allowed to (on managed Postgres, usually the
+-- database owner). The indexes are built CONCURRENTLY, so writes carry on meanwhile;
+-- this runs outside a transaction, one index at a time. If a build fails, drop the
+-- invalid index it leaves and run the script again. Safe to run more than once.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_keys_description_trgm
+    ON keys USING gin (description gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_entity_types_description_trgm
+    ON entity_types USING gin (description gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_device_classes_description_trgm
+    ON device_classes USING gin (description gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_device_class_attributes_description_trgm
+    ON device_class_attributes USING gin (description gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_manufacturer_trgm
+    ON listings USING gin (manufacturer gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_model_trgm
+    ON listings USING gin (model gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_certificates_certifying_body_trgm
+    ON certificates USING gin (certifying_body gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listing_device_class_attributes_attribute_value_trgm
+    ON listing_device_class_attributes USING gin (attribute_value gin_trgm_ops);
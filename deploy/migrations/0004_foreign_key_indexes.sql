@@ -0,0 +1,18 @@
+-- Adds indexes on the foreign keys the listing filters and joins follow, and a
+-- partial index on active listing ids, which most reads page through.
+--
+-- The indexes are built CONCURRENTLY, so writes carry on meanwhile; this runs outside
+-- a transaction, one index at a time. If a build fails, drop the invalid index it
+-- leaves and run the script again. Safe to run more than once.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_entity_type_id
+    ON listings (entity_type_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_certificates_listing_id
+    ON certificates (listing_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listing_device_classes_device_class_id
+    ON listing_device_classes (device_class_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS
+    ix_listing_device_class_attributes_device_class_id
+    ON listing_device_class_attributes (device_class_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_active_id
+    ON listings (id) WHERE status = 'active';
@@ -0,0 +1,9 @@
+-- Adds the GIN index behind the test_profiles filters, which match certificates whose
+-- test_profiles contain all (@>) or any (&&) of the given profiles.
+--
+-- The index is built CONCURRENTLY, so writes carry on meanwhile; this runs outside a
+-- transaction. If the build fails, drop the invalid index it leaves and run the script
+-- again. Safe to run more than once.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_certificates_test_profiles
+    ON certificates USING gin (test_profiles);
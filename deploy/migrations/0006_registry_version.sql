@@ -0,0 +1,18 @@
+-- Adds the registry version, the counter behind the ETag and Last-Modified headers of
+-- /listings, /listings/detail and /listings/search, with its single row.
+--
+-- The registry table triggers that 0007_change_log.sql attaches bump the version on
+-- every write; until they exist it stays at 1. Safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS registry_version (
+    id SERIAL NOT NULL,
+    version BIGINT NOT NULL,
+    modified_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+    PRIMARY KEY (id)
+);
+
+INSERT INTO registry_version (id, version) VALUES (1, 1) ON CONFLICT (id) DO NOTHING;
+
+COMMIT;
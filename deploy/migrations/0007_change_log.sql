@@ -0,0 +1,100 @@
+-- Adds the change log served at /changes and the triggers that record every write to
+-- the registry tables in it and bump the registry version (0006_registry_version.sql).
+--
+-- The log starts empty: a mirror of an upgraded database first reads the registry in
+-- full, then follows /changes from the latest change id. Needs PostgreSQL 14 or later
+-- for CREATE OR REPLACE TRIGGER. Safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS changes (
+    id BIGSERIAL NOT NULL,
+    table_name VARCHAR(63) NOT NULL,
+    row_id INTEGER,
+    operation VARCHAR(8) NOT NULL,
+    data JSONB,
+    changed_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL,
+    PRIMARY KEY (id)
+);
+
+CREATE OR REPLACE FUNCTION record_registry_changes() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    recorded bigint;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        IF NOT EXISTS (SELECT 1 FROM old_rows) THEN
+            RETURN NULL;
+        END IF;
+    ELSIF TG_OP <> 'TRUNCATE' THEN
+        IF NOT EXISTS (SELECT 1 FROM new_rows) THEN
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    UPDATE registry_version
+    SET version = version + 1, modified_at = now()
+    WHERE id = 1;
+
+    IF TG_OP = 'TRUNCATE' THEN
+        INSERT INTO changes (table_name, operation)
+        VALUES (TG_TABLE_NAME, 'truncate');
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO changes (table_name, row_id, operation)
+        SELECT TG_TABLE_NAME, id, 'delete' FROM old_rows ORDER BY id;
+    ELSE
+        INSERT INTO changes (table_name, row_id, operation, data)
+        SELECT TG_TABLE_NAME, id, lower(TG_OP), to_jsonb(new_rows)
+        FROM new_rows ORDER BY id;
+    END IF;
+
+    GET DIAGNOSTICS recorded = ROW_COUNT;
+    IF recorded > 0 THEN
+        PERFORM pg_notify('registry_changes', '');
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+-- transition tables need a trigger per event
+DO $$
+DECLARE
+    registry_table text;
+BEGIN
+    FOREACH registry_table IN ARRAY ARRAY[
+        'entity_types',
+        'device_classes',
+        'device_class_attributes',
+        'listings',
+        'listing_device_classes',
+        'listing_device_class_attributes',
+        'certificates'
+    ] LOOP
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER record_registry_inserts AFTER INSERT ON %I '
+            'REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION record_registry_changes()',
+            registry_table
+        );
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER record_registry_updates AFTER UPDATE ON %I '
+            'REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION record_registry_changes()',
+            registry_table
+        );
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER record_registry_deletes AFTER DELETE ON %I '
+            'REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION record_registry_changes()',
+            registry_table
+        );
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER record_registry_truncates AFTER TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION record_registry_changes()',
+            registry_table
+        );
+    END LOOP;
+END
+$$;
+
+COMMIT;
@@ -0,0 +1,122 @@
+-- Adds the typed copies of listing attribute values (number_min, number_max,
+-- boolean_value and text_value), the triggers that maintain them from the attribute
+-- definitions, and the partial indexes the attr.<name> filters use.
+--
+-- Existing values are typed by rewriting each in place, which fires the new trigger.
+-- That rewrite is a registry write like any other, so the change log records every
+-- attribute value once more, now with its typed columns. The indexes are then built
+-- without blocking writes; if a build fails, drop the invalid index it leaves and run
+-- the script again. Needs PostgreSQL 14 or later. Safe to run more than once.
+
+BEGIN;
+
+ALTER TABLE listing_device_class_attributes
+    ADD COLUMN IF NOT EXISTS number_min DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS number_max DOUBLE PRECISION,
+    ADD COLUMN IF NOT EXISTS boolean_value BOOLEAN,
+    ADD COLUMN IF NOT EXISTS text_value VARCHAR(255);
+
+CREATE OR REPLACE FUNCTION type_attribute_value() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    declared text;
+    normalized text := lower(btrim(NEW.attribute_value));
+    bounds text[];
+BEGIN
+    SELECT attribute_type INTO declared
+    FROM device_class_attributes
+    WHERE device_class_id = NEW.device_class_id
+    AND attribute_name = NEW.attribute_name;
+
+    NEW.number_min := NULL;
+    NEW.number_max := NULL;
+    NEW.boolean_value := NULL;
+    NEW.text_value := NULL;
+
+    IF declared = 'number' THEN
+        -- drop thousands separators, then read one number or a range
+        bounds := regexp_match(
+            regexp_replace(
+                normalized, '([0-9]),(?=[0-9]{3}([^0-9]|$))', '\1', 'g'
+            ),
+            '^([+-]?[0-9]{0,30}\.?[0-9]{1,30})\s*[^0-9\s+-]*\s*(?:(?:-|\u2013|~|to)\s*([+-]?[0-9]{0,30}\.?[0-9]{1,30})\s*)?[^0-9]*$'
+        );
+        IF bounds IS NOT NULL THEN
+            NEW.number_min := least(
+                bounds[1]::double precision,
+                coalesce(bounds[2], bounds[1])::double precision
+            );
+            NEW.number_max := greatest(
+                bounds[1]::double precision,
+                coalesce(bounds[2], bounds[1])::double precision
+            );
+        END IF;
+    ELSIF declared = 'boolean' THEN
+        NEW.boolean_value := CASE
+            WHEN normalized IN ('true', 'yes', 'y', 'on', '1') THEN true
+            WHEN normalized IN ('false', 'no', 'n', 'off', '0') THEN false
+        END;
+    ELSIF declared IN ('string', 'enum') AND length(normalized) <= 255 THEN
+        NEW.text_value := normalized;
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+CREATE OR REPLACE TRIGGER type_attribute_value
+    BEFORE INSERT OR UPDATE OF device_class_id, attribute_name, attribute_value
+    ON listing_device_class_attributes
+    FOR EACH ROW EXECUTE FUNCTION type_attribute_value();
+
+CREATE OR REPLACE FUNCTION retype_attribute_values() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE listing_device_class_attributes
+        SET attribute_value = attribute_value
+        WHERE number_min IS NOT NULL OR boolean_value IS NOT NULL
+        OR text_value IS NOT NULL;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        UPDATE listing_device_class_attributes
+        SET attribute_value = attribute_value
+        WHERE device_class_id = OLD.device_class_id
+        AND attribute_name = OLD.attribute_name;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE listing_device_class_attributes
+        SET attribute_value = attribute_value
+        WHERE device_class_id = NEW.device_class_id
+        AND attribute_name = NEW.attribute_name;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE TRIGGER retype_attribute_values
+    AFTER INSERT OR DELETE
+    OR UPDATE OF device_class_id, attribute_name, attribute_type
+    ON device_class_attributes
+    FOR EACH ROW EXECUTE FUNCTION retype_attribute_values();
+CREATE OR REPLACE TRIGGER retype_attribute_values_truncate
+    AFTER TRUNCATE ON device_class_attributes
+    FOR EACH STATEMENT EXECUTE FUNCTION retype_attribute_values();
+
+UPDATE listing_device_class_attributes SET attribute_value = attribute_value;
+
+COMMIT;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listing_device_class_attributes_number_min
+    ON listing_device_class_attributes (attribute_name, number_min)
+    WHERE number_min IS NOT NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listing_device_class_attributes_number_max
+    ON listing_device_class_attributes (attribute_name, number_max)
+    WHERE number_max IS NOT NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listing_device_class_attributes_boolean_value
+    ON listing_device_class_attributes (attribute_name, boolean_value)
+    WHERE boolean_value IS NOT NULL;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listing_device_class_attributes_text_value
+    ON listing_device_class_attributes (attribute_name, text_value)
+    WHERE text_value IS NOT NULL;
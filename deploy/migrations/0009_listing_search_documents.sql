@@ -0,0 +1,133 @@
+-- Adds the full-text search documents behind /listings/search, the triggers that keep
+-- them current, and their GIN index, and builds a document for every existing listing.
+--
+-- The documents are built in the transaction that creates the triggers, so writes to
+-- the listing tables wait until they are all built rather than racing them. The index
+-- is then built without blocking writes; if the build fails, drop the invalid index
+-- it leaves and run the script again. Needs PostgreSQL 14 or later. Safe to run more
+-- than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS listing_search_documents (
+    listing_id INTEGER NOT NULL,
+    document TSVECTOR NOT NULL,
+    PRIMARY KEY (listing_id),
+    FOREIGN KEY (listing_id) REFERENCES listings (id) ON DELETE CASCADE
+);
+
+CREATE OR REPLACE FUNCTION refresh_listing_search_documents(
+    listing_ids integer[]
+) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO listing_search_documents (listing_id, document)
+    SELECT
+        l.id,
+        setweight(
+            to_tsvector('english', l.manufacturer || ' ' || l.model),
+            'A'
+        )
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(dc.name, ' ')
+            FROM listing_device_classes ldc
+            JOIN device_classes dc ON dc.id = ldc.device_class_id
+            WHERE ldc.listing_id = l.id
+        ), '')), 'B')
+        || setweight(to_tsvector('english', coalesce((
+            SELECT string_agg(a.attribute_value, ' ')
+            FROM listing_device_class_attributes a
+            WHERE a.listing_id = l.id
+        ), '')), 'C')
+    FROM listings l
+    WHERE l.id = ANY(listing_ids)
+    ON CONFLICT (listing_id) DO UPDATE SET document = EXCLUDED.document;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION refresh_listing_search() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    listing_ids integer[];
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        SELECT array_agg(id) INTO listing_ids FROM listings;
+    ELSIF TG_TABLE_NAME = 'listings' THEN
+        SELECT array_agg(id) INTO listing_ids FROM new_rows;
+    ELSIF TG_TABLE_NAME = 'device_classes' THEN
+        SELECT array_agg(ldc.listing_id) INTO listing_ids
+        FROM listing_device_classes ldc
+        JOIN new_rows n ON n.id = ldc.device_class_id;
+    ELSIF TG_OP = 'INSERT' THEN
+        SELECT array_agg(listing_id) INTO listing_ids FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(listing_id) INTO listing_ids FROM old_rows;
+    ELSE
+        SELECT array_agg(listing_id) INTO listing_ids FROM (
+            SELECT listing_id FROM new_rows
+            UNION SELECT listing_id FROM old_rows
+        ) touched;
+    END IF;
+
+    IF listing_ids IS NOT NULL THEN
+        PERFORM refresh_listing_search_documents(listing_ids);
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+-- deleted listings take their documents with them by ON DELETE CASCADE, and device
+-- classes cannot be deleted while listings use them
+CREATE OR REPLACE TRIGGER refresh_listing_search_inserts
+    AFTER INSERT ON listings REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION refresh_listing_search();
+CREATE OR REPLACE TRIGGER refresh_listing_search_updates
+    AFTER UPDATE ON listings REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION refresh_listing_search();
+CREATE OR REPLACE TRIGGER refresh_listing_search_updates
+    AFTER UPDATE ON device_classes
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION refresh_listing_search();
+
+DO $$
+DECLARE
+    linked_table text;
+BEGIN
+    FOREACH linked_table IN ARRAY ARRAY[
+        'listing_device_classes', 'listing_device_class_attributes'
+    ] LOOP
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER refresh_listing_search_inserts '
+            'AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION refresh_listing_search()',
+            linked_table
+        );
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER refresh_listing_search_updates '
+            'AFTER UPDATE ON %I '
+            'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION refresh_listing_search()',
+            linked_table
+        );
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER refresh_listing_search_deletes '
+            'AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION refresh_listing_search()',
+            linked_table
+        );
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER refresh_listing_search_truncates '
+            'AFTER TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION refresh_listing_search()',
+            linked_table
+        );
+    END LOOP;
+END
+$$;
+
+SELECT refresh_listing_search_documents(array(SELECT id FROM listings));
+
+COMMIT;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listing_search_documents_document
+    ON listing_search_documents USING gin (document);
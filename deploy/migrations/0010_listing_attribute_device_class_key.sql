@@ -0,0 +1,47 @@
+-- Adds the foreign key from listing attribute values to their listing's device class
+-- link, so a value can only be written for a device class the listing has.
+--
+-- The key cascades: from now on, unlinking a device class from a listing (deleting its
+-- listing_device_classes row) also deletes the listing's attribute values for that
+-- device class.
+--
+-- Existing values whose listing does not have their device class would fail the key.
+-- They are copied to orphaned_listing_device_class_attributes and then deleted; review
+-- that table and drop it once done. The key is added NOT VALID, which holds its lock
+-- only briefly, and then validated in a second transaction that does not block writes.
+-- Safe to run more than once.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS orphaned_listing_device_class_attributes AS
+    SELECT * FROM listing_device_class_attributes WITH NO DATA;
+
+WITH orphans AS (
+    DELETE FROM listing_device_class_attributes a
+    WHERE NOT EXISTS (
+        SELECT 1 FROM listing_device_classes l
+        WHERE l.listing_id = a.listing_id AND l.device_class_id = a.device_class_id
+    )
+    RETURNING a.*
+)
+INSERT INTO orphaned_listing_device_class_attributes SELECT * FROM orphans;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = 'listing_device_class_attributes_listing_id_device_class_id_fkey'
+    ) THEN
+        ALTER TABLE listing_device_class_attributes
+            ADD CONSTRAINT listing_device_class_attributes_listing_id_device_class_id_fkey
+            FOREIGN KEY (listing_id, device_class_id)
+            REFERENCES listing_device_classes (listing_id, device_class_id)
+            ON DELETE CASCADE NOT VALID;
+    END IF;
+END
+$$;
+
+COMMIT;
+
+ALTER TABLE listing_device_class_attributes
+    VALIDATE CONSTRAINT listing_device_class_attributes_listing_id_device_class_id_fkey;
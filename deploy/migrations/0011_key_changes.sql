@@ -0,0 +1,22 @@
+-- Adds the trigger that tells every worker to drop its cache of verified API keys
+-- when keys are updated, deleted or truncated, so a revoked key stops working at once
+-- rather than when the cache entry expires.
+--
+-- Needs PostgreSQL 14 or later for CREATE OR REPLACE TRIGGER. Safe to run more than
+-- once.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION notify_key_changes() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('key_changes', '');
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE TRIGGER notify_key_changes
+    AFTER UPDATE OR DELETE OR TRUNCATE ON keys
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_key_changes();
+
+COMMIT;
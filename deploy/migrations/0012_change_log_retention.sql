@@ -0,0 +1,12 @@
+-- Adds registry_version.pruned_change_id, the newest change pruned from the change log,
+-- below which /changes rejects cursors. The API prunes changes older than
+-- OPEN_CEC_API_CHANGE_RETENTION_DAYS once this has run.
+--
+-- Safe to run more than once.
+
+BEGIN;
+
+ALTER TABLE registry_version
+    ADD COLUMN IF NOT EXISTS pruned_change_id BIGINT DEFAULT '0' NOT NULL;
+
+COMMIT;
@@ -8,6 +8,7 @@ if __name__ == "__main__":
         "open_cec_api.api.start:app",
         host=settings.host,
         port=settings.port,
-        reload=True,
+        reload=settings.reload,
+        workers=settings.workers_count,  # ignored by uvicorn when reloading
         reload_dirs=["/app"],
     )
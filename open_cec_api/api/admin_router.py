@@ -1,7 +1,8 @@
 from typing import Annotated, Optional, TypeVar, Union
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 import open_cec_api.api.crud.crud as crud
@@ -9,12 +10,24 @@ import open_cec_api.api.schema.create as create_schema
 import open_cec_api.api.schema.read as read_schema
 import open_cec_api.api.schema.update as update_schema
 from open_cec_api.api.auth import check_key_header
-from open_cec_api.api.crud.base import CRUDClass
-from open_cec_api.services.database.db import get_db_session
+from open_cec_api.api.crud.base import AsyncCRUDClass, BulkOutcome, InvalidWriteError
+from open_cec_api.api.crud.extended import acreate_listing_detail
+from open_cec_api.api.crud.filters import CLS_TO_KW_FILTERS, MULTI_VALUED_FILTERS
+from open_cec_api.api.fast_json import rows_page_response
+from open_cec_api.api.multi_get import (
+    PAGE_OR_IDS_RESPONSE,
+    IdsDependency,
+    rows_by_ids_response,
+)
+from open_cec_api.api.pagination import PageDependency
+from open_cec_api.api.schema.bulk import BulkResult
+from open_cec_api.api.schema.detail import ListingDetail
+from open_cec_api.services.database.db import get_async_db_session, get_db_session
 from open_cec_api.services.database.models import Base as ModelBase
 
 HeaderDependency = Depends(check_key_header)
 SessionDependency = Annotated[Session, Depends(get_db_session)]
+AsyncSessionDependency = Annotated[AsyncSession, Depends(get_async_db_session)]
 
 # We cannot pass the SessionDependency directly to the APIRouter
 admin_router = APIRouter(dependencies=[HeaderDependency], tags=["Admin"])
@@ -27,11 +40,72 @@ admin_router = APIRouter(dependencies=[HeaderDependency], tags=["Admin"])
 
 T = TypeVar("T", bound=ModelBase)
 
+MAX_BULK_ITEMS = 10_000
+
+
+def to_bulk_result(outcomes: list[BulkOutcome]) -> dict:
+    results = [
+        {"index": i, "item": o.instance, "error": o.error}
+        for i, o in enumerate(outcomes)
+    ]
+    succeeded = sum(o.error is None for o in outcomes)
+    return {
+        "succeeded": succeeded,
+        "failed": len(outcomes) - succeeded,
+        "results": results,
+    }
+
+
+def register_upsert_routes(
+    router: APIRouter,
+    path: str,
+    crud_class: type[AsyncCRUDClass[T]],
+    base_schema: type[BaseModel],
+    _create_schema: type[BaseModel],
+):
+    """Register single and bulk upsert routes keyed on crud_class.upsert_keys."""
+    keys = ", ".join(crud_class.upsert_keys)
+
+    async def upsert_item(
+        session: AsyncSessionDependency,
+        item_data: _create_schema,  # type: ignore
+    ):
+        try:
+            return await crud_class.aupsert(session, item_data)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    router.post(
+        f"{path}/upsert",
+        response_model=base_schema,
+        summary=f"Upsert {base_schema.__name__}",
+        description=f"Creates the item, or updates the existing one with the "
+        f"same ({keys}).",
+    )(upsert_item)
+
+    async def upsert_items(
+        session: AsyncSessionDependency,
+        items: Annotated[
+            list[_create_schema],  # type: ignore
+            Body(max_length=MAX_BULK_ITEMS),
+        ],
+    ):
+        outcomes = await crud_class.aupsert_many(session, items)
+        return to_bulk_result(outcomes)
+
+    router.post(
+        f"{path}/upsert/bulk",
+        response_model=BulkResult[base_schema],  # type: ignore[valid-type]
+        summary=f"Bulk upsert {base_schema.__name__}s",
+        description=f"Creates or updates each item by ({keys}) in one transaction; "
+        "each item reports its own result.",
+    )(upsert_items)
+
 
 def register_crud_routes(
     router: APIRouter,
     path: str,
-    crud_class: type[CRUDClass[T]],
+    crud_class: type[AsyncCRUDClass[T]],
     base_schema: type[BaseModel],
     _create_schema: type[BaseModel],
     _update_schema: type[BaseModel],
@@ -42,43 +116,74 @@ def register_crud_routes(
     # Dynamically build the function signature for GET
     from inspect import Parameter, Signature
 
-    # Prepare parameters: id + filter fields + db
+    # Prepare parameters: id + ids + filter fields + page + db
     params = [
         Parameter(
             "id",
             kind=Parameter.POSITIONAL_OR_KEYWORD,
             default=None,
             annotation=Optional[int],
-        )
+        ),
+        Parameter(
+            "ids",
+            kind=Parameter.POSITIONAL_OR_KEYWORD,
+            default=None,
+            annotation=IdsDependency,
+        ),
     ]
+    model_filters = CLS_TO_KW_FILTERS[crud_class.model_type]
     for f in filter_fields:
+        multi_valued = model_filters[f] in MULTI_VALUED_FILTERS
         params.append(
             Parameter(
                 f,
                 kind=Parameter.POSITIONAL_OR_KEYWORD,
                 default=Query(None),
-                annotation=Optional[str],
+                annotation=Optional[list[str]] if multi_valued else Optional[str],
             )
         )
+    params.append(
+        Parameter(
+            "page",
+            kind=Parameter.POSITIONAL_OR_KEYWORD,
+            default=None,
+            annotation=PageDependency,
+        )
+    )
     params.append(
         Parameter(
             "session",
             kind=Parameter.POSITIONAL_OR_KEYWORD,
             default=None,
-            annotation=SessionDependency,
+            annotation=AsyncSessionDependency,
         )
     )
 
     async def get_items(
-        session: SessionDependency, id: Optional[int] = Query(None), **filters
+        session: AsyncSessionDependency,
+        page: PageDependency,
+        ids: IdsDependency,
+        id: Optional[int] = Query(None),
+        **filters,
     ):
+        if id is not None:
+            result = await crud_class.aget(session, id=id)
+            if result is None:
+                raise HTTPException(
+                    status_code=404, detail=f"{base_schema.__name__} not found"
+                )
+            return result
+
+        if ids is not None:
+            rows = await crud_class.aget_rows_by_ids(session, base_schema, ids)
+            return rows_by_ids_response(rows, ids)
+
         filters = {k: v for k, v in filters.items() if v is not None}
-        result = crud_class.get(session, id=id, **filters)
-        if id is not None and result is None:
-            raise HTTPException(
-                status_code=404, detail=f"{base_schema.__name__} not found"
-            )
-        return result
+        # lists skip response_model validation; see fast_json
+        rows = await crud_class.aget_rows(
+            session, base_schema, limit=page.limit + 1, after=page.after, **filters
+        )
+        return rows_page_response(rows, page)
 
     get_items.__signature__ = Signature(parameters=params)
 
@@ -86,14 +191,15 @@ def register_crud_routes(
         path,
         response_model=Union[base_schema, list[base_schema]],
         summary=f"Get {base_schema.__name__}(s)",
+        responses=PAGE_OR_IDS_RESPONSE,
     )(get_items)
 
     async def create_item(
-        session: SessionDependency,
+        session: AsyncSessionDependency,
         item_data: _create_schema,  # type: ignore
     ):
         try:
-            return crud_class.create(session, item_data)
+            return await crud_class.acreate(session, item_data)
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
@@ -101,12 +207,36 @@ def register_crud_routes(
         path, response_model=base_schema, summary=f"Create {base_schema.__name__}"
     )(create_item)
 
+    async def create_items(
+        session: AsyncSessionDependency,
+        items: Annotated[
+            list[_create_schema],  # type: ignore
+            Body(max_length=MAX_BULK_ITEMS),
+        ],
+    ):
+        outcomes = await crud_class.acreate_many(session, items)
+        return to_bulk_result(outcomes)
+
+    router.post(
+        f"{path}/bulk",
+        response_model=BulkResult[base_schema],  # type: ignore[valid-type]
+        summary=f"Bulk create {base_schema.__name__}s",
+        description="Items are inserted in one transaction; each item reports "
+        "its own result, so a failing item does not prevent the others.",
+    )(create_items)
+
+    if crud_class.upsert_keys:
+        register_upsert_routes(router, path, crud_class, base_schema, _create_schema)
+
     async def update_item(
         id: int,
         item_data: _update_schema,  # type: ignore
-        session: SessionDependency,
+        session: AsyncSessionDependency,
     ):
-        result = crud_class.update(session, id, item_data)
+        try:
+            result = await crud_class.aupdate(session, id, item_data)
+        except InvalidWriteError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         if result is None:
             raise HTTPException(
                 status_code=404, detail=f"{base_schema.__name__} not found"
@@ -119,8 +249,8 @@ def register_crud_routes(
         summary=f"Update {base_schema.__name__}",
     )(update_item)
 
-    async def delete_item(id: int, session: SessionDependency):
-        result = crud_class.delete(session, id)
+    async def delete_item(id: int, session: AsyncSessionDependency):
+        result = await crud_class.adelete(session, id)
         if not result:
             raise HTTPException(
                 status_code=404, detail=f"{base_schema.__name__} not found"
@@ -176,9 +306,38 @@ register_crud_routes(
     read_schema.ListingBase,
     create_schema.ListingCreate,
     update_schema.ListingUpdate,
-    ["entity_type_id", "manufacturer", "model", "status"],
+    [
+        "entity_type_id",
+        "manufacturer",
+        "model",
+        "status",
+        "test_profiles",
+        "test_profiles_any",
+    ],
 )
 
+
+@admin_router.post(
+    "/admin/listings/detail",
+    response_model=ListingDetail,
+    summary="Create ListingDetail",
+)
+async def create_listing_detail(
+    session: AsyncSessionDependency,
+    item_data: create_schema.ListingDetailCreate,
+):
+    """Create a listing with its device classes, their attribute values and its
+    certificates in one transaction, returning it as /listings/detail would.
+
+    Nothing is written if any part of it is invalid.
+    """
+    try:
+        document = await acreate_listing_detail(session, item_data)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=document, media_type="application/json")
+
+
 # Listing Device Classes
 register_crud_routes(
     admin_router,
@@ -220,12 +379,12 @@ register_crud_routes(
     read_schema.CertificateBase,
     create_schema.CertificateCreate,
     update_schema.CertificateUpdate,
-    ["listing_id", "certifying_body"],
+    ["listing_id", "certifying_body", "test_profiles", "test_profiles_any"],
 )
 
 
 @admin_router.get("/foo")
-async def foo(session: SessionDependency, id: Optional[int] = None):
+def foo(session: SessionDependency, id: Optional[int] = None):
     from open_cec_api.api.crud.extended import eager_get_listings
 
     return eager_get_listings(session, id)
@@ -1,18 +1,56 @@
-from typing import Annotated
+import asyncio
+import hashlib
+import hmac
+from typing import Annotated, Any
 
 from fastapi import Depends, HTTPException, Security, status
 from fastapi.security import APIKeyHeader
+from loguru import logger
 from passlib.context import CryptContext
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.orm import Session
 
+from open_cec_api.services.cache import TTLCache
 from open_cec_api.services.database.db import get_db_session
-from open_cec_api.services.database.models import Key
+from open_cec_api.services.database.models import KEY_CHANGES_CHANNEL, Key
 
 """Basic API key authentication; does not identify particular users"""
 
+
+MIN_FINGERPRINT_SECRET_LENGTH = 16
+KEY_LISTEN_CHECK_INTERVAL = 30.0  # seconds between checks of the LISTEN connection
+KEY_LISTEN_RETRY_DELAY = 5.0  # seconds before retrying a lost LISTEN connection
+
+
+class AuthSettings(BaseSettings):
+    key_cache_size: int = 1024  # max number of verified keys held per worker
+    key_cache_ttl: float = 300.0  # seconds before a verified key is re-checked
+    # HMAC secret for key fingerprints; required, since without one anybody who can
+    # read the keys table could test guessed keys against the fingerprints offline
+    key_fingerprint_secret: str = Field(min_length=MIN_FINGERPRINT_SECRET_LENGTH)
+
+    model_config = SettingsConfigDict(
+        env_file=".env", env_prefix="OPEN_CEC_API_", extra="allow"
+    )
+
+
+auth_settings = AuthSettings()  # type: ignore[call-arg]  # instantiated at runtime
+
 pwd_context = CryptContext(schemes=["des_crypt"], deprecated="auto")
 api_key_header = APIKeyHeader(name="x-api-key")
 
+# Maps the fingerprint of a presented key to the id of the Key record it verified against.
+# Only successful verifications are cached, and the plain key is never stored.
+# A write to the keys table, by any worker, clears it in every worker (see
+# listen_for_key_changes), so revoked keys stop working immediately; KeyCRUD also clears
+# it directly, before the notification arrives.
+key_cache: TTLCache[str, int] = TTLCache(
+    maxsize=auth_settings.key_cache_size, ttl=auth_settings.key_cache_ttl
+)
+
 
 def verify_key(plain_key: str, hash: str) -> bool:
     return pwd_context.verify(plain_key, hash)
@@ -22,6 +60,46 @@ def get_key_hash(key: str) -> str:
     return pwd_context.hash(key)
 
 
+def get_key_fingerprint(key: str) -> str:
+    """Keyed, deterministic digest of a plain key, used to find its Key record."""
+    return hmac.new(
+        auth_settings.key_fingerprint_secret.encode(), key.encode(), hashlib.sha256
+    ).hexdigest()
+
+
+def _on_key_change(*args: Any) -> None:
+    key_cache.clear()
+
+
+async def listen_for_key_changes(engine: AsyncEngine) -> None:
+    """Clear key_cache whenever the keys table is written, until cancelled.
+
+    Holds one LISTEN connection on KEY_CHANGES_CHANNEL. Writes made while not listening
+    go unheard, so the cache is also cleared each time listening starts; a lost
+    connection is noticed within KEY_LISTEN_CHECK_INTERVAL. Requires asyncpg.
+    """
+    while True:
+        try:
+            async with engine.connect() as conn:
+                try:
+                    # notifications are only delivered outside a transaction
+                    await conn.execution_options(isolation_level="AUTOCOMMIT")
+                    raw = await conn.get_raw_connection()
+                    await raw.driver_connection.add_listener(
+                        KEY_CHANGES_CHANNEL, _on_key_change
+                    )
+                    key_cache.clear()
+                    while True:
+                        await asyncio.sleep(KEY_LISTEN_CHECK_INTERVAL)
+                        await conn.exec_driver_sql("SELECT 1")
+                finally:
+                    # never hand a listening connection back to the pool
+                    await conn.invalidate()
+        except Exception as e:
+            logger.warning(f"Key change listener failed, retrying: {e!r}")
+            await asyncio.sleep(KEY_LISTEN_RETRY_DELAY)
+
+
 def check_key_header(
     session: Annotated[Session, Depends(get_db_session)],
     key: str = Security(api_key_header),
@@ -31,13 +109,33 @@ def check_key_header(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="API key required"
         )
 
-    # not very efficient but ok with number of keys required
+    fingerprint = get_key_fingerprint(key)
+    if key_cache.get(fingerprint) is not None:
+        return
+
     with session:
-        k_records = session.query(Key).all()
+        record = session.query(Key).filter(Key.fingerprint == fingerprint).first()
+        if record is not None:
+            if verify_key(key, record.value):
+                key_cache.set(fingerprint, record.id)
+                return
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key"
+            )
 
-    for k in k_records:
-        if verify_key(key, k.value):  # type: ignore
-            return
+        # Keys stored without a fingerprint (created before fingerprints existed, or
+        # whose hash was replaced) are found by a scan, then backfilled so the next
+        # lookup is a single index probe.
+        k_records = session.query(Key).filter(Key.fingerprint.is_(None)).all()
+        for k in k_records:
+            if verify_key(key, k.value):  # type: ignore
+                k.fingerprint = fingerprint
+                try:
+                    session.commit()
+                except IntegrityError:
+                    session.rollback()  # another request backfilled it first
+                key_cache.set(fingerprint, k.id)
+                return
 
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API key"
@@ -0,0 +1,117 @@
+"""Manufacturer and model completion served from memory.
+
+Each worker keeps a ``PrefixIndex`` of the manufacturers and models of all listings.
+It is loaded at startup, patched by ``ListingCRUD`` as it commits writes, and reloaded
+every ``autocomplete_refresh_interval`` seconds to pick up writes made by other workers
+or outside the API. Completions never touch Postgres.
+"""
+
+import asyncio
+import threading
+from typing import Any, Iterable, Literal
+
+from loguru import logger
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from open_cec_api.services.database.db import ensure_session
+from open_cec_api.services.database.models import Listing
+from open_cec_api.services.prefix_index import PrefixIndex
+
+CompletionField = Literal["manufacturer", "model"]
+FIELDS: tuple[CompletionField, ...] = ("manufacturer", "model")
+DEFAULT_COMPLETIONS = 10
+MAX_COMPLETIONS = 50
+
+
+class AutocompleteSettings(BaseSettings):
+    # seconds between full reloads of the index; 0 never reloads
+    autocomplete_refresh_interval: float = 300.0
+
+    model_config = SettingsConfigDict(
+        env_file=".env", env_prefix="OPEN_CEC_API_", extra="allow"
+    )
+
+
+autocomplete_settings = AutocompleteSettings()
+
+
+class ListingCompletions:
+    """Prefix indexes of listing manufacturers and models, keyed by listing id.
+
+    Remembering each listing's values lets an update or delete drop the strings the
+    listing used to have. Sync routes and writes run in a threadpool, so every access
+    takes a lock.
+    """
+
+    def __init__(self) -> None:
+        self._values: dict[int, tuple[str, str]] = {}
+        self._indexes = {field: PrefixIndex() for field in FIELDS}
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[Any]) -> None:
+        """Replace the contents with rows having id, manufacturer and model."""
+        values = {row.id: (row.manufacturer, row.model) for row in rows}
+        indexes = {
+            field: PrefixIndex(v[i] for v in values.values())
+            for i, field in enumerate(FIELDS)
+        }
+        with self._lock:
+            self._values, self._indexes = values, indexes
+
+    def put(self, rows: Iterable[Any]) -> None:
+        """Add or update listings from rows having id, manufacturer and model."""
+        with self._lock:
+            old, new = [], []
+            for row in rows:
+                value = (row.manufacturer, row.model)
+                if row.id in self._values:
+                    old.append(self._values[row.id])
+                self._values[row.id] = value
+                new.append(value)
+            self._update(new, old)
+
+    def remove(self, ids: Iterable[int]) -> None:
+        with self._lock:
+            old = [self._values.pop(id) for id in ids if id in self._values]
+            self._update([], old)
+
+    def _update(
+        self, added: list[tuple[str, str]], removed: list[tuple[str, str]]
+    ) -> None:
+        for i, field in enumerate(FIELDS):
+            self._indexes[field].update(
+                added=(v[i] for v in added), removed=(v[i] for v in removed)
+            )
+
+    def complete(self, field: CompletionField, prefix: str, limit: int) -> list[str]:
+        with self._lock:
+            return self._indexes[field].complete(prefix, limit)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+listing_completions = ListingCompletions()
+
+
+def load_listing_completions(session: Session) -> None:
+    rows = session.execute(select(Listing.id, Listing.manufacturer, Listing.model))
+    listing_completions.load(rows)
+    logger.info(f"Loaded {len(listing_completions)} listings for autocomplete")
+
+
+def reload_listing_completions() -> None:
+    with ensure_session() as session:
+        load_listing_completions(session)
+
+
+async def refresh_listing_completions(interval: float) -> None:
+    """Reload the index every interval seconds, off the event loop, until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(reload_listing_completions)
+        except Exception as e:
+            logger.warning(f"Reloading listing completions failed: {e!r}")
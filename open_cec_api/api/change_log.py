@@ -0,0 +1,107 @@
+"""Retention of the registry change log.
+
+The change log gains a row for every registry row written, so changes older than
+``change_retention_days`` are deleted every ``change_prune_interval`` seconds. Each
+worker prunes; a prune that finds nothing old enough deletes nothing, so several
+workers doing it is harmless. The id of the newest pruned change is kept in
+``registry_version.pruned_change_id``, and a change feed cursor from before it is
+answered with 410 Gone, as the changes after it are no longer all there: the client
+reads the registry in full again and follows the feed from a new cursor.
+"""
+
+import asyncio
+from datetime import timedelta
+from typing import Optional
+
+from fastapi import HTTPException, status
+from loguru import logger
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from open_cec_api.services.database.db import ensure_session
+from open_cec_api.services.database.models import Change, RegistryVersion
+
+
+class ChangeLogSettings(BaseSettings):
+    # days a change is kept for, so the longest a mirror may go without reading the feed
+    change_retention_days: float = Field(90.0, gt=0)
+    # seconds between prunes of the change log; 0 never prunes
+    change_prune_interval: float = 3600.0
+
+    model_config = SettingsConfigDict(
+        env_file=".env", env_prefix="OPEN_CEC_API_", extra="allow"
+    )
+
+
+change_log_settings = ChangeLogSettings()
+
+PRUNED_CHANGE_ID = select(RegistryVersion.pruned_change_id).where(
+    RegistryVersion.id == 1
+)
+
+
+def check_cursor_retained(after: Optional[int], pruned_change_id: int) -> None:
+    """Reject a cursor from before the pruned part of the change log."""
+    if after is not None and after < pruned_change_id:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Changes after this cursor have been pruned; read the registry "
+            "again and follow the feed from a new cursor",
+        )
+
+
+def prune_changes(session: Session, retention: timedelta) -> int:
+    """Delete the changes made before the retention period, returning how many.
+
+    The oldest changes are deleted up to the first one made within the period, so the
+    log always holds every change after some id, which is recorded as
+    pruned_change_id. The version row is locked last, after the delete, to hold up
+    writers only briefly.
+    """
+    first_kept = session.scalar(
+        select(Change.id)
+        .where(Change.changed_at >= func.now() - retention)
+        .order_by(Change.id)
+        .limit(1)
+    )
+    if first_kept is not None:
+        horizon = first_kept - 1
+    else:
+        horizon = session.scalar(select(func.max(Change.id)))
+        if horizon is None:
+            return 0
+
+    pruned = session.execute(delete(Change).where(Change.id <= horizon)).rowcount
+    if pruned:
+        session.execute(
+            update(RegistryVersion)
+            .where(RegistryVersion.id == 1)
+            .values(
+                pruned_change_id=func.greatest(
+                    RegistryVersion.pruned_change_id, horizon
+                )
+            )
+        )
+    session.commit()
+    return pruned
+
+
+def prune_change_log() -> None:
+    retention = timedelta(days=change_log_settings.change_retention_days)
+    with ensure_session() as session:
+        pruned = prune_changes(session, retention)
+    if pruned:
+        logger.info(f"Pruned {pruned} changes from the change log")
+
+
+async def prune_change_log_periodically(interval: float) -> None:
+    """Prune the change log every interval seconds, off the event loop, until
+    cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(prune_change_log)
+        except Exception as e:
+            logger.warning(f"Pruning the change log failed: {e!r}")
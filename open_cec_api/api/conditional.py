@@ -0,0 +1,106 @@
+"""Conditional GETs validated against the registry version.
+
+Public read routes send an ``ETag`` and ``Last-Modified`` taken from the single
+``registry_version`` row, which a trigger bumps on every write to the registry tables.
+When a request's ``If-None-Match`` (or, failing that, ``If-Modified-Since``) shows the
+client already has the current version, the ``registry_validators`` dependency answers
+304 Not Modified before the route runs its query. The ETag only identifies the
+registry version; clients and caches already key their copies by URL.
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Annotated, Mapping, NamedTuple, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from open_cec_api.services.database.db import get_db_session
+from open_cec_api.services.database.models import RegistryVersion
+
+
+class RegistryValidators(NamedTuple):
+    etag: str
+    last_modified: datetime  # UTC, truncated to the second like an HTTP date
+
+    @property
+    def headers(self) -> dict[str, str]:
+        return {
+            "ETag": self.etag,
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+        }
+
+    def is_current(self, request_headers: Mapping[str, str]) -> bool:
+        """Whether the conditional headers show the client has this version.
+
+        If-Modified-Since is only consulted without If-None-Match (RFC 9110 13.2.2).
+        """
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or self.etag in tags
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if not if_modified_since:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:  # "-0000" dates parse as naive UTC
+            since = since.replace(tzinfo=timezone.utc)
+        return self.last_modified <= since
+
+
+def get_registry_validators(session: Session) -> Optional[RegistryValidators]:
+    """Validators for the current registry version; None if the row is missing."""
+    row = session.execute(
+        select(RegistryVersion.version, RegistryVersion.modified_at).where(
+            RegistryVersion.id == 1
+        )
+    ).first()
+    if row is None:
+        return None
+
+    version, modified_at = row
+    return RegistryValidators(
+        etag=f'"{version}"',
+        last_modified=modified_at.astimezone(timezone.utc).replace(microsecond=0),
+    )
+
+
+def registry_validators(
+    request: Request, session: Annotated[Session, Depends(get_db_session)]
+) -> dict[str, str]:
+    """FastAPI dependency: the validator headers for the response, or a 304."""
+    validators = get_registry_validators(session)
+    if validators is None:
+        return {}
+
+    if validators.is_current(request.headers):
+        raise HTTPException(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=validators.headers
+        )
+    return validators.headers
+
+
+RegistryValidatorsDependency = Annotated[dict[str, str], Depends(registry_validators)]
+
+# OpenAPI description of the validator headers, merged into a route's ``responses``
+VALIDATOR_HEADERS: dict[str, dict[str, object]] = {
+    "ETag": {
+        "description": "Registry version; send as `If-None-Match` to revalidate",
+        "schema": {"type": "string"},
+    },
+    "Last-Modified": {
+        "description": "Time of the last registry write",
+        "schema": {"type": "string"},
+    },
+}
+NOT_MODIFIED_RESPONSE: dict[int | str, dict[str, object]] = {
+    304: {
+        "description": "The registry has not changed since the client's copy",
+        "headers": VALIDATOR_HEADERS,
+    }
+}
@@ -0,0 +1,86 @@
+"""Listing filters on attribute values, e.g. ``attr.capacity>=10``.
+
+Each filter compiles to a semi-join, ``listings.id IN (SELECT listing_id ...)``, on
+the typed value columns of ListingDeviceClassAttribute, which are indexed by
+attribute name and value.
+"""
+
+import math
+import re
+from typing import NamedTuple, Optional
+
+from sqlalchemy import ColumnElement, and_, or_, select
+
+from open_cec_api.services.database.models import (
+    BOOLEAN_VALUES,
+    ListingDeviceClassAttribute,
+)
+
+ATTRIBUTE_FILTER_PREFIX = "attr."
+_FILTER_PATTERN = re.compile(r"attr\.([^<>=]+)(>=|<=|>|<|=)(.+)", re.DOTALL)
+
+
+def _number(value: str) -> Optional[float]:
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
+
+
+class AttributeFilter(NamedTuple):
+    """One attribute condition: the attribute name, a comparison and a value.
+
+    ``>``, ``>=``, ``<`` and ``<=`` compare numbers; a range matches when any part of
+    it does, so ``attr.input_voltage>=700`` matches "200-800V". ``=`` matches a number
+    within a value's range, a boolean (true/false, yes/no, ...), or a string or enum
+    value regardless of case.
+    """
+
+    name: str
+    operator: str
+    value: str
+
+    @classmethod
+    def parse(cls, expression: str) -> "AttributeFilter":
+        """Parse ``attr.<name><operator><value>``, raising ValueError if invalid."""
+        match = _FILTER_PATTERN.fullmatch(expression)
+        if match is None:
+            raise ValueError(f"Invalid attribute filter {expression!r}")
+        name, operator, value = match.groups()
+        if operator != "=" and _number(value) is None:
+            raise ValueError(f"Attribute filter {expression!r} must compare a number")
+        return cls(name, operator, value)
+
+    def condition(self) -> ColumnElement[bool]:
+        """The condition on an attribute value row, besides its name."""
+        attribute = ListingDeviceClassAttribute
+        number = _number(self.value)
+        if self.operator == ">=":
+            return attribute.number_max >= number
+        if self.operator == ">":
+            return attribute.number_max > number
+        if self.operator == "<=":
+            return attribute.number_min <= number
+        if self.operator == "<":
+            return attribute.number_min < number
+
+        # "=" matches whichever typed forms the value can take
+        text = self.value.strip(" ").lower()
+        matches = [attribute.text_value == text]
+        if number is not None:
+            matches.append(
+                and_(attribute.number_min <= number, attribute.number_max >= number)
+            )
+        if text in BOOLEAN_VALUES:
+            matches.append(attribute.boolean_value == BOOLEAN_VALUES[text])
+        return or_(*matches)
+
+    def matches(self, listing_id: ColumnElement[int]) -> ColumnElement[bool]:
+        """Listings with a value of this attribute satisfying the condition."""
+        attribute = ListingDeviceClassAttribute
+        return listing_id.in_(
+            select(attribute.listing_id).where(
+                attribute.attribute_name == self.name, self.condition()
+            )
+        )
@@ -1,66 +1,548 @@
 from abc import ABC
-from typing import Generic, Optional, Type, TypeVar, Union
+from typing import (
+    Any,
+    Generic,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from pydantic import BaseModel
+from sqlalchemy import (
+    Delete,
+    Insert,
+    Row,
+    Select,
+    Update,
+    any_,
+    delete,
+    insert,
+    inspect,
+    literal,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from open_cec_api.api.crud.filters import CLS_TO_KW_FILTERS
+from open_cec_api.api.crud.filters import CLS_TO_KW_COLUMNS, CLS_TO_KW_FILTERS
+from open_cec_api.services.database.models import REGISTRY_TABLES, RegistryVersion
 from open_cec_api.services.database.models import Base as ModelBase
 
 T = TypeVar("T", bound=ModelBase)
 
+BULK_CHUNK_SIZE = 500  # rows per multi-row INSERT
+
+# The registry triggers lock the registry_version row after each statement's row locks.
+# Were a transaction to lock a row and then wait for the version held by another that
+# goes on to write the same row, the two would deadlock; so CRUD writes to the registry
+# tables take the version lock before anything else.
+REGISTRY_LOCK = (
+    select(RegistryVersion.id).where(RegistryVersion.id == 1).with_for_update()
+)
+
+
+class BulkOutcome(NamedTuple, Generic[T]):
+    """Result of one item in a bulk write: the stored row, or why it failed."""
+
+    instance: Optional[T]
+    error: Optional[str]
+
+
+class InvalidWriteError(ValueError):
+    """A row rejected by CRUDClass.check_values before it reached the database."""
+
+
+def _merge_outcomes(
+    errors: list[Optional[str]], written: list[BulkOutcome[T]]
+) -> list[BulkOutcome[T]]:
+    """An outcome per item: its rejection, or else the next outcome of the written."""
+    outcomes = iter(written)
+    return [BulkOutcome(None, e) if e is not None else next(outcomes) for e in errors]
+
+
+def _column_values(instance: ModelBase) -> dict[str, Any]:
+    return {
+        a.key: getattr(instance, a.key) for a in inspect(instance).mapper.column_attrs
+    }
+
+
+def in_id_order(rows: Sequence[Row], ids: Sequence[int]) -> list[Row]:
+    """The rows for ids, in the order of ids; ids without a row are skipped."""
+    by_id = {row.id: row for row in rows}
+    return [by_id[id] for id in ids if id in by_id]
+
+
+def _chunks(values: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+    return [
+        values[i : i + BULK_CHUNK_SIZE] for i in range(0, len(values), BULK_CHUNK_SIZE)
+    ]
+
 
 class CRUDClass(ABC, Generic[T]):
     model_type: Type[T]  # subclasses must set this
+    # columns of a unique constraint to upsert on; empty means upsert is unsupported
+    upsert_keys: tuple[str, ...] = ()
 
     @classmethod
-    def get(
-        cls, session: Session, id: int | None = None, *args, **kwargs
-    ) -> Union[T, list[T], None]:
-        query = session.query(cls.model_type)
+    def after_write(cls, rows: Sequence[T], deleted: bool = False) -> None:
+        """Called after a create, update or delete has been committed, with the rows as
+        written, or as they were if ``deleted``.
+
+        Subclasses override this to update any in-process state derived from the table.
+        """
+
+    @classmethod
+    def check_values(
+        cls, session: Session, values: Sequence[Mapping[str, Any]]
+    ) -> list[Optional[str]]:
+        """Why each row of column values may not be written, or None where it may.
+
+        Called in the writing transaction before rows are inserted, and after an update
+        but before it is committed. Subclasses override this to validate rows, ideally
+        against in-process state rather than with further queries.
+        """
+        return [None] * len(values)
+
+    @classmethod
+    def _check_one(cls, session: Session, values: Mapping[str, Any]) -> None:
+        error = cls.check_values(session, [values])[0]
+        if error is not None:
+            raise InvalidWriteError(error)
+
+    @classmethod
+    def _lock_registry(cls, session: Session) -> None:
+        """Take the registry version lock if this is a registry table; see
+        REGISTRY_LOCK."""
+        if cls.model_type.__table__ in REGISTRY_TABLES:
+            session.execute(REGISTRY_LOCK)
+
+    @classmethod
+    def _get_statement(
+        cls,
+        id: int | None = None,
+        limit: int | None = None,
+        after: int | None = None,
+        **kwargs,
+    ) -> Select:
+        model_id = getattr(cls.model_type, "id")
+        stmt = select(cls.model_type)
 
         if id is not None:
-            return query.filter(getattr(cls.model_type, "id") == id).first()
+            return stmt.where(model_id == id)
 
         # apply filters
         cls_filter = CLS_TO_KW_FILTERS[cls.model_type]
+        cls_columns = CLS_TO_KW_COLUMNS.get(cls.model_type, {})
         for k, v in kwargs.items():
             filter = cls_filter.get(k, None)
             if not filter:
                 raise ValueError
 
-            expression = filter(getattr(cls.model_type, k), v)
-            query = query.filter(expression)
+            column = getattr(cls.model_type, cls_columns.get(k, k))
+            expression = filter(column, v)
+            stmt = stmt.where(expression)
+
+        # keyset pagination: resume after the last id seen, in id order
+        if after is not None:
+            stmt = stmt.where(model_id > after)
+        stmt = stmt.order_by(model_id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+
+        return stmt
+
+    @classmethod
+    def _rows_statement(
+        cls,
+        schema: type[BaseModel],
+        limit: int | None = None,
+        after: int | None = None,
+        **kwargs,
+    ) -> Select:
+        """_get_statement selecting only the schema's fields, in field order."""
+        columns = [getattr(cls.model_type, f).label(f) for f in schema.model_fields]
+        return cls._get_statement(None, limit, after, **kwargs).with_only_columns(
+            *columns
+        )
+
+    @classmethod
+    def _rows_by_ids_statement(
+        cls, schema: type[BaseModel], ids: Sequence[int]
+    ) -> Select:
+        """_rows_statement for the rows with the given ids, in one ``id = ANY`` lookup.
+
+        The ids are bound as a single array, so the statement is the same however many
+        there are.
+        """
+        model_id = getattr(cls.model_type, "id")
+        return cls._rows_statement(schema).where(
+            model_id == any_(literal(list(ids), ARRAY(model_id.type)))
+        )
+
+    @classmethod
+    def _insert_statement(cls) -> Insert:
+        return insert(cls.model_type).returning(
+            cls.model_type, sort_by_parameter_order=True
+        )
+
+    @classmethod
+    def _upsert_statement(cls, columns: Sequence[str]) -> Insert:
+        """INSERT ... ON CONFLICT (upsert_keys) DO UPDATE ... RETURNING.
+
+        On conflict the supplied ``columns`` are overwritten with the incoming values
+        and any column with an ``onupdate`` default (e.g. updated_at) is refreshed.
+        """
+        if not cls.upsert_keys:
+            raise NotImplementedError(f"{cls.__name__} does not support upsert")
+
+        stmt = pg_insert(cls.model_type)
+        set_: dict[str, Any] = {
+            c: stmt.excluded[c] for c in columns if c not in cls.upsert_keys
+        }
+        for column in cls.model_type.__table__.columns:
+            if column.onupdate is not None and column.name not in set_:
+                set_[column.name] = column.onupdate.arg  # type: ignore[attr-defined]
+
+        return (
+            stmt.on_conflict_do_update(index_elements=cls.upsert_keys, set_=set_)
+            .returning(cls.model_type, sort_by_parameter_order=True)
+            .execution_options(populate_existing=True)
+        )
+
+    @classmethod
+    def _update_values(cls, schema: BaseModel) -> dict[str, Any]:
+        return schema.model_dump(exclude_unset=True)
+
+    @classmethod
+    def _update_statement(cls, id: int, schema: BaseModel) -> Union[Update, Select]:
+        """UPDATE ... RETURNING the row, or a plain SELECT if nothing is being set."""
+        model_id = getattr(cls.model_type, "id")
+        values = {
+            f: v
+            for f, v in cls._update_values(schema).items()
+            if hasattr(cls.model_type, f)
+        }
+        if not values:
+            return select(cls.model_type).where(model_id == id)
+
+        return (
+            update(cls.model_type)
+            .where(model_id == id)
+            .values(**values)
+            .returning(cls.model_type)
+            .execution_options(populate_existing=True)
+        )
+
+    @classmethod
+    def _delete_statement(cls, id: int) -> Delete:
+        model_id = getattr(cls.model_type, "id")
+        return delete(cls.model_type).where(model_id == id).returning(cls.model_type)
+
+    @classmethod
+    def get(
+        cls,
+        session: Session,
+        id: int | None = None,
+        *args,
+        limit: int | None = None,
+        after: int | None = None,
+        **kwargs,
+    ) -> Union[T, list[T], None]:
+        result = session.scalars(cls._get_statement(id, limit, after, **kwargs))
+
+        if id is not None:
+            return result.first()
+        return list(result.all())
+
+    @classmethod
+    def get_rows(
+        cls,
+        session: Session,
+        schema: type[BaseModel],
+        *,
+        limit: int | None = None,
+        after: int | None = None,
+        **kwargs,
+    ) -> Sequence[Row]:
+        """Like get, but returns plain rows of the schema's fields, not ORM objects."""
+        return session.execute(
+            cls._rows_statement(schema, limit, after, **kwargs)
+        ).all()
 
-        return query.all()
+    @classmethod
+    def get_rows_by_ids(
+        cls, session: Session, schema: type[BaseModel], ids: Sequence[int]
+    ) -> list[Row]:
+        """Like get_rows, but the rows with the given ids, in the order of ids."""
+        rows = session.execute(cls._rows_by_ids_statement(schema, ids)).all()
+        return in_id_order(rows, ids)
 
     @classmethod
     def create(cls, session: Session, schema: BaseModel, *args, **kwargs) -> T:
-        instance = cls.model_type(**schema.model_dump())
+        values = schema.model_dump()
+        cls._check_one(session, values)
+        cls._lock_registry(session)
+        instance = cls.model_type(**values)
         session.add(instance)
         session.commit()
         session.refresh(instance)
+        cls.after_write([instance])
+        return instance
+
+    @classmethod
+    def _write_many(
+        cls, session: Session, stmt: Insert, values: list[dict[str, Any]]
+    ) -> list[BulkOutcome[T]]:
+        """Run ``stmt`` over ``values`` in chunks and commit, keeping what succeeds.
+
+        All rows are checked first, and rejected rows are not sent. Each chunk runs in
+        a savepoint. If a chunk fails, its rows are retried one at a time so the
+        failure is pinned to the offending items and the rest are kept.
+        """
+        errors = cls.check_values(session, values)
+        valid = [v for v, error in zip(values, errors) if error is None]
+        cls._lock_registry(session)
+        outcomes: list[BulkOutcome[T]] = []
+        for chunk in _chunks(valid):
+            try:
+                with session.begin_nested():
+                    rows = session.scalars(stmt, chunk).all()
+                outcomes.extend(BulkOutcome(r, None) for r in rows)
+                continue
+            except DBAPIError:
+                pass
+
+            for row_values in chunk:
+                try:
+                    with session.begin_nested():
+                        row = session.scalars(stmt, [row_values]).one()
+                    outcomes.append(BulkOutcome(row, None))
+                except DBAPIError as e:
+                    outcomes.append(BulkOutcome(None, str(e.orig)))
+
+        session.commit()
+        written = [o.instance for o in outcomes if o.instance is not None]
+        if written:
+            cls.after_write(written)
+        return _merge_outcomes(errors, outcomes)
+
+    @classmethod
+    def create_many(
+        cls, session: Session, schemas: Sequence[BaseModel]
+    ) -> list[BulkOutcome[T]]:
+        """Insert many rows in one transaction using chunked INSERT ... RETURNING."""
+        return cls._write_many(
+            session, cls._insert_statement(), [s.model_dump() for s in schemas]
+        )
+
+    @classmethod
+    def upsert(cls, session: Session, schema: BaseModel) -> T:
+        """Insert a row, or update the one that has the same ``upsert_keys``."""
+        values = schema.model_dump()
+        cls._check_one(session, values)
+        cls._lock_registry(session)
+        instance = session.scalars(cls._upsert_statement(list(values)), [values]).one()
+        session.commit()
+        cls.after_write([instance])
         return instance
 
+    @classmethod
+    def upsert_many(
+        cls, session: Session, schemas: Sequence[BaseModel]
+    ) -> list[BulkOutcome[T]]:
+        """Upsert many rows in one transaction, chunked like create_many."""
+        values = [s.model_dump() for s in schemas]
+        if not values:
+            return []
+        return cls._write_many(session, cls._upsert_statement(list(values[0])), values)
+
     @classmethod
     def update(
         cls, session: Session, id: int, schema: BaseModel, *args, **kwargs
     ) -> Optional[T]:
-        instance = session.query(cls.model_type).filter(cls.model_type.id == id).first()
-        if instance:
-            update_data = schema.model_dump(exclude_unset=True)
-            for f, v in update_data.items():
-                if hasattr(instance, f):
-                    setattr(instance, f, v)
-            session.commit()
-            session.refresh(instance)
+        cls._lock_registry(session)
+        instance = session.scalars(cls._update_statement(id, schema)).first()
+        if instance is not None:
+            try:
+                cls._check_one(session, _column_values(instance))
+            except InvalidWriteError:
+                session.rollback()
+                raise
+        session.commit()
+        if instance is not None:
+            cls.after_write([instance])
+        return instance
+
+    @classmethod
+    def delete(cls, session: Session, id: int) -> Optional[T]:
+        """Delete a row, returning it as it was, or None if it did not exist."""
+        cls._lock_registry(session)
+        instance = session.scalars(cls._delete_statement(id)).first()
+        session.commit()
+        if instance is not None:
+            cls.after_write([instance], deleted=True)
         return instance
 
+
+class AsyncCRUDClass(CRUDClass[T]):
+    """CRUDClass with awaitable counterparts of get/create/update/delete.
+
+    The async methods build the same statements as their sync namesakes but run them
+    on an AsyncSession, so routes can await them without blocking the event loop.
+    """
+
     @classmethod
-    def delete(cls, session: Session, id: int) -> bool:
-        instance = session.query(cls.model_type).filter(cls.model_type.id == id).first()
-        if instance:
-            session.delete(instance)
-            session.commit()
-            return True
-        return False
+    async def _alock_registry(cls, session: AsyncSession) -> None:
+        if cls.model_type.__table__ in REGISTRY_TABLES:
+            await session.execute(REGISTRY_LOCK)
+
+    @classmethod
+    async def aget(
+        cls,
+        session: AsyncSession,
+        id: int | None = None,
+        *args,
+        limit: int | None = None,
+        after: int | None = None,
+        **kwargs,
+    ) -> Union[T, list[T], None]:
+        result = await session.scalars(cls._get_statement(id, limit, after, **kwargs))
+
+        if id is not None:
+            return result.first()
+        return list(result.all())
+
+    @classmethod
+    async def aget_rows(
+        cls,
+        session: AsyncSession,
+        schema: type[BaseModel],
+        *,
+        limit: int | None = None,
+        after: int | None = None,
+        **kwargs,
+    ) -> Sequence[Row]:
+        result = await session.execute(
+            cls._rows_statement(schema, limit, after, **kwargs)
+        )
+        return result.all()
+
+    @classmethod
+    async def aget_rows_by_ids(
+        cls, session: AsyncSession, schema: type[BaseModel], ids: Sequence[int]
+    ) -> list[Row]:
+        result = await session.execute(cls._rows_by_ids_statement(schema, ids))
+        return in_id_order(result.all(), ids)
+
+    @classmethod
+    async def acreate(
+        cls, session: AsyncSession, schema: BaseModel, *args, **kwargs
+    ) -> T:
+        values = schema.model_dump()
+        await session.run_sync(cls._check_one, values)
+        await cls._alock_registry(session)
+        instance = cls.model_type(**values)
+        session.add(instance)
+        await session.commit()
+        await session.refresh(instance)
+        cls.after_write([instance])
+        return instance
+
+    @classmethod
+    async def _awrite_many(
+        cls, session: AsyncSession, stmt: Insert, values: list[dict[str, Any]]
+    ) -> list[BulkOutcome[T]]:
+        errors = await session.run_sync(cls.check_values, values)
+        valid = [v for v, error in zip(values, errors) if error is None]
+        await cls._alock_registry(session)
+        outcomes: list[BulkOutcome[T]] = []
+        for chunk in _chunks(valid):
+            try:
+                async with session.begin_nested():
+                    result = await session.scalars(stmt, chunk)
+                    rows = result.all()
+                outcomes.extend(BulkOutcome(r, None) for r in rows)
+                continue
+            except DBAPIError:
+                pass
+
+            for row_values in chunk:
+                try:
+                    async with session.begin_nested():
+                        result = await session.scalars(stmt, [row_values])
+                        row = result.one()
+                    outcomes.append(BulkOutcome(row, None))
+                except DBAPIError as e:
+                    outcomes.append(BulkOutcome(None, str(e.orig)))
+
+        await session.commit()
+        written = [o.instance for o in outcomes if o.instance is not None]
+        if written:
+            cls.after_write(written)
+        return _merge_outcomes(errors, outcomes)
+
+    @classmethod
+    async def acreate_many(
+        cls, session: AsyncSession, schemas: Sequence[BaseModel]
+    ) -> list[BulkOutcome[T]]:
+        return await cls._awrite_many(
+            session, cls._insert_statement(), [s.model_dump() for s in schemas]
+        )
+
+    @classmethod
+    async def aupsert(cls, session: AsyncSession, schema: BaseModel) -> T:
+        values = schema.model_dump()
+        await session.run_sync(cls._check_one, values)
+        await cls._alock_registry(session)
+        result = await session.scalars(cls._upsert_statement(list(values)), [values])
+        instance = result.one()
+        await session.commit()
+        cls.after_write([instance])
+        return instance
+
+    @classmethod
+    async def aupsert_many(
+        cls, session: AsyncSession, schemas: Sequence[BaseModel]
+    ) -> list[BulkOutcome[T]]:
+        values = [s.model_dump() for s in schemas]
+        if not values:
+            return []
+        return await cls._awrite_many(
+            session, cls._upsert_statement(list(values[0])), values
+        )
+
+    @classmethod
+    async def aupdate(
+        cls, session: AsyncSession, id: int, schema: BaseModel, *args, **kwargs
+    ) -> Optional[T]:
+        await cls._alock_registry(session)
+        result = await session.scalars(cls._update_statement(id, schema))
+        instance = result.first()
+        if instance is not None:
+            try:
+                await session.run_sync(cls._check_one, _column_values(instance))
+            except InvalidWriteError:
+                await session.rollback()
+                raise
+        await session.commit()
+        if instance is not None:
+            cls.after_write([instance])
+        return instance
+
+    @classmethod
+    async def adelete(cls, session: AsyncSession, id: int) -> Optional[T]:
+        await cls._alock_registry(session)
+        result = await session.scalars(cls._delete_statement(id))
+        instance = result.first()
+        await session.commit()
+        if instance is not None:
+            cls.after_write([instance], deleted=True)
+        return instance
@@ -1,34 +1,99 @@
+from typing import Any, Mapping, Optional, Sequence, TypeVar
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
 import open_cec_api.services.database.models as models
-from open_cec_api.api.crud.base import CRUDClass
+from open_cec_api.api.auth import key_cache
+from open_cec_api.api.autocomplete import listing_completions
+from open_cec_api.api.crud.base import AsyncCRUDClass, CRUDClass
+from open_cec_api.api.reference import load_attribute_definitions, reference_data
+from open_cec_api.api.validation import validate_attributes
+
+T = TypeVar("T", bound=models.Base)
+
 
+class ReferenceCRUDClass(AsyncCRUDClass[T]):
+    """CRUD for a table held in memory by reference_data, which it keeps current."""
 
-class CertificateCRUD(CRUDClass[models.Certificate]):
+    @classmethod
+    def after_write(cls, rows: Sequence[T], deleted: bool = False) -> None:
+        if deleted:
+            ids = [row.id for row in rows]  # type: ignore[attr-defined]
+            reference_data.remove(cls.model_type, ids)
+        else:
+            reference_data.put(cls.model_type, rows)
+
+
+class CertificateCRUD(AsyncCRUDClass[models.Certificate]):
     model_type = models.Certificate
 
 
-class DeviceClassAttributeCRUD(CRUDClass[models.DeviceClassAttribute]):
+class ChangeCRUD(CRUDClass[models.Change]):
+    """Read side of the change log, which only the registry triggers write to."""
+
+    model_type = models.Change
+
+
+class DeviceClassAttributeCRUD(ReferenceCRUDClass[models.DeviceClassAttribute]):
     model_type = models.DeviceClassAttribute
 
 
-class DeviceClassCRUD(CRUDClass[models.DeviceClass]):
+class DeviceClassCRUD(ReferenceCRUDClass[models.DeviceClass]):
     model_type = models.DeviceClass
 
 
-class EntityTypeCRUD(CRUDClass[models.EntityType]):
+class EntityTypeCRUD(ReferenceCRUDClass[models.EntityType]):
     model_type = models.EntityType
 
 
-class KeyCRUD(CRUDClass[models.Key]):
+class KeyCRUD(AsyncCRUDClass[models.Key]):
     model_type = models.Key
 
+    @classmethod
+    def _update_values(cls, schema: BaseModel) -> dict[str, Any]:
+        values = super()._update_values(schema)
+        # a new hash invalidates the stored fingerprint unless one is supplied with it
+        if "value" in values:
+            values.setdefault("fingerprint", None)
+        return values
+
+    @classmethod
+    def after_write(cls, rows: Sequence[models.Key], deleted: bool = False) -> None:
+        key_cache.clear()
+
+
+class ListingDeviceClassAttributeCRUD(
+    AsyncCRUDClass[models.ListingDeviceClassAttribute]
+):
+    """Values are checked against the attribute definitions of their device class.
+
+    The composite foreign key to listing_device_classes ensures the listing has the
+    device class."""
 
-class ListingDeviceClassAttributeCRUD(CRUDClass[models.ListingDeviceClassAttribute]):
     model_type = models.ListingDeviceClassAttribute
 
+    @classmethod
+    def check_values(
+        cls, session: Session, values: Sequence[Mapping[str, Any]]
+    ) -> list[Optional[str]]:
+        load_attribute_definitions(
+            session, ((v["device_class_id"], v["attribute_name"]) for v in values)
+        )
+        return validate_attributes(reference_data.snapshot.validators, values)
+
 
-class ListingDeviceClassCRUD(CRUDClass[models.ListingDeviceClass]):
+class ListingDeviceClassCRUD(AsyncCRUDClass[models.ListingDeviceClass]):
     model_type = models.ListingDeviceClass
 
 
-class ListingCRUD(CRUDClass[models.Listing]):
+class ListingCRUD(AsyncCRUDClass[models.Listing]):
     model_type = models.Listing
+    upsert_keys = ("manufacturer", "model")
+
+    @classmethod
+    def after_write(cls, rows: Sequence[models.Listing], deleted: bool = False) -> None:
+        if deleted:
+            listing_completions.remove(row.id for row in rows)
+        else:
+            listing_completions.put(rows)
@@ -1,16 +1,48 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Union,
+)
 
-from sqlalchemy import select
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    Select,
+    Text,
+    cast,
+    func,
+    insert,
+    literal_column,
+    select,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload, selectinload
 
+from open_cec_api.api.crud.base import InvalidWriteError, in_id_order
+from open_cec_api.api.crud.crud import ListingCRUD, ListingDeviceClassAttributeCRUD
+from open_cec_api.api.schema.create import ListingDetailCreate
+from open_cec_api.api.schema.read import ListingBase
 from open_cec_api.services.database.models import (
+    Certificate,
     DeviceClass,
+    DeviceClassAttribute,
+    EntityType,
     Listing,
     ListingDeviceClass,
+    ListingDeviceClassAttribute,
 )
 
+EMPTY_JSON_ARRAY = literal_column("'[]'::json")
+EXPORT_BATCH_SIZE = 1000  # rows per server-side cursor fetch and per exported chunk
+
 # TODO define some extended model type,
 # make this return that model type and define or update the router endpoint to use
 # that model type as that response_model
@@ -109,3 +141,328 @@ def listing_to_detail_dict(listing: Listing) -> Dict[str, Any]:
             for c in (listing.certificates or [])
         ],
     }
+
+
+def _json_object(**fields: Any) -> ColumnElement:
+    """json_build_object with the keys inlined rather than sent as bound parameters."""
+    args: list[Any] = []
+    for key, value in fields.items():
+        args += [literal_column(f"'{key}'"), value]
+    return func.json_build_object(*args)
+
+
+def _json_list(element: ColumnElement, order_by: ColumnElement) -> ColumnElement:
+    """json_agg of ``element`` sorted by ``order_by``; ``[]`` when there are no rows."""
+    return func.coalesce(
+        func.json_agg(aggregate_order_by(element, order_by)), EMPTY_JSON_ARRAY
+    )
+
+
+def _attributes_json() -> ColumnElement:
+    """The attribute definitions of the DeviceClass in the enclosing query."""
+    return (
+        select(
+            _json_list(
+                _json_object(
+                    id=DeviceClassAttribute.id,
+                    attribute_name=DeviceClassAttribute.attribute_name,
+                    attribute_type=DeviceClassAttribute.attribute_type,
+                    description=DeviceClassAttribute.description,
+                ),
+                DeviceClassAttribute.id,
+            )
+        )
+        .where(DeviceClassAttribute.device_class_id == DeviceClass.id)
+        .scalar_subquery()
+    )
+
+
+def _device_classes_json() -> ColumnElement:
+    return (
+        select(
+            _json_list(
+                _json_object(
+                    listing_device_class_id=ListingDeviceClass.id,
+                    device_class=_json_object(
+                        id=DeviceClass.id,
+                        name=DeviceClass.name,
+                        description=DeviceClass.description,
+                        created_at=DeviceClass.created_at,
+                        attributes=_attributes_json(),
+                    ),
+                ),
+                ListingDeviceClass.id,
+            )
+        )
+        .join_from(ListingDeviceClass, DeviceClass)
+        .where(ListingDeviceClass.listing_id == Listing.id)
+        .scalar_subquery()
+    )
+
+
+def _listing_device_class_attributes_json() -> ColumnElement:
+    return (
+        select(
+            _json_list(
+                _json_object(
+                    id=ListingDeviceClassAttribute.id,
+                    listing_id=ListingDeviceClassAttribute.listing_id,
+                    device_class_id=ListingDeviceClassAttribute.device_class_id,
+                    attribute_name=ListingDeviceClassAttribute.attribute_name,
+                    attribute_value=ListingDeviceClassAttribute.attribute_value,
+                    created_at=ListingDeviceClassAttribute.created_at,
+                ),
+                ListingDeviceClassAttribute.id,
+            )
+        )
+        .where(ListingDeviceClassAttribute.listing_id == Listing.id)
+        .scalar_subquery()
+    )
+
+
+def _certificates_json() -> ColumnElement:
+    return (
+        select(
+            _json_list(
+                _json_object(
+                    id=Certificate.id,
+                    listing_id=Certificate.listing_id,
+                    expiry=Certificate.expiry,
+                    certification_date=Certificate.certification_date,
+                    certifying_body=Certificate.certifying_body,
+                    test_profiles=Certificate.test_profiles,
+                ),
+                Certificate.id,
+            )
+        )
+        .where(Certificate.listing_id == Listing.id)
+        .scalar_subquery()
+    )
+
+
+def _entity_type_name() -> ColumnElement:
+    return (
+        select(EntityType.name)
+        .where(EntityType.id == Listing.entity_type_id)
+        .scalar_subquery()
+    )
+
+
+class ListingRelation(NamedTuple):
+    key: str  # of the relation in a listing document
+    build: Callable[[], ColumnElement]  # the relation of the Listing being selected
+
+
+# relations a listing document can include, by the name a client asks for them by
+LISTING_RELATIONS: dict[str, ListingRelation] = {
+    "entity_type": ListingRelation("entity_type", _entity_type_name),
+    "device_classes": ListingRelation("device_classes", _device_classes_json),
+    "attributes": ListingRelation(
+        "listing_device_class_attributes", _listing_device_class_attributes_json
+    ),
+    "certificates": ListingRelation("certificates", _certificates_json),
+}
+
+
+def parse_include(include: str) -> list[str]:
+    """The relations named in a comma-separated list, in LISTING_RELATIONS order,
+    raising ValueError for an unknown name."""
+    names = {name.strip() for name in include.split(",")} - {""}
+    unknown = names - LISTING_RELATIONS.keys()
+    if unknown:
+        raise ValueError(
+            f"Unknown include {', '.join(sorted(unknown))}; expected any of "
+            f"{', '.join(LISTING_RELATIONS)}"
+        )
+    return [name for name in LISTING_RELATIONS if name in names]
+
+
+def listing_document(include: Sequence[str]) -> ColumnElement:
+    """A json_build_object of one listings row's ListingBase fields and the included
+    relations.
+
+    Each included relation is a correlated subquery, so only the relations asked for
+    are read at all.
+    """
+    fields = {f: getattr(Listing, f) for f in ListingBase.model_fields}
+    relations = {
+        LISTING_RELATIONS[name].key: LISTING_RELATIONS[name].build() for name in include
+    }
+    return _json_object(**fields, **relations)
+
+
+def listing_detail_document() -> ColumnElement:
+    """A json_build_object of one listings row, shaped like listing_to_detail_dict.
+
+    Each relationship is a correlated json_agg subquery, so selecting this column
+    builds the whole nested document in Postgres, in the same statement.
+    """
+    return _json_object(
+        id=Listing.id,
+        manufacturer=Listing.manufacturer,
+        model=Listing.model,
+        status=Listing.status,
+        created_at=Listing.created_at,
+        updated_at=Listing.updated_at,
+        entity_type=_entity_type_name(),
+        device_classes=_device_classes_json(),
+        listing_device_class_attributes=_listing_device_class_attributes_json(),
+        certificates=_certificates_json(),
+    )
+
+
+class DetailPage(NamedTuple):
+    documents: str  # JSON array of listing documents
+    last_id: Optional[int]  # id of the last listing in the page
+    has_more: bool  # whether another page follows
+
+
+def listing_detail_page_statement(
+    limit: int,
+    after: Optional[int] = None,
+    document: Optional[ColumnElement] = None,
+    **filters: Any,
+) -> Select:
+    """One row of (documents, last_id, has_more) for a keyset page of listings.
+
+    Uses the same filters and ordering as ListingCRUD.get. One row beyond the page is
+    fetched to tell whether another page follows, but left out of the documents. Each
+    listing is a detail document unless another ``document`` is given, e.g. from
+    listing_document.
+    """
+    if document is None:
+        document = listing_detail_document()
+    ranked = (
+        ListingCRUD._get_statement(limit=limit + 1, after=after, **filters)
+        .with_only_columns(
+            Listing.id,
+            document.label("doc"),
+            func.row_number().over(order_by=Listing.id).label("n"),
+        )
+        .subquery()
+    )
+    in_page = ranked.c.n <= limit
+
+    return select(
+        cast(
+            func.coalesce(
+                func.json_agg(aggregate_order_by(ranked.c.doc, ranked.c.id)).filter(
+                    in_page
+                ),
+                EMPTY_JSON_ARRAY,
+            ),
+            Text,
+        ),
+        func.max(ranked.c.id).filter(in_page),
+        func.count() > limit,
+    )
+
+
+def get_listing_detail_json(
+    session: Session, id: int, document: Optional[ColumnElement] = None
+) -> Optional[str]:
+    """The detail document, or the given ``document``, of one listing as JSON text, or
+    None if there is none."""
+    if document is None:
+        document = listing_detail_document()
+    stmt = select(cast(document, Text)).where(Listing.id == id)
+    return session.scalar(stmt)
+
+
+def get_listing_details_json(
+    session: Session,
+    limit: int,
+    after: Optional[int] = None,
+    document: Optional[ColumnElement] = None,
+    **filters: Any,
+) -> DetailPage:
+    stmt = listing_detail_page_statement(limit, after, document, **filters)
+    return DetailPage(*session.execute(stmt).one())
+
+
+def get_listing_documents_by_ids(
+    session: Session, ids: Sequence[int], document: ColumnElement
+) -> list[Row]:
+    """(id, document) rows of the listings with the given ids, in the order of ids,
+    with each document as JSON text."""
+    stmt = ListingCRUD._rows_by_ids_statement(ListingBase, ids).with_only_columns(
+        Listing.id, cast(document, Text).label("document")
+    )
+    return in_id_order(session.execute(stmt).all(), ids)
+
+
+def iter_listing_detail_lines(
+    session: Session, batch_size: int = EXPORT_BATCH_SIZE, **filters: Any
+) -> Iterator[str]:
+    """Detail documents of every matching listing as NDJSON, in id order.
+
+    Rows come from a server-side cursor ``batch_size`` at a time and each batch is
+    yielded as one chunk of lines, so memory use does not grow with the registry.
+    """
+    stmt = ListingCRUD._get_statement(**filters).with_only_columns(
+        cast(listing_detail_document(), Text)
+    )
+    result = session.execute(stmt, execution_options={"yield_per": batch_size})
+    for documents in result.scalars().partitions():
+        yield "".join(f"{document}\n" for document in documents)
+
+
+async def acreate_listing_detail(
+    session: AsyncSession, schema: ListingDetailCreate
+) -> str:
+    """Create a listing with its device classes, attribute values and certificates in
+    one transaction, returning its detail document as JSON text.
+
+    Attribute values are checked before anything is written. Each related table then
+    takes a single batched INSERT, and the document is read back before committing, so
+    nothing is written unless all of it is.
+    """
+    listing_values = schema.model_dump(exclude={"device_classes", "certificates"})
+    attribute_values = [
+        {"device_class_id": dc.device_class_id, **a.model_dump()}
+        for dc in schema.device_classes
+        for a in dc.attributes
+    ]
+    errors = await session.run_sync(
+        ListingDeviceClassAttributeCRUD.check_values, attribute_values
+    )
+    paths = (
+        f"device_classes[{i}].attributes[{j}]"
+        for i, dc in enumerate(schema.device_classes)
+        for j in range(len(dc.attributes))
+    )
+    rejected = [f"{path}: {e}" for path, e in zip(paths, errors) if e is not None]
+    if rejected:
+        raise InvalidWriteError("; ".join(rejected))
+
+    await ListingCRUD._alock_registry(session)
+    listing = (
+        await session.scalars(ListingCRUD._insert_statement(), [listing_values])
+    ).one()
+    related = [
+        (
+            ListingDeviceClass,
+            [
+                {"listing_id": listing.id, "device_class_id": dc.device_class_id}
+                for dc in schema.device_classes
+            ],
+        ),
+        (
+            ListingDeviceClassAttribute,
+            [{"listing_id": listing.id, **v} for v in attribute_values],
+        ),
+        (
+            Certificate,
+            [{"listing_id": listing.id, **c.model_dump()} for c in schema.certificates],
+        ),
+    ]
+    for model, values in related:
+        if values:
+            await session.execute(insert(model), values)
+
+    document = await session.scalar(
+        select(cast(listing_detail_document(), Text)).where(Listing.id == listing.id)
+    )
+    await session.commit()
+    ListingCRUD.after_write([listing])
+    return document
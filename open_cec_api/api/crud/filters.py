@@ -1,10 +1,46 @@
+from sqlalchemy import and_, select
+
 import open_cec_api.services.database.models as models
+from open_cec_api.api.crud.attributes import AttributeFilter
 
 OPERATOR_MAP = {
     "eq": lambda c, v: c == v,
     "ge": lambda c, v: c >= v,
     "ilike": lambda c, v: c.ilike(f"%{v}%"),
-    "in": lambda c, v: c.contains(v),
+    "contains": lambda c, v: c.contains(v),  # array @> v: holds all of v
+    "overlap": lambda c, v: c.overlap(v),  # array && v: holds any of v
+}
+
+
+def any_certificate(operator):
+    """Filter on Listing.certificates: some certificate's test_profiles match."""
+    return lambda c, v: c.any(operator(models.Certificate.test_profiles, v))
+
+
+LISTING_PROFILES_ALL = any_certificate(OPERATOR_MAP["contains"])
+LISTING_PROFILES_ANY = any_certificate(OPERATOR_MAP["overlap"])
+
+
+def any_device_class(c, v):
+    """Filter on Listing.id: the listing belongs to the device class with id v."""
+    return c.in_(
+        select(models.ListingDeviceClass.listing_id).where(
+            models.ListingDeviceClass.device_class_id == v
+        )
+    )
+
+
+def all_attributes(c, v: list[AttributeFilter]):
+    """Filter on Listing.id: the listing has attribute values matching every filter."""
+    return and_(*(f.matches(c) for f in v))
+
+
+# filters whose value is a list, given as a repeated query parameter
+MULTI_VALUED_FILTERS = {
+    OPERATOR_MAP["contains"],
+    OPERATOR_MAP["overlap"],
+    LISTING_PROFILES_ALL,
+    LISTING_PROFILES_ANY,
 }
 
 CLS_TO_KW_FILTERS = {
@@ -24,7 +60,8 @@ CLS_TO_KW_FILTERS = {
         "expiry": OPERATOR_MAP["ge"],
         "certification_date": OPERATOR_MAP["ge"],
         "certifying_body": OPERATOR_MAP["ilike"],
-        "test_profiles": OPERATOR_MAP["in"],
+        "test_profiles": OPERATOR_MAP["contains"],
+        "test_profiles_any": OPERATOR_MAP["overlap"],
     },
     models.EntityType: {
         "name": OPERATOR_MAP["eq"],
@@ -44,10 +81,28 @@ CLS_TO_KW_FILTERS = {
         "listing_id": OPERATOR_MAP["eq"],
         "device_class_id": OPERATOR_MAP["eq"],
     },
+    models.Change: {
+        "table_name": OPERATOR_MAP["eq"],
+    },
     models.Listing: {
         "entity_type_id": OPERATOR_MAP["eq"],
         "manufacturer": OPERATOR_MAP["ilike"],
         "model": OPERATOR_MAP["ilike"],
         "status": OPERATOR_MAP["eq"],
+        "test_profiles": LISTING_PROFILES_ALL,
+        "test_profiles_any": LISTING_PROFILES_ANY,
+        "device_class_id": any_device_class,
+        "attributes": all_attributes,
+    },
+}
+
+# filter keywords that do not share their name with the attribute they filter
+CLS_TO_KW_COLUMNS = {
+    models.Certificate: {"test_profiles_any": "test_profiles"},
+    models.Listing: {
+        "test_profiles": "certificates",
+        "test_profiles_any": "certificates",
+        "device_class_id": "id",
+        "attributes": "id",
     },
 }
@@ -0,0 +1,73 @@
+"""Ranked full-text search over the listing search documents.
+
+Each listing has a ``tsvector`` document (``ListingSearchDocument``) that triggers keep
+current, covering its manufacturer, model, device class names and attribute values.
+Queries use web search syntax and results are ordered by ``ts_rank``, best first,
+then by id, which is also the order the keyset cursor resumes in.
+"""
+
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import ColumnElement, Double, Row, Select, and_, cast, func, or_, select
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from sqlalchemy.orm import Session
+
+from open_cec_api.api.crud.crud import ListingCRUD
+from open_cec_api.api.schema.read import ListingBase
+from open_cec_api.services.database.models import (
+    SEARCH_CONFIG,
+    Listing,
+    ListingSearchDocument,
+)
+
+
+def search_statement(
+    q: str,
+    limit: Optional[int] = None,
+    after: Optional[tuple[float, int]] = None,
+    **filters: Any,
+) -> Select:
+    """ListingBase columns and a ``rank`` for listings matching q, best first.
+
+    ``after`` is the (rank, id) of the last result seen. The rank is ts_rank's real
+    widened to double precision, so it survives the round trip through a cursor exactly.
+    Matches are ranked and cut to the page on the narrow documents table, and only the
+    page is joined to listings.
+    """
+    query = func.websearch_to_tsquery(cast(SEARCH_CONFIG, REGCONFIG), q)
+    document = ListingSearchDocument.document
+    listing_id = ListingSearchDocument.listing_id
+    rank: ColumnElement[float] = cast(func.ts_rank(document, query), Double)
+
+    ranked = select(listing_id, rank.label("rank")).where(document.bool_op("@@")(query))
+    if filters:
+        matching = ListingCRUD._get_statement(**filters).order_by(None)
+        ranked = ranked.where(listing_id.in_(matching.with_only_columns(Listing.id)))
+    if after is not None:
+        after_rank, after_id = after
+        ranked = ranked.where(
+            or_(rank < after_rank, and_(rank == after_rank, listing_id > after_id))
+        )
+    ranked = ranked.order_by(rank.desc(), listing_id)
+    if limit is not None:
+        ranked = ranked.limit(limit)
+    page = ranked.subquery("ranked")
+
+    return (
+        ListingCRUD._rows_statement(ListingBase)
+        .add_columns(page.c.rank)
+        .join(page, page.c.listing_id == Listing.id)
+        .order_by(None)
+        .order_by(page.c.rank.desc(), Listing.id)
+    )
+
+
+def search_listings(
+    session: Session,
+    q: str,
+    *,
+    limit: Optional[int] = None,
+    after: Optional[tuple[float, int]] = None,
+    **filters: Any,
+) -> Sequence[Row]:
+    return session.execute(search_statement(q, limit, after, **filters)).all()
@@ -0,0 +1,229 @@
+"""Registry changes pushed to subscribers as Server-Sent Events.
+
+The registry triggers ``NOTIFY`` on ``CHANGES_CHANNEL`` when a transaction that wrote
+to the registry tables commits. Each worker holds a single ``LISTEN`` connection in its
+``ChangeHub``: on a notification the hub reads the new rows from the change log once and
+fans them out to in-process subscriber queues, so an idle subscriber holds no database
+connection. Event ids are change feed cursors, so a client reconnecting with
+``Last-Event-ID`` is first replayed what it missed from the change log.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncIterator, Collection, Optional, Sequence
+
+import orjson
+from loguru import logger
+from sqlalchemy import Row, func, select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from open_cec_api.api.crud.crud import ChangeCRUD
+from open_cec_api.api.fast_json import ORJSON_OPTIONS
+from open_cec_api.api.pagination import encode_cursor
+from open_cec_api.api.schema.changes import ChangeRecord
+from open_cec_api.services.database.db import async_engine
+from open_cec_api.services.database.models import CHANGES_CHANNEL, Change
+
+EVENT_STREAM_MEDIA_TYPE = "text/event-stream"
+
+FETCH_BATCH_SIZE = 1000  # change log rows read per query
+SUBSCRIBER_QUEUE_SIZE = 10_000  # changes buffered per subscriber before it is dropped
+KEEPALIVE_INTERVAL = 15.0  # seconds between comments on an idle stream
+POLL_INTERVAL = 30.0  # seconds between change log reads without a notification
+RECONNECT_DELAY = 5.0  # seconds before retrying a lost LISTEN connection
+LISTEN_TIMEOUT = 10.0  # seconds to wait for the hub to start listening
+RETRY_MS = 5000  # reconnection delay suggested to EventSource clients
+
+
+async def read_changes(conn: AsyncConnection, after: int) -> Sequence[Row]:
+    """The next batch of the change log after the given id."""
+    result = await conn.execute(
+        ChangeCRUD._rows_statement(ChangeRecord, FETCH_BATCH_SIZE, after)
+    )
+    return result.all()
+
+
+class Subscription:
+    """Changes published after subscribing, buffered until the subscriber reads them.
+
+    A subscriber whose buffer fills is dropped: it keeps what is buffered but gets
+    nothing more, and resumes from the change log when it reconnects.
+    """
+
+    def __init__(self, maxsize: int):
+        self._queue: asyncio.Queue[Row] = asyncio.Queue(maxsize)
+        self.dropped = False
+
+    def offer(self, row: Row) -> bool:
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped = True
+            return False
+        return True
+
+    @property
+    def exhausted(self) -> bool:
+        """Dropped and drained; nothing more will arrive."""
+        return self.dropped and self._queue.empty()
+
+    async def get(self, timeout: float) -> Optional[Row]:
+        """The next change, or None if none arrives within timeout."""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+
+class ChangeHub:
+    """One LISTEN connection per worker, fanning registry changes out to subscribers.
+
+    The hub starts listening with its first subscriber and keeps one of the engine's
+    connections until ``stop``. A lost connection is retried, after which the hub
+    catches up from the change log, so subscribers miss nothing. Requires asyncpg.
+    """
+
+    def __init__(self, engine: AsyncEngine, queue_size: int = SUBSCRIBER_QUEUE_SIZE):
+        self.engine = engine
+        self.queue_size = queue_size
+        self.last_id = 0  # the last change published
+        self._subscribers: set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._listening = asyncio.Event()
+        self._notified = asyncio.Event()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def start(self) -> None:
+        """Start listening if not already, returning once LISTEN is in effect.
+
+        Raises TimeoutError if the hub cannot listen within LISTEN_TIMEOUT.
+        """
+        if self._task is None or self._task.done():
+            self._listening = asyncio.Event()
+            self._notified = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        await asyncio.wait_for(self._listening.wait(), LISTEN_TIMEOUT)
+
+    async def stop(self) -> None:
+        """Stop listening and end every subscription once it is drained."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        for subscription in self._subscribers:
+            subscription.dropped = True
+        self._subscribers.clear()
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[Subscription]:
+        await self.start()
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._subscribers.discard(subscription)
+
+    async def replay(self, after: int) -> AsyncIterator[Row]:
+        """Changes after the given id from the change log, one pooled read per batch."""
+        while True:
+            async with self.engine.connect() as conn:
+                rows = await read_changes(conn, after)
+            for row in rows:
+                yield row
+            if len(rows) < FETCH_BATCH_SIZE:
+                return
+            after = rows[-1].id
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self.engine.connect() as conn:
+                    try:
+                        await self._listen(conn)
+                    finally:
+                        # never hand a listening connection back to the pool
+                        await conn.invalidate()
+            except Exception as e:
+                logger.warning(f"Change listener failed, retrying: {e!r}")
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _listen(self, conn: AsyncConnection) -> None:
+        # notifications are only delivered to a session outside a transaction
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.add_listener(CHANGES_CHANNEL, self._on_notify)
+        if not self._listening.is_set():
+            self.last_id = await conn.scalar(
+                select(func.coalesce(func.max(Change.id), 0))
+            )
+            self._listening.set()
+
+        while True:
+            self._notified.clear()
+            await self._publish(conn)
+            # polling too catches up after notifications lost with a connection
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._notified.wait(), POLL_INTERVAL)
+
+    def _on_notify(self, *args: Any) -> None:
+        self._notified.set()
+
+    async def _publish(self, conn: AsyncConnection) -> None:
+        """Offer every change after last_id to every subscriber."""
+        if not self._subscribers:
+            self.last_id = await conn.scalar(
+                select(func.coalesce(func.max(Change.id), self.last_id))
+            )
+            return
+
+        while True:
+            rows = await read_changes(conn, self.last_id)
+            for row in rows:
+                for subscription in list(self._subscribers):
+                    if not subscription.offer(row):
+                        self._subscribers.discard(subscription)
+            if rows:
+                self.last_id = rows[-1].id
+            if len(rows) < FETCH_BATCH_SIZE:
+                return
+
+
+change_hub = ChangeHub(async_engine)
+
+
+def format_event(row: Row) -> str:
+    data = orjson.dumps(row._asdict(), option=ORJSON_OPTIONS).decode()
+    return f"id: {encode_cursor(row.id)}\ndata: {data}\n\n"
+
+
+async def change_events(
+    hub: ChangeHub, after: Optional[int], tables: Collection[str] = ()
+) -> AsyncIterator[str]:
+    """An event stream of changes after the given id, or from now if None.
+
+    The live subscription is taken before replaying, and changes it delivers that the
+    replay already sent are skipped. ``tables`` limits the stream to those tables.
+    """
+    async with hub.subscribe() as subscription:
+        yield f"retry: {RETRY_MS}\n\n"
+
+        last_id = after
+        if after is not None:
+            async for row in hub.replay(after):
+                last_id = row.id
+                if not tables or row.table_name in tables:
+                    yield format_event(row)
+
+        while not subscription.exhausted:
+            row = await subscription.get(KEEPALIVE_INTERVAL)
+            if row is None:
+                yield ": keepalive\n\n"
+            elif last_id is not None and row.id <= last_id:
+                continue
+            elif not tables or row.table_name in tables:
+                yield format_event(row)
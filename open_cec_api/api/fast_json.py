@@ -0,0 +1,42 @@
+"""JSON list responses serialised straight from Core rows.
+
+List routes keep their Pydantic ``response_model`` for OpenAPI, but validating every
+ORM instance against it costs more than the query on large pages. Instead the routes
+select just the schema's fields (``CRUDClass.get_rows``) and encode the row tuples
+with orjson, which writes the same bytes FastAPI's ``JSONResponse`` would.
+"""
+
+from typing import Any, Sequence
+
+import orjson
+from fastapi import Response
+from sqlalchemy import Row
+
+from open_cec_api.api.pagination import NEXT_CURSOR_HEADER, PageParams, next_cursor
+
+# pydantic writes a UTC offset as "Z" where orjson would write "+00:00"
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def encode_rows(rows: Sequence[Row]) -> bytes:
+    """Encode rows as a JSON array of objects keyed by column label."""
+    return orjson.dumps([row._asdict() for row in rows], option=ORJSON_OPTIONS)
+
+
+def json_response(content: Any) -> Response:
+    """A JSON response for content already in plain types, e.g. from ``Row._asdict``."""
+    return Response(
+        content=orjson.dumps(content, option=ORJSON_OPTIONS),
+        media_type="application/json",
+    )
+
+
+def rows_page_response(rows: Sequence[Row], page: PageParams) -> Response:
+    """One page of rows fetched with ``page.limit + 1``, as split_page would return."""
+    response = Response(
+        content=encode_rows(rows[: page.limit]), media_type="application/json"
+    )
+    cursor = next_cursor(rows, page)
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return response
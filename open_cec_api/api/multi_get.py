@@ -0,0 +1,85 @@
+"""Fetching many rows by id in one request, e.g. ``?ids=3,1,2``.
+
+The rows are looked up with a single ``id = ANY(:ids)`` query and returned in the
+order the ids were given. Ids with no row are listed in the ``X-Missing-Ids`` response
+header rather than failing the request.
+"""
+
+from typing import Annotated, Any, Optional, Sequence
+
+from fastapi import Depends, HTTPException, Query, Response, status
+from sqlalchemy import Row
+
+from open_cec_api.api.fast_json import encode_rows
+from open_cec_api.api.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_RESPONSE
+
+MAX_IDS = MAX_PAGE_SIZE
+# ids are Postgres integers; a larger one would fail the query rather than miss
+MAX_ID = 2**31 - 1
+MISSING_IDS_HEADER = "X-Missing-Ids"
+
+# OpenAPI description of the headers of list routes taking ids, for their
+# ``responses``; supersedes NEXT_CURSOR_RESPONSE
+PAGE_OR_IDS_RESPONSE: dict[int | str, dict[str, Any]] = {
+    200: {
+        "headers": {
+            **NEXT_CURSOR_RESPONSE[200]["headers"],
+            MISSING_IDS_HEADER: {
+                "description": "Requested ids with no row, comma-separated",
+                "schema": {"type": "string"},
+            },
+        }
+    }
+}
+
+
+def parse_ids(ids: str) -> list[int]:
+    """The distinct ids in a comma-separated list, in order, raising ValueError if
+    any is not an id."""
+    parts = [part.strip() for part in ids.split(",")]
+    if not all(part.isascii() and part.isdigit() for part in parts):
+        raise ValueError("ids must be comma-separated integers")
+    parsed = list(dict.fromkeys(int(part) for part in parts))
+    if not all(0 < id <= MAX_ID for id in parsed):
+        raise ValueError(f"ids must be between 1 and {MAX_ID}")
+    return parsed
+
+
+def ids_param(
+    ids: Optional[str] = Query(
+        None,
+        description=f"Comma-separated ids to fetch, at most {MAX_IDS}; "
+        "takes precedence over filters and pagination",
+    ),
+) -> Optional[list[int]]:
+    if ids is None:
+        return None
+    try:
+        parsed = parse_ids(ids)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(parsed) > MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_IDS} ids may be fetched at once",
+        )
+    return parsed
+
+
+IdsDependency = Annotated[Optional[list[int]], Depends(ids_param)]
+
+
+def rows_by_ids_response(
+    rows: Sequence[Row], ids: Sequence[int], content: Optional[str] = None
+) -> Response:
+    """The rows found for ids, which are in the same order, and the ids that were
+    not found. ``content`` is the rows as a JSON array, if not encode_rows(rows)."""
+    response = Response(
+        content=encode_rows(rows) if content is None else content,
+        media_type="application/json",
+    )
+    found = {row.id for row in rows}
+    missing = [str(id) for id in ids if id not in found]
+    if missing:
+        response.headers[MISSING_IDS_HEADER] = ",".join(missing)
+    return response
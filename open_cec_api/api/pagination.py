@@ -0,0 +1,108 @@
+"""Keyset pagination over primary keys.
+
+List endpoints are ordered by ``id`` and resume after the last id a client saw, so
+every page is a bounded index range scan however deep into the table it starts.
+The position is handed to clients as an opaque cursor in the ``X-Next-Cursor``
+response header, which is absent on the last page.
+"""
+
+import base64
+import binascii
+import math
+from typing import Annotated, Any, NamedTuple, Optional, Sequence, TypeVar
+
+from fastapi import Depends, HTTPException, Query, Response, status
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# OpenAPI description of the header, for the ``responses`` of list routes
+NEXT_CURSOR_RESPONSE: dict[int | str, dict[str, Any]] = {
+    200: {
+        "headers": {
+            NEXT_CURSOR_HEADER: {
+                "description": "Pass as `cursor` to fetch the next page",
+                "schema": {"type": "string"},
+            }
+        }
+    }
+}
+
+T = TypeVar("T")
+
+
+class PageParams(NamedTuple):
+    limit: int
+    after: Optional[int]  # id to resume after; None for the first page
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Return the id a cursor resumes after, raising ValueError if it is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, _, last_id = base64.urlsafe_b64decode(padded).decode().partition(":")
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if prefix != "id" or not last_id.isdigit():
+        raise ValueError("Invalid cursor")
+    return int(last_id)
+
+
+def encode_rank_cursor(rank: float, last_id: int) -> str:
+    """Cursor for results ordered by descending rank, then by id."""
+    raw = f"rank:{rank!r}:{last_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> tuple[float, int]:
+    """Return the (rank, id) a rank cursor resumes after, raising ValueError if it is
+    malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, rank, last_id = base64.urlsafe_b64decode(padded).decode().split(":")
+        parsed_rank = float(rank)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if prefix != "rank" or not math.isfinite(parsed_rank) or not last_id.isdigit():
+        raise ValueError("Invalid cursor")
+    return parsed_rank, int(last_id)
+
+
+def page_params(
+    limit: int = Query(
+        DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"
+    ),
+    cursor: Optional[str] = Query(
+        None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"
+    ),
+) -> PageParams:
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    return PageParams(limit, after)
+
+
+PageDependency = Annotated[PageParams, Depends(page_params)]
+
+
+def next_cursor(rows: Sequence[Any], page: PageParams) -> Optional[str]:
+    """Cursor for the page after rows fetched with ``page.limit + 1``, if any."""
+    if len(rows) > page.limit:
+        return encode_cursor(getattr(rows[page.limit - 1], "id"))
+    return None
+
+
+def split_page(rows: Sequence[T], page: PageParams, response: Response) -> list[T]:
+    """Trim rows fetched with ``page.limit + 1`` to one page, setting the next cursor."""
+    cursor = next_cursor(rows, page)
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return list(rows[: page.limit])
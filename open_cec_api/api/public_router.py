@@ -1,12 +1,74 @@
-from typing import Annotated, Optional
+from typing import Annotated, Any, Callable, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from open_cec_api.api.auth import check_key_header
-from open_cec_api.api.crud.crud import ListingCRUD
+from open_cec_api.api.autocomplete import (
+    DEFAULT_COMPLETIONS,
+    MAX_COMPLETIONS,
+    CompletionField,
+    listing_completions,
+)
+from open_cec_api.api.change_log import PRUNED_CHANGE_ID, check_cursor_retained
+from open_cec_api.api.conditional import (
+    NOT_MODIFIED_RESPONSE,
+    RegistryValidatorsDependency,
+)
+from open_cec_api.api.crud.attributes import ATTRIBUTE_FILTER_PREFIX, AttributeFilter
+from open_cec_api.api.crud.crud import ChangeCRUD, ListingCRUD
+from open_cec_api.api.crud.extended import (
+    LISTING_RELATIONS,
+    DetailPage,
+    get_listing_detail_json,
+    get_listing_details_json,
+    get_listing_documents_by_ids,
+    iter_listing_detail_lines,
+    listing_document,
+    parse_include,
+)
+from open_cec_api.api.crud.search import search_listings
+from open_cec_api.api.events import (
+    EVENT_STREAM_MEDIA_TYPE,
+    change_events,
+    change_hub,
+)
+from open_cec_api.api.fast_json import encode_rows, json_response, rows_page_response
+from open_cec_api.api.multi_get import (
+    PAGE_OR_IDS_RESPONSE,
+    IdsDependency,
+    rows_by_ids_response,
+)
+from open_cec_api.api.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    NEXT_CURSOR_HEADER,
+    NEXT_CURSOR_RESPONSE,
+    PageDependency,
+    decode_cursor,
+    decode_rank_cursor,
+    encode_cursor,
+    encode_rank_cursor,
+    page_params,
+)
+from open_cec_api.api.reference import load_reference_name, reference_data
+from open_cec_api.api.schema.changes import ChangeFeed, ChangeRecord
+from open_cec_api.api.schema.detail import ListingDetail, ListingWithRelations
 from open_cec_api.api.schema.read import ListingBase
+from open_cec_api.api.schema.search import ListingSearchHit
+from open_cec_api.api.streaming import NDJSON_MEDIA_TYPE, ndjson_response
 from open_cec_api.services.database.db import get_db_session
+from open_cec_api.services.database.models import DeviceClass, EntityType
 
 HeaderDependency = Depends(check_key_header)
 SessionDependency = Annotated[Session, Depends(get_db_session)]
@@ -14,12 +76,6 @@ SessionDependency = Annotated[Session, Depends(get_db_session)]
 # We cannot pass the SessionDependency directly to the APIRouter
 public_router = APIRouter(dependencies=[HeaderDependency], tags=["Public"])
 
-# TODO we may wish to define endpoints which allow the user to perform extended
-# operations (e.g. create listings with associated cert in one step, or get
-# listings with their certs in one call, etc)
-
-ENTITY_MAP = {None: None, "client": 1, "server": 2}
-
 
 @public_router.get("/")
 def status_check(session: SessionDependency) -> dict[str, str]:
@@ -29,31 +85,410 @@ def status_check(session: SessionDependency) -> dict[str, str]:
     return {"API Status": "UP", "Database Status": "UP" if session else "DOWN"}
 
 
-# TODO add a filter by time created or updated
-@public_router.get("/listings", response_model=ListingBase | list[ListingBase])
-def get_listings(
-    session: SessionDependency,
-    id: Optional[int] = Query(None, description="Listing ID to fetch"),
-    entity_type: Optional[str] = Query(None),
+def reference_id(
+    session: Session,
+    model: type[EntityType] | type[DeviceClass],
+    lookup: Callable[[str], Optional[int]],
+    name: Optional[str],
+    kind: str,
+) -> Optional[int]:
+    """The id of the reference row called name, looked up in memory; 400 if unknown.
+
+    A name missing from memory is looked up in the database before it is rejected, as
+    it may have been written by another worker since this one loaded its snapshot.
+    """
+    if name is None:
+        return None
+    id = lookup(name)
+    if id is None:
+        load_reference_name(session, model, name)
+        id = lookup(name)
+    if id is None:
+        raise HTTPException(status_code=400, detail=f"Unknown {kind} {name!r}")
+    return id
+
+
+def listing_filters(
+    request: Request,
+    entity_type: Optional[str] = Query(None, description="Entity type name"),
+    device_class: Optional[str] = Query(
+        None, description="Only listings of the device class with this name"
+    ),
     manufacturer: Optional[str] = Query(None),
     model: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
-):
+    test_profiles: Optional[list[str]] = Query(
+        None, description="Only listings with a certificate covering all of these"
+    ),
+    test_profiles_any: Optional[list[str]] = Query(
+        None, description="Only listings with a certificate covering any of these"
+    ),
+    session: Session = Depends(get_db_session),
+) -> dict[str, Any]:
+    """Query parameters shared by the listing routes, as ListingCRUD filters.
+
+    Besides the declared parameters, any number of attribute filters may be given as
+    attr.<name><operator><value>, e.g. attr.capacity>=10 or attr.chemistry=LiFePO4;
+    see AttributeFilter.
+    """
+    try:
+        # attr.capacity>=10 arrives as the key "attr.capacity>" and the value "10"
+        attributes = [
+            AttributeFilter.parse(f"{key}={value}" if value else key)
+            for key, value in request.query_params.multi_items()
+            if key.startswith(ATTRIBUTE_FILTER_PREFIX)
+        ]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    filters = {
+    return {
         k: v
         for k, v in {
-            "entity_type_id": ENTITY_MAP.get(entity_type, None),
+            "entity_type_id": reference_id(
+                session,
+                EntityType,
+                reference_data.entity_type_id,
+                entity_type,
+                "entity type",
+            ),
+            "device_class_id": reference_id(
+                session,
+                DeviceClass,
+                reference_data.device_class_id,
+                device_class,
+                "device class",
+            ),
             "manufacturer": manufacturer,
             "model": model,
             "status": status,
+            "test_profiles": test_profiles,
+            "test_profiles_any": test_profiles_any,
+            "attributes": attributes or None,
         }.items()
         if v is not None
     }
 
-    result = ListingCRUD.get(session, id=id, **filters)
 
-    if result is None:
-        raise HTTPException(status_code=404, detail="Listing not found")
+ListingFiltersDependency = Annotated[dict[str, Any], Depends(listing_filters)]
+
+
+def include_param(
+    include: Optional[str] = Query(
+        None,
+        description="Comma-separated relations to include in each listing: "
+        f"{', '.join(LISTING_RELATIONS)}",
+    ),
+) -> list[str]:
+    if include is None:
+        return []
+    try:
+        return parse_include(include)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+IncludeDependency = Annotated[list[str], Depends(include_param)]
+
+
+def documents_page_response(page: DetailPage, headers: dict[str, str]) -> Response:
+    response = Response(
+        content=page.documents, media_type="application/json", headers=headers
+    )
+    if page.has_more and page.last_id is not None:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(page.last_id)
+    return response
+
+
+# TODO add a filter by time created or updated
+@public_router.get(
+    "/listings",
+    response_model=ListingWithRelations | list[ListingWithRelations],
+    responses={**PAGE_OR_IDS_RESPONSE, **NOT_MODIFIED_RESPONSE},
+)
+def get_listings(
+    session: SessionDependency,
+    page: PageDependency,
+    filters: ListingFiltersDependency,
+    validators: RegistryValidatorsDependency,
+    ids: IdsDependency,
+    include: IncludeDependency,
+    id: Optional[int] = Query(None, description="Listing ID to fetch"),
+):
+    """Listings in id order, or one by id, or several by ids in the order given.
+
+    Besides the parameters below, listings can be filtered on their attribute values
+    with any number of attr.<name><operator><value> parameters, where the operator is
+    one of =, >, >=, < or <=, e.g. attr.capacity>=10&attr.chemistry=LiFePO4.
+
+    Relations named in include are added to each listing as in /listings/detail, e.g.
+    include=certificates. Only the relations asked for are read.
+    """
+    # with include, Postgres builds each listing's JSON; see listing_document
+    document = listing_document(include) if include else None
+
+    if id is not None:
+        response: Optional[Response] = None
+        if document is not None:
+            found = get_listing_detail_json(session, id, document)
+            if found is not None:
+                response = Response(content=found, media_type="application/json")
+        else:
+            rows = ListingCRUD.get_rows_by_ids(session, ListingBase, [id])
+            if rows:
+                response = json_response(rows[0]._asdict())
+        if response is None:
+            raise HTTPException(status_code=404, detail="Listing not found")
+        response.headers.update(validators)
+        return response
+
+    if ids is not None:
+        if document is not None:
+            documents = get_listing_documents_by_ids(session, ids, document)
+            content = f"[{','.join(row.document for row in documents)}]"
+            ids_response = rows_by_ids_response(documents, ids, content)
+        else:
+            rows = ListingCRUD.get_rows_by_ids(session, ListingBase, ids)
+            ids_response = rows_by_ids_response(rows, ids)
+        ids_response.headers.update(validators)
+        return ids_response
+
+    if document is not None:
+        result = get_listing_details_json(
+            session, page.limit, page.after, document, **filters
+        )
+        return documents_page_response(result, validators)
+
+    # lists skip response_model validation; see fast_json
+    rows = ListingCRUD.get_rows(
+        session, ListingBase, limit=page.limit + 1, after=page.after, **filters
+    )
+    page_response = rows_page_response(rows, page)
+    page_response.headers.update(validators)
+    return page_response
+
+
+@public_router.get(
+    "/listings/detail",
+    response_model=ListingDetail | list[ListingDetail],
+    responses={**NEXT_CURSOR_RESPONSE, **NOT_MODIFIED_RESPONSE},
+)
+def get_listing_details(
+    session: SessionDependency,
+    page: PageDependency,
+    filters: ListingFiltersDependency,
+    validators: RegistryValidatorsDependency,
+    id: Optional[int] = Query(None, description="Listing ID to fetch"),
+):
+    """Listings with their entity type, device classes, attributes and certificates.
+
+    The documents are built by Postgres in a single query and returned as is.
+    """
+    if id is not None:
+        document = get_listing_detail_json(session, id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Listing not found")
+        return Response(
+            content=document, media_type="application/json", headers=validators
+        )
+
+    result = get_listing_details_json(session, page.limit, page.after, **filters)
+    return documents_page_response(result, validators)
+
+
+@public_router.get(
+    "/listings/search",
+    response_model=list[ListingSearchHit],
+    responses={**NEXT_CURSOR_RESPONSE, **NOT_MODIFIED_RESPONSE},
+)
+def get_listing_search(
+    session: SessionDependency,
+    filters: ListingFiltersDependency,
+    validators: RegistryValidatorsDependency,
+    q: str = Query(
+        ...,
+        min_length=1,
+        max_length=256,
+        description='Words to find; supports "quoted phrases", or, and -exclusions',
+    ),
+    limit: int = Query(
+        DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"
+    ),
+    cursor: Optional[str] = Query(
+        None, description=f"Value of the previous page's {NEXT_CURSOR_HEADER} header"
+    ),
+):
+    """Listings matching q in their manufacturer, model, device class names or attribute
+    values, best match first.
+
+    Matches on the manufacturer and model rank above matches on device classes, which
+    rank above matches on attribute values. Words are stemmed, so "batteries" finds
+    "battery".
+    """
+    try:
+        after = decode_rank_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+
+    # lists skip response_model validation; see fast_json
+    rows = search_listings(session, q, limit=limit + 1, after=after, **filters)
+    response = Response(
+        content=encode_rows(rows[:limit]),
+        media_type="application/json",
+        headers=validators,
+    )
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_rank_cursor(last.rank, last.id)
+    return response
+
+
+@public_router.get("/listings/autocomplete", response_model=list[str])
+async def autocomplete_listings(
+    prefix: str = Query(
+        ..., min_length=1, max_length=255, description="What has been typed so far"
+    ),
+    field: CompletionField = Query(
+        "manufacturer", description="Whether to complete manufacturers or models"
+    ),
+    limit: int = Query(
+        DEFAULT_COMPLETIONS,
+        ge=1,
+        le=MAX_COMPLETIONS,
+        description="Most completions to return",
+    ),
+):
+    """Manufacturers or models with a word starting with prefix, for type-ahead.
+
+    Served from an in-memory index in each worker without querying the database, so it
+    is cheap enough to call on every keystroke. Matching ignores case and accents.
+    """
+    return listing_completions.complete(field, prefix, limit)
+
+
+@public_router.head("/listings", responses=NOT_MODIFIED_RESPONSE)
+@public_router.head("/listings/detail", responses=NOT_MODIFIED_RESPONSE)
+@public_router.head("/listings/search", responses=NOT_MODIFIED_RESPONSE)
+def check_listings(validators: RegistryValidatorsDependency) -> Response:
+    """The ETag and Last-Modified that a GET would return, without running its query.
+
+    Conditional HEAD requests are answered 304 like conditional GETs.
+    """
+    return Response(headers=validators)
+
+
+@public_router.get(
+    "/listings/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "One listing detail document per line",
+            "content": {NDJSON_MEDIA_TYPE: {}},
+        }
+    },
+)
+def export_listings(
+    request: Request,
+    session: SessionDependency,
+    filters: ListingFiltersDependency,
+):
+    """Every listing in the same shape as /listings/detail, as newline-delimited JSON.
+
+    The registry is streamed from a server-side cursor rather than paginated, and is
+    gzip compressed when the request accepts it.
+    """
+    return ndjson_response(request, iter_listing_detail_lines(session, **filters))
+
+
+@public_router.get(
+    "/changes",
+    response_model=ChangeFeed,
+    responses={410: {"description": "The changes after the cursor have been pruned"}},
+)
+def get_changes(
+    session: SessionDependency,
+    since: Optional[str] = Query(
+        None, description="next_cursor of the previous page; omit to start over"
+    ),
+    limit: int = Query(
+        DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Page size"
+    ),
+):
+    """Writes to the registry tables, in the order they were committed.
+
+    Inserts and updates carry the row as written; deletes are tombstones without data.
+    A mirror applies each page and keeps its next_cursor, which is returned even when
+    the feed is caught up, to poll for later changes. Changes are kept for
+    change_retention_days; a cursor from before the pruned changes is answered with
+    410, and the mirror reads the registry in full again.
+    """
+    page = page_params(limit=limit, cursor=since)
+    check_cursor_retained(page.after, session.scalar(PRUNED_CHANGE_ID))
+    # lists skip response_model validation; see fast_json
+    rows = ChangeCRUD.get_rows(
+        session, ChangeRecord, limit=page.limit + 1, after=page.after
+    )
+    changes = rows[: page.limit]
+    last_id = changes[-1].id if changes else (page.after or 0)
+    return json_response(
+        {
+            "changes": [row._asdict() for row in changes],
+            "next_cursor": encode_cursor(last_id),
+            "has_more": len(rows) > page.limit,
+        }
+    )
+
+
+@public_router.get(
+    "/changes/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Server-Sent Events, one per change, with data as in /changes",
+            "content": {EVENT_STREAM_MEDIA_TYPE: {}},
+        },
+        410: {"description": "The changes after the cursor have been pruned"},
+        503: {"description": "Change notifications are unavailable"},
+    },
+)
+async def stream_changes(
+    last_event_id: Optional[str] = Header(
+        None, description="id of the last event received; sent by EventSource"
+    ),
+    since: Optional[str] = Query(
+        None, description="Cursor to start after, from /changes or an event id"
+    ),
+    tables: Optional[list[str]] = Query(
+        None, description="Only changes to these tables, e.g. listings, certificates"
+    ),
+):
+    """Changes to the registry tables as they are committed, as Server-Sent Events.
+
+    Each event's id is a change feed cursor. A client resuming from one, through
+    Last-Event-ID or since, is first sent the changes it missed; otherwise the stream
+    starts from now. Idle streams carry a keepalive comment.
+    """
+    cursor = last_event_id or since
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
+    if after is not None:
+        async with change_hub.engine.connect() as conn:
+            check_cursor_retained(after, await conn.scalar(PRUNED_CHANGE_ID))
+    try:
+        await change_hub.start()
+    except TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Change notifications are unavailable",
+        )
 
-    return result
+    return StreamingResponse(
+        change_events(change_hub, after, tables or ()),
+        media_type=EVENT_STREAM_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,235 @@
+"""Entity types, device classes and attribute definitions, served from memory.
+
+These tables are small and rarely written, but are consulted on most requests, e.g. to
+resolve an entity type or device class name given as a filter. Each worker loads them
+at startup. The CRUD classes of the three tables patch them as they commit writes, and
+they are reloaded every ``reference_refresh_interval`` seconds to pick up writes made
+by other workers or outside the API.
+"""
+
+import asyncio
+import threading
+from types import MappingProxyType
+from typing import Any, Iterable, Mapping, NamedTuple, Optional
+
+from loguru import logger
+from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from open_cec_api.api.validation import AttributeValidator
+from open_cec_api.services.database.db import ensure_session
+from open_cec_api.services.database.models import (
+    Base,
+    DeviceClass,
+    DeviceClassAttribute,
+    EntityType,
+)
+
+
+class ReferenceSettings(BaseSettings):
+    # seconds between full reloads of the reference data; 0 never reloads
+    reference_refresh_interval: float = 60.0
+
+    model_config = SettingsConfigDict(
+        env_file=".env", env_prefix="OPEN_CEC_API_", extra="allow"
+    )
+
+
+reference_settings = ReferenceSettings()
+
+
+class EntityTypeRecord(NamedTuple):
+    id: int
+    name: str
+
+
+class DeviceClassRecord(NamedTuple):
+    id: int
+    name: str
+
+
+class AttributeDefinition(NamedTuple):
+    id: int
+    device_class_id: int
+    attribute_name: str
+    attribute_type: str
+
+
+RECORD_TYPES: dict[type[Base], type[NamedTuple]] = {
+    EntityType: EntityTypeRecord,
+    DeviceClass: DeviceClassRecord,
+    DeviceClassAttribute: AttributeDefinition,
+}
+
+
+class ReferenceSnapshot(NamedTuple):
+    """Lookups derived from the reference tables at one point in time."""
+
+    entity_type_ids: Mapping[str, int]
+    device_class_ids: Mapping[str, int]
+    # attribute name to attribute type, by device class id
+    attribute_types: Mapping[int, Mapping[str, str]]
+    # compiled from attribute_types, by device class id
+    validators: Mapping[int, AttributeValidator]
+
+
+def build_snapshot(tables: Mapping[type[Base], Mapping[int, Any]]) -> ReferenceSnapshot:
+    attribute_types: dict[int, dict[str, str]] = {}
+    for definition in tables[DeviceClassAttribute].values():
+        attribute_types.setdefault(definition.device_class_id, {})[
+            definition.attribute_name
+        ] = definition.attribute_type
+    return ReferenceSnapshot(
+        entity_type_ids=MappingProxyType(
+            {r.name: r.id for r in tables[EntityType].values()}
+        ),
+        device_class_ids=MappingProxyType(
+            {r.name: r.id for r in tables[DeviceClass].values()}
+        ),
+        attribute_types=MappingProxyType(
+            {id: MappingProxyType(types) for id, types in attribute_types.items()}
+        ),
+        validators=MappingProxyType(
+            {id: AttributeValidator(types) for id, types in attribute_types.items()}
+        ),
+    )
+
+
+class ReferenceData:
+    """The reference tables by id, and a snapshot of the lookups derived from them.
+
+    Writers take a lock and replace the snapshot whole, so readers never block and
+    always see one consistent version of the tables.
+    """
+
+    def __init__(self) -> None:
+        self._tables: dict[type[Base], dict[int, Any]] = {
+            model: {} for model in RECORD_TYPES
+        }
+        self._lock = threading.Lock()
+        self.snapshot = build_snapshot(self._tables)
+
+    def load(self, tables: Mapping[type[Base], Iterable[Any]]) -> None:
+        """Replace the contents with rows of each reference model."""
+        loaded = {
+            model: {row.id: self._record(model, row) for row in tables.get(model, ())}
+            for model in RECORD_TYPES
+        }
+        with self._lock:
+            self._tables = loaded
+            self.snapshot = build_snapshot(loaded)
+
+    def put(self, model: type[Base], rows: Iterable[Any]) -> None:
+        """Add or update rows of one reference model."""
+        with self._lock:
+            table = self._tables[model]
+            for row in rows:
+                table[row.id] = self._record(model, row)
+            self.snapshot = build_snapshot(self._tables)
+
+    def remove(self, model: type[Base], ids: Iterable[int]) -> None:
+        with self._lock:
+            table = self._tables[model]
+            for id in ids:
+                table.pop(id, None)
+            self.snapshot = build_snapshot(self._tables)
+
+    @staticmethod
+    def _record(model: type[Base], row: Any) -> NamedTuple:
+        record_type = RECORD_TYPES[model]
+        return record_type._make(getattr(row, f) for f in record_type._fields)
+
+    def entity_type_id(self, name: str) -> Optional[int]:
+        return self.snapshot.entity_type_ids.get(name)
+
+    def device_class_id(self, name: str) -> Optional[int]:
+        return self.snapshot.device_class_ids.get(name)
+
+    def defines(self, device_class_id: int, attribute_name: str) -> bool:
+        validator = self.snapshot.validators.get(device_class_id)
+        return validator is not None and validator.defines(attribute_name)
+
+    def attribute_types(self, device_class_id: int) -> Mapping[str, str]:
+        """Attribute name to attribute type for a device class, empty if unknown."""
+        return self.snapshot.attribute_types.get(device_class_id, MappingProxyType({}))
+
+
+reference_data = ReferenceData()
+
+
+def load_reference_data(session: Session) -> None:
+    reference_data.load(
+        {
+            model: session.execute(
+                select(*(getattr(model, f) for f in record_type._fields))
+            )
+            for model, record_type in RECORD_TYPES.items()
+        }
+    )
+    snapshot = reference_data.snapshot
+    logger.info(
+        f"Loaded {len(snapshot.entity_type_ids)} entity types and "
+        f"{len(snapshot.device_class_ids)} device classes"
+    )
+
+
+def load_reference_name(
+    session: Session, model: type[EntityType] | type[DeviceClass], name: str
+) -> None:
+    """Fetch the entity type or device class called name, which this worker does not
+    know, as it may have been written elsewhere since it loaded them.
+
+    Names are unique, so this is one index lookup, and a name that is defined nowhere
+    leaves the snapshot alone.
+    """
+    record_type = RECORD_TYPES[model]
+    rows = session.execute(
+        select(*(getattr(model, f) for f in record_type._fields)).where(
+            model.name == name
+        )
+    ).all()
+    if rows:
+        reference_data.put(model, rows)
+
+
+def load_attribute_definitions(
+    session: Session, keys: Iterable[tuple[int, str]]
+) -> None:
+    """Fetch the definitions of the (device_class_id, attribute_name) pairs this worker
+    does not know, as they may have been written elsewhere since it loaded them.
+
+    Only the missing pairs are queried, by their unique key, so a name that is defined
+    nowhere costs one index lookup and leaves the snapshot alone.
+    """
+    missing = {key for key in keys if not reference_data.defines(*key)}
+    if not missing:
+        return
+    rows = session.execute(
+        select(
+            *(getattr(DeviceClassAttribute, f) for f in AttributeDefinition._fields)
+        ).where(
+            tuple_(
+                DeviceClassAttribute.device_class_id,
+                DeviceClassAttribute.attribute_name,
+            ).in_(sorted(missing))
+        )
+    ).all()
+    if rows:
+        reference_data.put(DeviceClassAttribute, rows)
+
+
+def reload_reference_data() -> None:
+    with ensure_session() as session:
+        load_reference_data(session)
+
+
+async def refresh_reference_data(interval: float) -> None:
+    """Reload the reference data every interval seconds, off the event loop, until
+    cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(reload_reference_data)
+        except Exception as e:
+            logger.warning(f"Reloading reference data failed: {e!r}")
@@ -0,0 +1,19 @@
+"""Response models for bulk operations"""
+
+from typing import Generic, Optional, TypeVar
+
+from pydantic import BaseModel
+
+ItemT = TypeVar("ItemT", bound=BaseModel)
+
+
+class BulkItemResult(BaseModel, Generic[ItemT]):
+    index: int  # position of the item in the request body
+    item: Optional[ItemT] = None  # the stored row, if the item succeeded
+    error: Optional[str] = None  # why the item failed, otherwise
+
+
+class BulkResult(BaseModel, Generic[ItemT]):
+    succeeded: int
+    failed: int
+    results: list[BulkItemResult[ItemT]]
@@ -0,0 +1,25 @@
+"""Response models for the registry change feed"""
+
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel, Field
+
+from open_cec_api.api.schema.enums import ChangeOperationEnum
+
+
+class ChangeRecord(BaseModel):
+    id: int
+    table_name: str
+    row_id: Optional[int] = None  # null for a truncate, which covers the whole table
+    operation: ChangeOperationEnum
+    data: Optional[dict[str, Any]] = None  # the row as written; null for deletes
+    changed_at: datetime
+
+
+class ChangeFeed(BaseModel):
+    changes: list[ChangeRecord]
+    next_cursor: str = Field(
+        ..., description="Pass as `since` to fetch the changes after this page"
+    )
+    has_more: bool  # whether the next page is already available
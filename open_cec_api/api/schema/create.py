@@ -10,6 +10,11 @@ from open_cec_api.api.schema.enums import AttributeTypeEnum, StatusEnum
 
 class KeyCreate(BaseModel):
     value: str = Field(..., max_length=50, description="The hashed API key")
+    fingerprint: Optional[str] = Field(
+        default=None,
+        max_length=64,
+        description="HMAC-SHA256 fingerprint of the API key (see generate_hash.py)",
+    )
     description: str
 
 
@@ -59,3 +64,28 @@ class CertificateCreate(BaseModel):
     certification_date: date
     certifying_body: str = Field(..., max_length=100)
     test_profiles: Optional[list[str]] = None
+
+
+class ListingAttributeValueCreate(BaseModel):
+    attribute_name: str = Field(..., max_length=100)
+    attribute_value: Optional[str] = None
+
+
+class ListingDeviceClassDetailCreate(BaseModel):
+    device_class_id: int
+    attributes: list[ListingAttributeValueCreate] = []
+
+
+class ListingCertificateCreate(BaseModel):
+    expiry: date
+    certification_date: date
+    certifying_body: str = Field(..., max_length=100)
+    test_profiles: Optional[list[str]] = None
+
+
+class ListingDetailCreate(ListingCreate):
+    """A listing with its device classes, their attribute values and its certificates,
+    to be created together."""
+
+    device_classes: list[ListingDeviceClassDetailCreate] = []
+    certificates: list[ListingCertificateCreate] = []
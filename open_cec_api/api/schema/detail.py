@@ -0,0 +1,76 @@
+"""Response models for the nested listing detail document.
+
+The document is built by Postgres (see crud/extended.py) and passed through as JSON,
+so these models describe the response in OpenAPI but are not used to validate it.
+"""
+
+from datetime import date, datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+from open_cec_api.api.schema.enums import AttributeTypeEnum, StatusEnum
+from open_cec_api.api.schema.read import ListingBase
+
+
+class DeviceClassAttributeDetail(BaseModel):
+    id: int
+    attribute_name: str
+    attribute_type: AttributeTypeEnum
+    description: Optional[str] = None
+
+
+class DeviceClassDetail(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    created_at: Optional[datetime] = None
+    attributes: list[DeviceClassAttributeDetail]
+
+
+class ListingDeviceClassDetail(BaseModel):
+    listing_device_class_id: int
+    device_class: DeviceClassDetail
+
+
+class ListingDeviceClassAttributeDetail(BaseModel):
+    id: int
+    listing_id: int
+    device_class_id: int
+    attribute_name: str
+    attribute_value: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class CertificateDetail(BaseModel):
+    id: int
+    listing_id: int
+    expiry: date
+    certification_date: date
+    certifying_body: str
+    test_profiles: list[str]
+
+
+class ListingDetail(BaseModel):
+    id: int
+    manufacturer: str
+    model: str
+    status: StatusEnum
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    entity_type: Optional[str] = None  # entity type name
+    device_classes: list[ListingDeviceClassDetail]
+    listing_device_class_attributes: list[ListingDeviceClassAttributeDetail]
+    certificates: list[CertificateDetail]
+
+
+class ListingWithRelations(ListingBase):
+    """A listing from /listings with the relations named in include; the others are
+    absent rather than null."""
+
+    entity_type: Optional[str] = None  # entity type name
+    device_classes: Optional[list[ListingDeviceClassDetail]] = None
+    listing_device_class_attributes: Optional[
+        list[ListingDeviceClassAttributeDetail]
+    ] = None
+    certificates: Optional[list[CertificateDetail]] = None
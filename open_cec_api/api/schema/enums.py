@@ -12,3 +12,10 @@ class AttributeTypeEnum(str, Enum):
     number = "number"
     boolean = "boolean"
     enum = "enum"
+
+
+class ChangeOperationEnum(str, Enum):
+    insert = "insert"
+    update = "update"
+    delete = "delete"
+    truncate = "truncate"
@@ -0,0 +1,9 @@
+"""Response models for listing search"""
+
+from pydantic import Field
+
+from open_cec_api.api.schema.read import ListingBase
+
+
+class ListingSearchHit(ListingBase):
+    rank: float = Field(..., description="Relevance to the query; higher is better")
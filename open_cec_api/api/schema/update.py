@@ -11,6 +11,7 @@ from open_cec_api.api.schema.enums import AttributeTypeEnum, StatusEnum
 # Update models (for PATCH operations)
 class KeyUpdate(BaseModel):
     value: Optional[str] = Field(default=None, max_length=50)
+    fingerprint: Optional[str] = Field(default=None, max_length=64)
     description: Optional[str] = None
 
 
@@ -1,3 +1,4 @@
+import asyncio
 import os
 from contextlib import asynccontextmanager
 
@@ -5,8 +6,24 @@ from fastapi import FastAPI
 from loguru import logger
 
 from open_cec_api.api.admin_router import admin_router
+from open_cec_api.api.auth import listen_for_key_changes
+from open_cec_api.api.autocomplete import (
+    autocomplete_settings,
+    refresh_listing_completions,
+    reload_listing_completions,
+)
+from open_cec_api.api.change_log import (
+    change_log_settings,
+    prune_change_log_periodically,
+)
+from open_cec_api.api.events import change_hub
 from open_cec_api.api.public_router import public_router
-from open_cec_api.services.database.db import engine, ensure_session
+from open_cec_api.api.reference import (
+    reference_settings,
+    refresh_reference_data,
+    reload_reference_data,
+)
+from open_cec_api.services.database.db import async_engine, engine, ensure_session
 from open_cec_api.services.database.initialisation import init_db
 from open_cec_api.services.database.models import Base
 
@@ -37,8 +54,8 @@ async def lifespan(app: FastAPI):
         raise ValueError(f"Invalid run environment: {run_env}")
 
     # Create the database tables if dev environment
-    # this will be handled by alembic migrations in prod
-    # and perform db initialization
+    # and perform db initialization; in prod the schema is kept up to date by the
+    # scripts in deploy/migrations
     if run_env == "dev":
         logger.info("Creating database tables")
         reset_db()  # type: ignore[arg-type]
@@ -46,9 +63,34 @@ async def lifespan(app: FastAPI):
     app.include_router(public_router)
     app.include_router(admin_router)
 
+    # Load the in-memory reference data and autocomplete index, and reload them
+    # periodically to pick up writes made by other workers; prune the change log too
+    reload_reference_data()
+    reload_listing_completions()
+    refreshes = [
+        asyncio.create_task(refresh(interval))
+        for refresh, interval in [
+            (refresh_reference_data, reference_settings.reference_refresh_interval),
+            (
+                refresh_listing_completions,
+                autocomplete_settings.autocomplete_refresh_interval,
+            ),
+            (
+                prune_change_log_periodically,
+                change_log_settings.change_prune_interval,
+            ),
+        ]
+        if interval > 0
+    ]
+    # drop cached API keys whenever any worker writes to the keys table
+    key_listener = asyncio.create_task(listen_for_key_changes(async_engine))
+
     yield
 
     # Perform any shutdown tasks here
+    for task in [*refreshes, key_listener]:
+        task.cancel()
+    await change_hub.stop()
 
 
 app = FastAPI(title="Open CSIP-AUS Listing API", lifespan=lifespan)
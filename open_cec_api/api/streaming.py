@@ -0,0 +1,35 @@
+"""Streamed response bodies, optionally gzip compressed on the fly."""
+
+import zlib
+from typing import Iterable, Iterator
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "")
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Compress text chunks into one gzip stream, yielding output as it is produced."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)  # gzip header/trailer
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode())
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def ndjson_response(request: Request, chunks: Iterable[str]) -> StreamingResponse:
+    """Stream NDJSON chunks, gzip compressed if the client accepts it."""
+    if not accepts_gzip(request):
+        return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE)
+
+    return StreamingResponse(
+        gzip_chunks(chunks),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+    )
@@ -0,0 +1,110 @@
+"""Checks of listing attribute values against their device class's definitions.
+
+A validator is compiled for each device class from its attribute definitions, held in
+the reference data snapshot, so a check costs no database query and is rebuilt
+whenever the definitions change. The checks accept exactly the values that the
+type_attribute_value trigger can type.
+"""
+
+import re
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+from open_cec_api.services.database.models import (
+    BOOLEAN_VALUES,
+    NUMBER_VALUE_PATTERN,
+    THOUSANDS_SEPARATOR_PATTERN,
+)
+
+# the value as the trigger reads it: trimmed and lower cased, and for numbers without
+# thousands separators. ASCII only, so no other script's digits or spaces match
+_THOUSANDS_SEPARATOR = re.compile(THOUSANDS_SEPARATOR_PATTERN, re.ASCII)
+_NUMBER_VALUE = re.compile(NUMBER_VALUE_PATTERN, re.ASCII)
+MAX_TEXT_VALUE_LENGTH = 255
+
+
+def _normalize(value: str) -> str:
+    return value.strip(" ").lower()
+
+
+def check_number(value: str) -> Optional[str]:
+    normalized = _THOUSANDS_SEPARATOR.sub(r"\1", _normalize(value))
+    if _NUMBER_VALUE.match(normalized) is None:
+        return "must be a number or a range of two, e.g. 13.5 kWh or 200-800V"
+    return None
+
+
+def check_boolean(value: str) -> Optional[str]:
+    if _normalize(value) not in BOOLEAN_VALUES:
+        return "must be a boolean, e.g. true or false"
+    return None
+
+
+def check_enum(value: str) -> Optional[str]:
+    if not _normalize(value):
+        return "must not be empty"
+    if len(_normalize(value)) > MAX_TEXT_VALUE_LENGTH:
+        return f"must be at most {MAX_TEXT_VALUE_LENGTH} characters"
+    return None
+
+
+def check_string(value: str) -> Optional[str]:
+    return None
+
+
+TYPE_CHECKS: dict[str, Callable[[str], Optional[str]]] = {
+    "number": check_number,
+    "boolean": check_boolean,
+    "enum": check_enum,
+    "string": check_string,
+}
+
+
+class AttributeValidator:
+    """Checks attribute values for one device class, from its attribute types."""
+
+    def __init__(self, attribute_types: Mapping[str, str]):
+        self._checks = {
+            name: TYPE_CHECKS.get(attribute_type, check_string)
+            for name, attribute_type in attribute_types.items()
+        }
+
+    def defines(self, attribute_name: str) -> bool:
+        return attribute_name in self._checks
+
+    def __call__(self, attribute_name: str, value: Optional[str]) -> Optional[str]:
+        """Why the value cannot be written, or None if it can. Null is always
+        allowed, as an unknown value."""
+        check = self._checks.get(attribute_name)
+        if check is None:
+            return f"Attribute {attribute_name!r} is not defined for its device class"
+        if value is None:
+            return None
+        error = check(value)
+        return None if error is None else f"Attribute {attribute_name!r} {error}"
+
+
+def validate_attributes(
+    validators: Mapping[int, AttributeValidator], values: Sequence[Mapping[str, Any]]
+) -> list[Optional[str]]:
+    """Why each row of listing attribute values cannot be written, or None.
+
+    Bulk loads repeat the same few attributes and values, so each distinct
+    (device class, attribute, value) is checked once.
+    """
+    checked: dict[tuple[int, str, Optional[str]], Optional[str]] = {}
+    errors = []
+    for row in values:
+        key = (
+            row["device_class_id"],
+            row["attribute_name"],
+            row.get("attribute_value"),
+        )
+        if key not in checked:
+            validator = validators.get(key[0])
+            checked[key] = (
+                f"Device class {key[0]} has no attribute definitions"
+                if validator is None
+                else validator(key[1], key[2])
+            )
+        errors.append(checked[key])
+    return errors
@@ -1,9 +1,16 @@
+import time
 from contextlib import contextmanager
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional
 
+from loguru import logger
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+ENGINES_PER_WORKER = 2  # the sync and async engines below
 
 
 class DatabaseSettings(BaseSettings):
@@ -12,22 +19,116 @@ class DatabaseSettings(BaseSettings):
     password: str = "db_pass"
     host: str = "postgres"  # Default to 'postgres' for Docker setup
     name: str = "cec_db"
+    async_driver: str = "asyncpg"
+
+    # Connection pool. Unset sizes are derived from the connection budget below.
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_timeout: float = 30.0  # seconds to wait for a connection before erroring
+    pool_recycle: int = 1800  # seconds before a pooled connection is replaced
+    pool_pre_ping: bool = False  # test connections on checkout (one extra round trip)
+    pool_checkout_warn: float = 0.1  # log checkouts that wait longer (seconds)
+
+    # Total connections every API process may hold at once, across all replicas
+    # and workers. Keep this below the server's max_connections. Each worker runs a
+    # sync and an async engine, which split the worker's share between them.
+    connection_budget: int = 90
+    replicas: int = 1
+    workers_count: int = Field(default=1, validation_alias="OPEN_CEC_API_WORKERS_COUNT")
 
     @property
     def database_url(self) -> str:
         return f"{self.dialect}://{self.user}:{self.password}@{self.host}/{self.name}"
 
+    @property
+    def async_database_url(self) -> str:
+        return (
+            f"{self.dialect}+{self.async_driver}://"
+            f"{self.user}:{self.password}@{self.host}/{self.name}"
+        )
+
+    @property
+    def pool_limits(self) -> tuple[int, int]:
+        """Per-engine (pool_size, max_overflow) that fit inside the connection budget."""
+        per_worker = max(
+            1,
+            self.connection_budget
+            // (self.replicas * self.workers_count * ENGINES_PER_WORKER),
+        )
+        pool_size = min(self.pool_size or max(1, per_worker // 2), per_worker)
+        max_overflow = per_worker - pool_size
+        if self.max_overflow is not None:
+            max_overflow = min(self.max_overflow, max_overflow)
+
+        if (self.pool_size or 0) > pool_size or (self.max_overflow or 0) > max_overflow:
+            logger.warning(
+                f"Connection pool reduced to pool_size={pool_size}, "
+                f"max_overflow={max_overflow} to fit a budget of {per_worker} "
+                "connections per engine"
+            )
+        return pool_size, max_overflow
+
     model_config = SettingsConfigDict(env_file=".env", env_prefix="DB_", extra="allow")
 
 
 db_settings = DatabaseSettings()  # type: ignore[call-arg] # instantiated at runtime
 
 
-engine = create_engine(db_settings.database_url)
+class _CheckoutTimingMixin:
+    """Logs pool checkouts waiting longer than ``pool_checkout_warn``."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()  # type: ignore[misc]
+        finally:
+            waited = time.perf_counter() - start
+            if waited >= db_settings.pool_checkout_warn:
+                logger.warning(
+                    f"Waited {waited * 1000:.0f} ms for a database connection "
+                    f"({self.status()})"  # type: ignore[attr-defined]
+                )
+
+
+class CheckoutTimingQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class CheckoutTimingAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options() -> dict:
+    pool_size, max_overflow = db_settings.pool_limits
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": db_settings.pool_timeout,
+        "pool_recycle": db_settings.pool_recycle,
+        "pool_pre_ping": db_settings.pool_pre_ping,
+    }
+
+
+def create_pooled_engine(url: str):
+    return create_engine(url, poolclass=CheckoutTimingQueuePool, **_pool_options())
+
+
+def create_pooled_async_engine(url: str):
+    return create_async_engine(
+        url, poolclass=CheckoutTimingAsyncQueuePool, **_pool_options()
+    )
+
+
+engine = create_pooled_engine(db_settings.database_url)
 session_maker = sessionmaker(
     autocommit=False, autoflush=False, bind=engine, expire_on_commit=False
 )
 
+async_engine = create_pooled_async_engine(db_settings.async_database_url)
+async_session_maker = async_sessionmaker(
+    autoflush=False, bind=async_engine, expire_on_commit=False
+)
+
 
 @contextmanager
 def ensure_session() -> Generator[Session, None, None]:
@@ -45,3 +146,9 @@ def get_db_session() -> Generator[Session, None, None]:
         yield session
     finally:
         session.close()
+
+
+async def get_async_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """FastAPI dependency for async database sessions."""
+    async with async_session_maker() as session:
+        yield session
@@ -26,7 +26,13 @@ def init_db(session: Session) -> None:
     created_objects = {}
 
     # Create dummy Key
-    keys = [Key(value=settings.api_key_hash, description="dummy key")]
+    keys = [
+        Key(
+            value=settings.api_key_hash,
+            fingerprint=settings.api_key_fingerprint,
+            description="dummy key",
+        )
+    ]
 
     for k in keys:
         session.add(k)
@@ -1,13 +1,26 @@
 from sqlalchemy import (
+    DDL,
+    BigInteger,
+    Boolean,
     Date,
     DateTime,
+    Double,
+    FetchedValue,
     ForeignKey,
+    ForeignKeyConstraint,
+    Index,
     Integer,
     String,
     Text,
     UniqueConstraint,
+    event,
+    text,
+)
+from sqlalchemy.dialects.postgresql import (  # postgres specific types
+    ARRAY,
+    JSONB,
+    TSVECTOR,
 )
-from sqlalchemy.dialects.postgresql import ARRAY  # postgres specific for ARRAY
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -16,6 +29,23 @@ class Base(DeclarativeBase):
     pass
 
 
+# The ilike filters in api/crud/filters.py match '%term%', which a btree index cannot
+# serve. pg_trgm GIN indexes can, so every ilike-filtered column gets one.
+event.listen(
+    Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+)
+
+
+def trigram_index(table_name: str, column: str) -> Index:
+    """A pg_trgm GIN index supporting ``column ILIKE '%term%'``."""
+    return Index(
+        f"ix_{table_name}_{column}_trgm",
+        column,
+        postgresql_using="gin",
+        postgresql_ops={column: "gin_trgm_ops"},
+    )
+
+
 class Key(Base):
     """
     Stores access keys
@@ -25,8 +55,13 @@ class Key(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     value: Mapped[str] = mapped_column(String(50), nullable=False)  # hashed
+    fingerprint: Mapped[str] = mapped_column(
+        String(64), nullable=True, unique=True, index=True
+    )  # HMAC-SHA256 of the plain key, for indexed lookup
     description: Mapped[str] = mapped_column(Text, nullable=False)
 
+    __table_args__ = (trigram_index("keys", "description"),)
+
 
 class EntityType(Base):
     """
@@ -43,6 +78,8 @@ class EntityType(Base):
     )  # 'server', 'client'
     description: Mapped[str] = mapped_column(Text)
 
+    __table_args__ = (trigram_index("entity_types", "description"),)
+
     # Relationships
     listings = relationship("Listing", back_populates="entity_type")
 
@@ -65,6 +102,8 @@ class DeviceClass(Base):
         DateTime, default=func.current_timestamp()
     )
 
+    __table_args__ = (trigram_index("device_classes", "description"),)
+
     # Relationships
     listing_device_classes = relationship(
         "ListingDeviceClass", back_populates="device_class"
@@ -88,7 +127,7 @@ class Listing(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     entity_type_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("entity_types.id"), nullable=False
+        Integer, ForeignKey("entity_types.id"), nullable=False, index=True
     )
     manufacturer: Mapped[str] = mapped_column(String(255), nullable=False)
     model: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -103,20 +142,37 @@ class Listing(Base):
     )
 
     # Constraints
-    __table_args__ = (UniqueConstraint("manufacturer", "model"),)
+    __table_args__ = (
+        UniqueConstraint("manufacturer", "model"),
+        # most reads only want active listings, paged in id order
+        Index(
+            "ix_listings_active_id", "id", postgresql_where=text("status = 'active'")
+        ),
+        trigram_index("listings", "manufacturer"),
+        trigram_index("listings", "model"),
+    )
 
     # Relationships
     entity_type = relationship("EntityType", back_populates="listings")
+    # Children are removed by ON DELETE CASCADE, so a single DELETE statement on
+    # listings is enough; passive_deletes stops the ORM loading them first.
     listing_device_classes = relationship(
-        "ListingDeviceClass", back_populates="listing", cascade="all, delete-orphan"
+        "ListingDeviceClass",
+        back_populates="listing",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     listing_device_class_attributes = relationship(
         "ListingDeviceClassAttribute",
         back_populates="listing",
         cascade="all, delete-orphan",
+        passive_deletes=True,
     )
     certificates = relationship(
-        "Certificate", back_populates="listing", cascade="all, delete-orphan"
+        "Certificate",
+        back_populates="listing",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
     )
 
 
@@ -129,10 +185,10 @@ class ListingDeviceClass(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     listing_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("listings.id"), nullable=False
+        Integer, ForeignKey("listings.id", ondelete="CASCADE"), nullable=False
     )
     device_class_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("device_classes.id"), nullable=False
+        Integer, ForeignKey("device_classes.id"), nullable=False, index=True
     )
     created_at: Mapped[DateTime] = mapped_column(
         DateTime, default=func.current_timestamp()
@@ -163,28 +219,60 @@ class DeviceClassAttribute(Base):
     description: Mapped[str] = mapped_column(Text, nullable=True)
 
     # Constraints
-    __table_args__ = (UniqueConstraint("device_class_id", "attribute_name"),)
+    __table_args__ = (
+        UniqueConstraint("device_class_id", "attribute_name"),
+        trigram_index("device_class_attributes", "description"),
+    )
 
     # Relationships
     device_class = relationship("DeviceClass", back_populates="device_class_attributes")
 
 
+def typed_value_index(column: str) -> Index:
+    """An index on a typed attribute value, for filtering one attribute by value."""
+    return Index(
+        f"ix_listing_device_class_attributes_{column}",
+        "attribute_name",
+        column,
+        postgresql_where=text(f"{column} IS NOT NULL"),
+    )
+
+
+def typed_value_column(type_) -> Mapped:
+    """A column set by the type_attribute_value trigger, which the ORM fetches back."""
+    return mapped_column(
+        type_,
+        nullable=True,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
+    )
+
+
 class ListingDeviceClassAttribute(Base):
     """Stores attribute values for a lisitng within a device class. It links a listing
     and device class to an attribute name and value. Each listing-device class-attribute
-    combination is unqiue. This model instantiates the attribute definitions from DeviceClassAttribute."""
+    combination is unqiue. This model instantiates the attribute definitions from DeviceClassAttribute.
+
+    The value is also stored typed, by trigger, according to the attribute_type of its
+    definition: numbers (and ranges such as "200-800V") in number_min and number_max,
+    booleans in boolean_value, and strings and enums, lower cased, in text_value. The
+    columns of other types, and all of them for unparseable values, are null."""
 
     __tablename__ = "listing_device_class_attributes"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     listing_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("listings.id"), nullable=False
+        Integer, ForeignKey("listings.id", ondelete="CASCADE"), nullable=False
     )
     device_class_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("device_classes.id"), nullable=False
+        Integer, ForeignKey("device_classes.id"), nullable=False, index=True
     )
     attribute_name: Mapped[str] = mapped_column(String(100), nullable=False)
     attribute_value: Mapped[str] = mapped_column(Text)
+    number_min: Mapped[float] = typed_value_column(Double)
+    number_max: Mapped[float] = typed_value_column(Double)
+    boolean_value: Mapped[bool] = typed_value_column(Boolean)
+    text_value: Mapped[str] = typed_value_column(String(255))
     created_at: Mapped[DateTime] = mapped_column(
         DateTime, default=func.current_timestamp()
     )
@@ -192,6 +280,20 @@ class ListingDeviceClassAttribute(Base):
     # Constraints
     __table_args__ = (
         UniqueConstraint("listing_id", "device_class_id", "attribute_name"),
+        # the listing must have the device class; unlinking it removes its values
+        ForeignKeyConstraint(
+            ["listing_id", "device_class_id"],
+            [
+                "listing_device_classes.listing_id",
+                "listing_device_classes.device_class_id",
+            ],
+            ondelete="CASCADE",
+        ),
+        trigram_index("listing_device_class_attributes", "attribute_value"),
+        typed_value_index("number_min"),
+        typed_value_index("number_max"),
+        typed_value_index("boolean_value"),
+        typed_value_index("text_value"),
     )
 
     # Relationships
@@ -207,7 +309,10 @@ class Certificate(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     listing_id: Mapped[int] = mapped_column(
-        Integer, ForeignKey("listings.id"), nullable=False
+        Integer,
+        ForeignKey("listings.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
     )
     expiry: Mapped[Date] = mapped_column(Date, nullable=False)
     certification_date: Mapped[Date] = mapped_column(Date, nullable=False)
@@ -215,5 +320,481 @@ class Certificate(Base):
 
     test_profiles: Mapped[list[str]] = mapped_column(ARRAY(String), nullable=False)
 
+    __table_args__ = (
+        trigram_index("certificates", "certifying_body"),
+        # array_ops GIN: serves test_profiles @> (all of) and && (any of)
+        Index("ix_certificates_test_profiles", "test_profiles", postgresql_using="gin"),
+    )
+
     # Relationships
     listing = relationship("Listing", back_populates="certificates")
+
+
+class RegistryVersion(Base):
+    """A single row counting writes to the registry tables, for conditional GETs.
+
+    The registry table triggers (below) increment ``version`` and stamp ``modified_at``
+    once per statement, so every write is counted whether or not it goes through the
+    CRUD classes. Concurrent writers queue on this row until they commit."""
+
+    __tablename__ = "registry_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)  # always 1
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # timezone-aware so it converts unambiguously to an HTTP date
+    modified_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+    # the newest change pruned from the change log; see api/change_log.py
+    pruned_change_id: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, server_default="0"
+    )
+
+
+class Change(Base):
+    """The change log of the registry tables, one row per row written, for mirrors.
+
+    Rows are recorded by trigger. ``data`` holds the row as written, or is null for a
+    delete (a tombstone) and for a truncate, which has no ``row_id``. Ids are handed out
+    while the writer holds the registry_version row lock, so they are committed in
+    order and a reader resuming after an id never misses a later commit."""
+
+    __tablename__ = "changes"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    table_name: Mapped[str] = mapped_column(String(63), nullable=False)
+    row_id: Mapped[int] = mapped_column(Integer, nullable=True)
+    operation: Mapped[str] = mapped_column(String(8), nullable=False)
+    data: Mapped[dict] = mapped_column(JSONB, nullable=True)
+    changed_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+class ListingSearchDocument(Base):
+    """The full-text search document of a listing, kept current by trigger.
+
+    Weighted A for the manufacturer and model, B for the names of the listing's device
+    classes and C for its attribute values. Kept apart from ``listings`` so refreshing
+    it does not touch the listing row, its change log or the registry version."""
+
+    __tablename__ = "listing_search_documents"
+
+    listing_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("listings.id", ondelete="CASCADE"), primary_key=True
+    )
+    document: Mapped[str] = mapped_column(TSVECTOR, nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_listing_search_documents_document", "document", postgresql_using="gin"
+        ),
+    )
+
+
+REGISTRY_TABLES = [
+    EntityType.__table__,
+    DeviceClass.__table__,
+    DeviceClassAttribute.__table__,
+    Listing.__table__,
+    ListingDeviceClass.__table__,
+    ListingDeviceClassAttribute.__table__,
+    Certificate.__table__,
+]
+
+CHANGES_CHANNEL = "registry_changes"
+
+event.listen(
+    RegistryVersion.__table__,
+    "after_create",
+    DDL("INSERT INTO registry_version (id, version) VALUES (1, 1)"),
+)
+# Statement-level, reading the written rows from transition tables (new_rows for
+# inserts and updates, old_rows for deletes). A statement that wrote no rows, e.g. an
+# UPDATE or DELETE of a missing id, returns at once: it neither bumps the version,
+# which would invalidate every client's ETag, nor waits on the version row lock.
+# Otherwise the version row is locked first, which serialises writers until they
+# commit, before any change id is drawn. The CRUD classes take that lock before their
+# first write (REGISTRY_LOCK in api/crud/base.py), so a writer never waits for it while
+# holding row locks another writer needs; other writers of several statements should do
+# the same. Statements that recorded changes NOTIFY CHANGES_CHANNEL; Postgres delivers
+# one notification per transaction (identical payloads are folded) when it commits.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(
+        f"""
+        CREATE OR REPLACE FUNCTION record_registry_changes() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            recorded bigint;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                IF NOT EXISTS (SELECT 1 FROM old_rows) THEN
+                    RETURN NULL;
+                END IF;
+            ELSIF TG_OP <> 'TRUNCATE' THEN
+                IF NOT EXISTS (SELECT 1 FROM new_rows) THEN
+                    RETURN NULL;
+                END IF;
+            END IF;
+
+            UPDATE registry_version
+            SET version = version + 1, modified_at = now()
+            WHERE id = 1;
+
+            IF TG_OP = 'TRUNCATE' THEN
+                INSERT INTO changes (table_name, operation)
+                VALUES (TG_TABLE_NAME, 'truncate');
+            ELSIF TG_OP = 'DELETE' THEN
+                INSERT INTO changes (table_name, row_id, operation)
+                SELECT TG_TABLE_NAME, id, 'delete' FROM old_rows ORDER BY id;
+            ELSE
+                INSERT INTO changes (table_name, row_id, operation, data)
+                SELECT TG_TABLE_NAME, id, lower(TG_OP), to_jsonb(new_rows)
+                FROM new_rows ORDER BY id;
+            END IF;
+
+            GET DIAGNOSTICS recorded = ROW_COUNT;
+            IF recorded > 0 THEN
+                PERFORM pg_notify('{CHANGES_CHANNEL}', '');
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    ),
+)
+event.listen(
+    Base.metadata,
+    "after_drop",
+    DDL("DROP FUNCTION IF EXISTS record_registry_changes()"),
+)
+# transition tables need a trigger per event
+REGISTRY_TRIGGERS = {
+    "record_registry_inserts": "INSERT ON %(table)s REFERENCING NEW TABLE AS new_rows",
+    "record_registry_updates": "UPDATE ON %(table)s REFERENCING NEW TABLE AS new_rows",
+    "record_registry_deletes": "DELETE ON %(table)s REFERENCING OLD TABLE AS old_rows",
+    "record_registry_truncates": "TRUNCATE ON %(table)s",
+}
+for table in REGISTRY_TABLES:
+    for name, event_clause in REGISTRY_TRIGGERS.items():
+        event.listen(
+            table,
+            "after_create",
+            DDL(
+                f"CREATE TRIGGER {name} AFTER {event_clause} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION record_registry_changes()"
+            ),
+        )
+
+KEY_CHANGES_CHANNEL = "key_changes"
+
+# Workers cache verified keys, so a statement that may revoke one (an update, delete or
+# truncate of keys) NOTIFYs KEY_CHANGES_CHANNEL and every worker drops its cache when
+# the transaction commits. Inserts revoke nothing and stay silent.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(
+        f"""
+        CREATE OR REPLACE FUNCTION notify_key_changes() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_notify('{KEY_CHANGES_CHANNEL}', '');
+            RETURN NULL;
+        END
+        $$
+        """
+    ),
+)
+event.listen(
+    Base.metadata,
+    "after_drop",
+    DDL("DROP FUNCTION IF EXISTS notify_key_changes()"),
+)
+event.listen(
+    Key.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER notify_key_changes AFTER UPDATE OR DELETE OR TRUNCATE ON keys "
+        "FOR EACH STATEMENT EXECUTE FUNCTION notify_key_changes()"
+    ),
+)
+
+SEARCH_CONFIG = "english"  # text search configuration of the listing search documents
+
+# Search documents are rebuilt for every listing a statement touches: its own row, its
+# device class links, its attribute values, or the name of one of its device classes.
+# Documents for existing listings can be rebuilt with
+#     SELECT refresh_listing_search_documents(array(SELECT id FROM listings))
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(
+        f"""
+        CREATE OR REPLACE FUNCTION refresh_listing_search_documents(
+            listing_ids integer[]
+        ) RETURNS void
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO listing_search_documents (listing_id, document)
+            SELECT
+                l.id,
+                setweight(
+                    to_tsvector('{SEARCH_CONFIG}', l.manufacturer || ' ' || l.model),
+                    'A'
+                )
+                || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+                    SELECT string_agg(dc.name, ' ')
+                    FROM listing_device_classes ldc
+                    JOIN device_classes dc ON dc.id = ldc.device_class_id
+                    WHERE ldc.listing_id = l.id
+                ), '')), 'B')
+                || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+                    SELECT string_agg(a.attribute_value, ' ')
+                    FROM listing_device_class_attributes a
+                    WHERE a.listing_id = l.id
+                ), '')), 'C')
+            FROM listings l
+            WHERE l.id = ANY(listing_ids)
+            ON CONFLICT (listing_id) DO UPDATE SET document = EXCLUDED.document;
+        END
+        $$
+        """
+    ),
+)
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(
+        """
+        CREATE OR REPLACE FUNCTION refresh_listing_search() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            listing_ids integer[];
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                SELECT array_agg(id) INTO listing_ids FROM listings;
+            ELSIF TG_TABLE_NAME = 'listings' THEN
+                SELECT array_agg(id) INTO listing_ids FROM new_rows;
+            ELSIF TG_TABLE_NAME = 'device_classes' THEN
+                SELECT array_agg(ldc.listing_id) INTO listing_ids
+                FROM listing_device_classes ldc
+                JOIN new_rows n ON n.id = ldc.device_class_id;
+            ELSIF TG_OP = 'INSERT' THEN
+                SELECT array_agg(listing_id) INTO listing_ids FROM new_rows;
+            ELSIF TG_OP = 'DELETE' THEN
+                SELECT array_agg(listing_id) INTO listing_ids FROM old_rows;
+            ELSE
+                SELECT array_agg(listing_id) INTO listing_ids FROM (
+                    SELECT listing_id FROM new_rows
+                    UNION SELECT listing_id FROM old_rows
+                ) touched;
+            END IF;
+
+            IF listing_ids IS NOT NULL THEN
+                PERFORM refresh_listing_search_documents(listing_ids);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    ),
+)
+event.listen(
+    Base.metadata,
+    "after_drop",
+    DDL("DROP FUNCTION IF EXISTS refresh_listing_search()"),
+)
+event.listen(
+    Base.metadata,
+    "after_drop",
+    DDL("DROP FUNCTION IF EXISTS refresh_listing_search_documents(integer[])"),
+)
+SEARCH_TRIGGER_EVENTS = {
+    "inserts": "INSERT ON %(table)s REFERENCING NEW TABLE AS new_rows",
+    "updates": "UPDATE ON %(table)s "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows",
+    "deletes": "DELETE ON %(table)s REFERENCING OLD TABLE AS old_rows",
+    "truncates": "TRUNCATE ON %(table)s",
+}
+# deleted listings take their documents with them by ON DELETE CASCADE, and device
+# classes cannot be deleted while listings use them
+SEARCH_TRIGGERS = {
+    Listing.__table__: ("inserts", "updates"),
+    DeviceClass.__table__: ("updates",),
+    ListingDeviceClass.__table__: ("inserts", "updates", "deletes", "truncates"),
+    ListingDeviceClassAttribute.__table__: (
+        "inserts",
+        "updates",
+        "deletes",
+        "truncates",
+    ),
+}
+for table, events in SEARCH_TRIGGERS.items():
+    for event_name in events:
+        event.listen(
+            table,
+            "after_create",
+            DDL(
+                f"CREATE TRIGGER refresh_listing_search_{event_name} "
+                f"AFTER {SEARCH_TRIGGER_EVENTS[event_name]} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION refresh_listing_search()"
+            ),
+        )
+
+# Values accepted for boolean attributes, after trimming and lower casing
+BOOLEAN_VALUES = {
+    **dict.fromkeys(("true", "yes", "y", "on", "1"), True),
+    **dict.fromkeys(("false", "no", "n", "off", "0"), False),
+}
+# A number, or a range of two, each optionally followed by a unit and the whole by
+# text without digits: "10", "13.5 kWh", "200-800V", "-20 to 60 C", "1,000 W". Range
+# separators are -, an en dash (escaped to keep the DDL ASCII), ~ or "to". The digit
+# counts are capped so every match fits a double precision. Digits are spelled [0-9]
+# since \d may also match other scripts' digits, which do not cast to a number.
+NUMBER_PATTERN = r"[+-]?[0-9]{0,30}\.?[0-9]{1,30}"
+NUMBER_VALUE_PATTERN = (
+    rf"^({NUMBER_PATTERN})\s*[^0-9\s+-]*\s*"
+    rf"(?:(?:-|\u2013|~|to)\s*({NUMBER_PATTERN})\s*)?[^0-9]*$"
+)
+# a comma between thousands, dropped before reading a number
+THOUSANDS_SEPARATOR_PATTERN = r"([0-9]),(?=[0-9]{3}([^0-9]|$))"
+
+_TRUE_VALUES = ", ".join(f"'{k}'" for k, v in BOOLEAN_VALUES.items() if v)
+_FALSE_VALUES = ", ".join(f"'{k}'" for k, v in BOOLEAN_VALUES.items() if not v)
+
+
+# Typed copies of attribute values are set before each row is written, from the type
+# its device class declares for the attribute.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(
+        rf"""
+        CREATE OR REPLACE FUNCTION type_attribute_value() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            declared text;
+            normalized text := lower(btrim(NEW.attribute_value));
+            bounds text[];
+        BEGIN
+            SELECT attribute_type INTO declared
+            FROM device_class_attributes
+            WHERE device_class_id = NEW.device_class_id
+            AND attribute_name = NEW.attribute_name;
+
+            NEW.number_min := NULL;
+            NEW.number_max := NULL;
+            NEW.boolean_value := NULL;
+            NEW.text_value := NULL;
+
+            IF declared = 'number' THEN
+                -- drop thousands separators, then read one number or a range
+                bounds := regexp_match(
+                    regexp_replace(
+                        normalized, '{THOUSANDS_SEPARATOR_PATTERN}', '\1', 'g'
+                    ),
+                    '{NUMBER_VALUE_PATTERN}'
+                );
+                IF bounds IS NOT NULL THEN
+                    NEW.number_min := least(
+                        bounds[1]::double precision,
+                        coalesce(bounds[2], bounds[1])::double precision
+                    );
+                    NEW.number_max := greatest(
+                        bounds[1]::double precision,
+                        coalesce(bounds[2], bounds[1])::double precision
+                    );
+                END IF;
+            ELSIF declared = 'boolean' THEN
+                NEW.boolean_value := CASE
+                    WHEN normalized IN ({_TRUE_VALUES}) THEN true
+                    WHEN normalized IN ({_FALSE_VALUES}) THEN false
+                END;
+            ELSIF declared IN ('string', 'enum') AND length(normalized) <= 255 THEN
+                NEW.text_value := normalized;
+            END IF;
+            RETURN NEW;
+        END
+        $$
+        """
+    ),
+)
+event.listen(
+    ListingDeviceClassAttribute.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER type_attribute_value "
+        "BEFORE INSERT OR UPDATE OF device_class_id, attribute_name, attribute_value "
+        "ON listing_device_class_attributes "
+        "FOR EACH ROW EXECUTE FUNCTION type_attribute_value()"
+    ),
+)
+# When a definition is added, removed, renamed or changes type, the values it governs
+# are retyped by rewriting them in place, which fires type_attribute_value.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL(
+        """
+        CREATE OR REPLACE FUNCTION retype_attribute_values() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                UPDATE listing_device_class_attributes
+                SET attribute_value = attribute_value
+                WHERE number_min IS NOT NULL OR boolean_value IS NOT NULL
+                OR text_value IS NOT NULL;
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE listing_device_class_attributes
+                SET attribute_value = attribute_value
+                WHERE device_class_id = OLD.device_class_id
+                AND attribute_name = OLD.attribute_name;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE listing_device_class_attributes
+                SET attribute_value = attribute_value
+                WHERE device_class_id = NEW.device_class_id
+                AND attribute_name = NEW.attribute_name;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """
+    ),
+)
+event.listen(
+    DeviceClassAttribute.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER retype_attribute_values "
+        "AFTER INSERT OR DELETE "
+        "OR UPDATE OF device_class_id, attribute_name, attribute_type "
+        "ON device_class_attributes "
+        "FOR EACH ROW EXECUTE FUNCTION retype_attribute_values()"
+    ),
+)
+event.listen(
+    DeviceClassAttribute.__table__,
+    "after_create",
+    DDL(
+        "CREATE TRIGGER retype_attribute_values_truncate "
+        "AFTER TRUNCATE ON device_class_attributes "
+        "FOR EACH STATEMENT EXECUTE FUNCTION retype_attribute_values()"
+    ),
+)
+event.listen(
+    Base.metadata,
+    "after_drop",
+    DDL("DROP FUNCTION IF EXISTS retype_attribute_values()"),
+)
+event.listen(
+    Base.metadata,
+    "after_drop",
+    DDL("DROP FUNCTION IF EXISTS type_attribute_value()"),
+)
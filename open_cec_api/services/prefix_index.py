@@ -0,0 +1,115 @@
+"""An in-process index of strings for prefix completion."""
+
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Iterable, Iterator
+
+# changed keys above which the keys are merged in one copy rather than patched in place
+BULK_UPDATE_SIZE = 32
+
+
+def normalize(text: str) -> str:
+    """Case and accent insensitive form of text, with runs of whitespace collapsed."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+def _merge(
+    keys: list[tuple[str, str]],
+    added: Iterable[tuple[str, str]],
+    removed: Iterable[tuple[str, str]],
+) -> list[tuple[str, str]]:
+    """Sorted keys without the removed keys and with the added ones, in one pass.
+
+    Each change is placed with a binary search and the keys between changes are copied
+    as whole slices, so an update costs O(n) copying but only O(k log n) comparisons.
+    """
+    cuts = sorted(
+        [(bisect_left(keys, key), False, key) for key in added]
+        + [(bisect_left(keys, key), True, key) for key in removed]
+    )
+    merged: list[tuple[str, str]] = []
+    start = 0
+    for i, remove, key in cuts:
+        merged += keys[start:i]
+        if remove:
+            start = i + 1
+        else:
+            merged.append(key)
+            start = i
+    merged += keys[start:]
+    return merged
+
+
+def _keys(value: str) -> Iterator[tuple[str, str]]:
+    """(suffix, value) for each suffix of the normalized value that starts a word."""
+    normalized = normalize(value)
+    for i, char in enumerate(normalized):
+        if char != " " and (i == 0 or normalized[i - 1] == " "):
+            yield normalized[i:], value
+
+
+class PrefixIndex:
+    """Completes a prefix of any word in a set of strings, from a sorted list of keys.
+
+    Each string is keyed by every normalized suffix that starts a word, so "pow"
+    completes "Tesla Powerwall 2". A completion is one binary search and a walk over
+    the matching keys. Strings are reference counted, so one added for many rows stays
+    until the last of them is removed. Not thread-safe; the owner serialises access.
+    """
+
+    def __init__(self, values: Iterable[str] = ()):
+        self._refs: Counter[str] = Counter(values)
+        self._keys = self._build_keys()
+
+    def _build_keys(self) -> list[tuple[str, str]]:
+        return sorted(key for value in self._refs for key in _keys(value))
+
+    def update(self, added: Iterable[str] = (), removed: Iterable[str] = ()) -> None:
+        """Add and remove one reference to each string; unknown removals are ignored."""
+        new, gone = set(), set()
+        for value in added:
+            self._refs[value] += 1
+            if self._refs[value] == 1:
+                new.add(value)
+        for value in removed:
+            if value not in self._refs:
+                continue
+            self._refs[value] -= 1
+            if self._refs[value] == 0:
+                del self._refs[value]
+                gone.add(value)
+        new_keys = [key for value in new - gone for key in _keys(value)]
+        gone_keys = [key for value in gone - new for key in _keys(value)]
+
+        # each in-place change moves the keys after it, so many changes are merged
+        if len(new_keys) + len(gone_keys) > BULK_UPDATE_SIZE:
+            self._keys = _merge(self._keys, new_keys, gone_keys)
+            return
+        for key in gone_keys:
+            del self._keys[bisect_left(self._keys, key)]
+        for key in new_keys:
+            insort(self._keys, key)
+
+    def complete(self, prefix: str, limit: int) -> list[str]:
+        """Up to limit distinct strings with a word starting with prefix, in the
+        alphabetical order of the matching words."""
+        normalized = normalize(prefix)
+        if not normalized:
+            return []
+
+        completions: list[str] = []
+        i = bisect_left(self._keys, (normalized,))
+        while i < len(self._keys) and len(completions) < limit:
+            key, value = self._keys[i]
+            if not key.startswith(normalized):
+                break
+            if value not in completions:
+                completions.append(value)
+            i += 1
+        return completions
+
+    def __len__(self) -> int:
+        return len(self._refs)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -12,6 +14,7 @@ class Settings(BaseSettings):
     reload: bool = True
 
     api_key_hash: str
+    api_key_fingerprint: Optional[str] = None
 
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -0,0 +1,236 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+import open_cec_api.api.crud.crud as crud
+from open_cec_api.api.crud.attributes import AttributeFilter
+from open_cec_api.api.public_router import listing_filters
+from open_cec_api.services.database.models import (
+    DeviceClass,
+    DeviceClassAttribute,
+    EntityType,
+    Listing,
+    ListingDeviceClass,
+    ListingDeviceClassAttribute,
+)
+
+ATTRIBUTE_TYPES = {
+    "capacity": "number",
+    "input_voltage_range": "number",
+    "grid_forming": "boolean",
+    "chemistry": "enum",
+    "notes": "string",
+}
+
+
+@pytest.fixture
+def device_class(db_session_fixture: Session) -> DeviceClass:
+    session = db_session_fixture
+    device_class = DeviceClass(name="BESS", description="battery")
+    session.add(device_class)
+    session.flush()
+    session.add_all(
+        DeviceClassAttribute(
+            device_class_id=device_class.id,
+            attribute_name=name,
+            attribute_type=attribute_type,
+        )
+        for name, attribute_type in ATTRIBUTE_TYPES.items()
+    )
+    session.flush()
+    return device_class
+
+
+@pytest.fixture
+def listings(db_session_fixture: Session, device_class: DeviceClass) -> list[Listing]:
+    """Three batteries with different capacities, voltage ranges and chemistries"""
+    session = db_session_fixture
+    entity_type = EntityType(name="client", description="dummy client")
+    session.add(entity_type)
+    session.flush()
+
+    listings = []
+    for model, values in [
+        ("small", ("5 kWh", "48V", "no", "NMC", "compact")),
+        ("medium", ("13.5kWh", "200-800V", "yes", "LiFePO4", "")),
+        ("large", ("1,000 kWh", "400 to 1000 V", "true", "lifepo4", "")),
+    ]:
+        listing = Listing(
+            entity_type_id=entity_type.id, manufacturer="Acme", model=model
+        )
+        session.add(listing)
+        session.flush()
+        session.add(
+            ListingDeviceClass(listing_id=listing.id, device_class_id=device_class.id)
+        )
+        session.flush()
+        session.add_all(
+            ListingDeviceClassAttribute(
+                listing_id=listing.id,
+                device_class_id=device_class.id,
+                attribute_name=name,
+                attribute_value=value,
+            )
+            for name, value in zip(ATTRIBUTE_TYPES, values)
+        )
+        listings.append(listing)
+    session.flush()
+    return listings
+
+
+def typed_value(session: Session, value: str, attribute_name: str = "capacity"):
+    """The typed columns of the value after writing it to a listing's attribute"""
+    session.execute(
+        update(ListingDeviceClassAttribute)
+        .where(ListingDeviceClassAttribute.attribute_name == attribute_name)
+        .values(attribute_value=value)
+    )
+    attribute = ListingDeviceClassAttribute
+    return session.execute(
+        select(
+            attribute.number_min,
+            attribute.number_max,
+            attribute.boolean_value,
+            attribute.text_value,
+        )
+        .where(attribute.attribute_name == attribute_name)
+        .limit(1)
+    ).one()
+
+
+@pytest.mark.parametrize(
+    ("value", "bounds"),
+    [
+        ("10", (10, 10)),
+        (" 13.5 kWh ", (13.5, 13.5)),
+        ("200-800V", (200, 800)),
+        ("200V - 800V", (200, 800)),
+        ("-20 to 60 °C", (-20, 60)),
+        ("800–200", (200, 800)),
+        ("1,000,000 W", (1_000_000, 1_000_000)),
+        ("about ten", (None, None)),
+        ("5kW hybrid 3", (None, None)),
+        ("", (None, None)),
+    ],
+)
+def test_number_values_are_parsed(
+    db_session_fixture: Session, listings: list[Listing], value: str, bounds: tuple
+):
+    assert typed_value(db_session_fixture, value) == (*bounds, None, None)
+
+
+def test_values_are_typed_by_their_declared_type(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    session = db_session_fixture
+    assert typed_value(session, " Yes", "grid_forming") == (None, None, True, None)
+    assert typed_value(session, "OFF", "grid_forming") == (None, None, False, None)
+    assert typed_value(session, "maybe", "grid_forming") == (None, None, None, None)
+    assert typed_value(session, "LiFePO4", "chemistry") == (None, None, None, "lifepo4")
+    assert typed_value(session, "10 kWh", "notes") == (None, None, None, "10 kwh")
+
+
+def test_definition_changes_retype_values(
+    db_session_fixture: Session, listings: list[Listing], device_class: DeviceClass
+):
+    session = db_session_fixture
+    definition = (DeviceClassAttribute.device_class_id == device_class.id) & (
+        DeviceClassAttribute.attribute_name == "capacity"
+    )
+    session.execute(
+        update(DeviceClassAttribute).where(definition).values(attribute_type="string")
+    )
+    assert typed_value(session, "5 kWh") == (None, None, None, "5 kwh")
+
+    session.execute(delete(DeviceClassAttribute).where(definition))
+    assert typed_value(session, "5 kWh") == (None, None, None, None)
+
+    session.add(
+        DeviceClassAttribute(
+            device_class_id=device_class.id,
+            attribute_name="capacity",
+            attribute_type="number",
+        )
+    )
+    session.flush()
+    values = session.scalars(
+        select(ListingDeviceClassAttribute.number_min).where(
+            ListingDeviceClassAttribute.attribute_name == "capacity"
+        )
+    ).all()
+    assert values == [5, 5, 5]
+
+
+def test_crud_returns_typed_values(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    attribute = db_session_fixture.scalars(
+        select(ListingDeviceClassAttribute).where(
+            ListingDeviceClassAttribute.listing_id == listings[1].id,
+            ListingDeviceClassAttribute.attribute_name == "input_voltage_range",
+        )
+    ).one()
+    assert (attribute.number_min, attribute.number_max) == (200, 800)
+
+
+@pytest.mark.parametrize(
+    ("expressions", "expected"),
+    [
+        (["attr.capacity>=13.5"], ["medium", "large"]),
+        (["attr.capacity>13.5"], ["large"]),
+        (["attr.capacity<10"], ["small"]),
+        (["attr.capacity=5"], ["small"]),
+        (["attr.input_voltage_range=600"], ["medium", "large"]),
+        (["attr.input_voltage_range<=100"], ["small"]),
+        (["attr.input_voltage_range>=900"], ["large"]),
+        (["attr.grid_forming=true"], ["medium", "large"]),
+        (["attr.grid_forming=No"], ["small"]),
+        (["attr.chemistry=LIFEPO4"], ["medium", "large"]),
+        (["attr.chemistry=lifepo4", "attr.capacity<100"], ["medium"]),
+        (["attr.chemistry=sodium"], []),
+        (["attr.unknown>=1"], []),
+    ],
+)
+def test_attribute_filters(
+    db_session_fixture: Session,
+    listings: list[Listing],
+    expressions: list[str],
+    expected: list[str],
+):
+    attributes = [AttributeFilter.parse(e) for e in expressions]
+    rows = crud.ListingCRUD.get(db_session_fixture, attributes=attributes)
+    assert [row.model for row in rows] == expected
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["attr.capacity", "attr.=5", "attr.capacity>=", "attr.capacity>=ten", "capacity=5"],
+)
+def test_invalid_attribute_filters(expression: str):
+    with pytest.raises(ValueError):
+        AttributeFilter.parse(expression)
+
+
+def filters_for(query_string: str) -> dict:
+    """listing_filters as called for a request with only these query parameters"""
+    request = Request(
+        {"type": "http", "query_string": query_string.encode(), "headers": []}
+    )
+    return listing_filters(request, *[None] * 7)
+
+
+def test_listing_filters_read_attribute_parameters():
+    filters = filters_for("attr.capacity>=10&attr.capacity%3C20&attr.phases=3&model=x")
+    assert filters["attributes"] == [
+        AttributeFilter("capacity", ">=", "10"),
+        AttributeFilter("capacity", "<", "20"),
+        AttributeFilter("phases", "=", "3"),
+    ]
+
+    assert "attributes" not in filters_for("model=x")
+
+    with pytest.raises(HTTPException) as e:
+        filters_for("attr.capacity>=lots")
+    assert e.value.status_code == 400
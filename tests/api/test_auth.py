@@ -0,0 +1,209 @@
+import asyncio
+from contextlib import suppress
+
+import pytest
+import sqlalchemy
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import delete, insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+import open_cec_api.api.crud.crud as crud
+from open_cec_api.api.auth import (
+    AuthSettings,
+    check_key_header,
+    get_key_fingerprint,
+    get_key_hash,
+    key_cache,
+    listen_for_key_changes,
+)
+from open_cec_api.api.schema.create import KeyCreate
+from open_cec_api.api.schema.update import KeyUpdate
+from open_cec_api.services.database.models import Key
+
+
+@pytest.fixture(autouse=True)
+def clear_key_cache():
+    key_cache.clear()
+    yield
+    key_cache.clear()
+
+
+def test_fingerprint_secret_is_required(monkeypatch: pytest.MonkeyPatch):
+    """Without a secret the fingerprints would be an unkeyed hash of the keys"""
+    monkeypatch.delenv("OPEN_CEC_API_KEY_FINGERPRINT_SECRET", raising=False)
+    with pytest.raises(ValidationError):
+        AuthSettings(_env_file=None)  # type: ignore[call-arg]
+    for secret in ["", "short"]:
+        with pytest.raises(ValidationError):
+            AuthSettings(_env_file=None, key_fingerprint_secret=secret)
+
+
+class TestCheckKeyHeader:
+    def test_valid_key_is_cached(self, db_session_fixture: Session):
+        """A successfully verified key is cached against its Key id."""
+        key = crud.KeyCRUD.create(
+            db_session_fixture,
+            KeyCreate(value=get_key_hash("secret"), description="Test API key"),
+        )
+
+        check_key_header(db_session_fixture, "secret")
+
+        assert key_cache.get(get_key_fingerprint("secret")) == key.id
+
+    def test_cached_key_skips_database(self, db_session_fixture: Session):
+        """Once cached, a key is accepted without reading the keys table."""
+        crud.KeyCRUD.create(
+            db_session_fixture,
+            KeyCreate(value=get_key_hash("secret"), description="Test API key"),
+        )
+        check_key_header(db_session_fixture, "secret")
+
+        # remove the row behind the CRUD layer's back; the cache still answers
+        db_session_fixture.query(Key).delete()
+        db_session_fixture.commit()
+
+        check_key_header(db_session_fixture, "secret")
+
+    def test_invalid_key_is_not_cached(self, db_session_fixture: Session):
+        """A key that fails verification is rejected and never cached."""
+        crud.KeyCRUD.create(
+            db_session_fixture,
+            KeyCreate(value=get_key_hash("secret"), description="Test API key"),
+        )
+
+        with pytest.raises(HTTPException) as e:
+            check_key_header(db_session_fixture, "wrong")
+
+        assert e.value.status_code == 401
+        assert len(key_cache) == 0
+
+    def test_delete_revokes_cached_key(self, db_session_fixture: Session):
+        """Deleting a key through KeyCRUD stops a cached key working immediately."""
+        key = crud.KeyCRUD.create(
+            db_session_fixture,
+            KeyCreate(value=get_key_hash("secret"), description="Test API key"),
+        )
+        check_key_header(db_session_fixture, "secret")
+
+        crud.KeyCRUD.delete(db_session_fixture, key.id)
+
+        with pytest.raises(HTTPException) as e:
+            check_key_header(db_session_fixture, "secret")
+        assert e.value.status_code == 401
+
+    def test_update_revokes_cached_key(self, db_session_fixture: Session):
+        """Rotating a key's hash through KeyCRUD invalidates the old key."""
+        key = crud.KeyCRUD.create(
+            db_session_fixture,
+            KeyCreate(value=get_key_hash("secret"), description="Test API key"),
+        )
+        check_key_header(db_session_fixture, "secret")
+
+        crud.KeyCRUD.update(
+            db_session_fixture, key.id, KeyUpdate(value=get_key_hash("rotated"))
+        )
+
+        with pytest.raises(HTTPException):
+            check_key_header(db_session_fixture, "secret")
+        check_key_header(db_session_fixture, "rotated")
+
+    def test_fingerprinted_key(self, db_session_fixture: Session):
+        """A key stored with its fingerprint is accepted."""
+        key = crud.KeyCRUD.create(
+            db_session_fixture,
+            KeyCreate(
+                value=get_key_hash("secret"),
+                fingerprint=get_key_fingerprint("secret"),
+                description="Test API key",
+            ),
+        )
+
+        check_key_header(db_session_fixture, "secret")
+
+        assert key_cache.get(get_key_fingerprint("secret")) == key.id
+
+    def test_fingerprint_with_wrong_hash_is_rejected(self, db_session_fixture: Session):
+        """A fingerprint match alone is not enough; the hash must verify too."""
+        crud.KeyCRUD.create(
+            db_session_fixture,
+            KeyCreate(
+                value=get_key_hash("other"),
+                fingerprint=get_key_fingerprint("secret"),
+                description="Test API key",
+            ),
+        )
+
+        with pytest.raises(HTTPException) as e:
+            check_key_header(db_session_fixture, "secret")
+        assert e.value.status_code == 401
+
+    def test_legacy_key_is_backfilled(self, db_session_fixture: Session):
+        """A key stored without a fingerprint is matched and then fingerprinted."""
+        key = crud.KeyCRUD.create(
+            db_session_fixture,
+            KeyCreate(value=get_key_hash("secret"), description="Test API key"),
+        )
+        assert key.fingerprint is None
+
+        check_key_header(db_session_fixture, "secret")
+
+        db_session_fixture.expire_all()
+        stored = db_session_fixture.get(Key, key.id)
+        assert stored is not None
+        assert stored.fingerprint == get_key_fingerprint("secret")
+
+    def test_update_value_clears_fingerprint(self, db_session_fixture: Session):
+        """Replacing a key's hash without a fingerprint clears the stale one."""
+        key = crud.KeyCRUD.create(
+            db_session_fixture,
+            KeyCreate(
+                value=get_key_hash("secret"),
+                fingerprint=get_key_fingerprint("secret"),
+                description="Test API key",
+            ),
+        )
+
+        result = crud.KeyCRUD.update(
+            db_session_fixture, key.id, KeyUpdate(value=get_key_hash("rotated"))
+        )
+
+        assert result is not None
+        assert result.fingerprint is None
+
+
+async def wait_for_empty_key_cache(timeout: float = 5.0) -> None:
+    async with asyncio.timeout(timeout):
+        while len(key_cache):
+            await asyncio.sleep(0.01)
+
+
+@pytest.mark.anyio
+async def test_key_writes_elsewhere_clear_the_cache(
+    db_engine_fixture: sqlalchemy.Engine,
+):
+    """A key deleted by another worker, or outside the API, stops working here too"""
+    engine = create_async_engine(
+        db_engine_fixture.url.set(drivername="postgresql+asyncpg")
+    )
+    key_cache.set("stale", 0)
+    listener = asyncio.create_task(listen_for_key_changes(engine))
+    try:
+        await wait_for_empty_key_cache()  # cleared once listening
+
+        with db_engine_fixture.begin() as conn:
+            key_id = conn.scalar(
+                insert(Key).returning(Key.id),
+                {"value": get_key_hash("secret"), "description": "Test API key"},
+            )
+        key_cache.set(get_key_fingerprint("secret"), key_id)
+        with db_engine_fixture.begin() as conn:
+            conn.execute(delete(Key).where(Key.id == key_id))
+
+        await wait_for_empty_key_cache()
+    finally:
+        listener.cancel()
+        with suppress(asyncio.CancelledError):
+            await listener
+        await engine.dispose()
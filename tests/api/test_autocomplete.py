@@ -0,0 +1,91 @@
+from typing import Generator
+
+import pytest
+from sqlalchemy.orm import Session
+
+import open_cec_api.api.crud.crud as crud
+from open_cec_api.api.autocomplete import (
+    listing_completions,
+    load_listing_completions,
+)
+from open_cec_api.api.public_router import autocomplete_listings
+from open_cec_api.api.schema.create import EntityTypeCreate, ListingCreate
+from open_cec_api.api.schema.update import ListingUpdate
+from open_cec_api.services.database.models import EntityType
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def empty_completions() -> Generator[None, None, None]:
+    """The index lives for the whole process, so start and finish each test empty"""
+    listing_completions.load([])
+    yield
+    listing_completions.load([])
+
+
+@pytest.fixture
+def entity_type(db_session_fixture: Session) -> EntityType:
+    return crud.EntityTypeCRUD.create(
+        db_session_fixture, EntityTypeCreate(name="client", description="dummy")
+    )
+
+
+def listing(entity_type: EntityType, manufacturer: str, model: str) -> ListingCreate:
+    return ListingCreate(
+        entity_type_id=entity_type.id, manufacturer=manufacturer, model=model
+    )
+
+
+def test_listing_writes_update_completions(
+    db_session_fixture: Session, entity_type: EntityType
+):
+    session = db_session_fixture
+    tesla = crud.ListingCRUD.create(session, listing(entity_type, "Tesla", "Powerwall"))
+    crud.ListingCRUD.create(session, listing(entity_type, "Tesla", "Powerwall 3"))
+    assert listing_completions.complete("manufacturer", "te", 10) == ["Tesla"]
+    assert listing_completions.complete("model", "pow", 10) == [
+        "Powerwall",
+        "Powerwall 3",
+    ]
+
+    crud.ListingCRUD.update(session, tesla.id, ListingUpdate(model="Megapack"))
+    assert listing_completions.complete("model", "pow", 10) == ["Powerwall 3"]
+    assert listing_completions.complete("model", "meg", 10) == ["Megapack"]
+
+    crud.ListingCRUD.delete(session, tesla.id)
+    assert listing_completions.complete("model", "meg", 10) == []
+    assert listing_completions.complete("manufacturer", "te", 10) == ["Tesla"]
+
+
+def test_bulk_writes_update_completions(
+    db_session_fixture: Session, entity_type: EntityType
+):
+    crud.ListingCRUD.create_many(
+        db_session_fixture,
+        [listing(entity_type, "Enphase", f"IQ{i}") for i in range(100)],
+    )
+    assert len(listing_completions) == 100
+    assert listing_completions.complete("model", "iq9", 3) == ["IQ9", "IQ90", "IQ91"]
+
+
+def test_load_reads_every_listing(db_session_fixture: Session, entity_type: EntityType):
+    crud.ListingCRUD.create(
+        db_session_fixture, listing(entity_type, "Fronius", "Gen24")
+    )
+    listing_completions.load([])
+
+    load_listing_completions(db_session_fixture)
+    assert listing_completions.complete("manufacturer", "fro", 10) == ["Fronius"]
+
+
+async def test_autocomplete_route(db_session_fixture: Session, entity_type: EntityType):
+    crud.ListingCRUD.create(
+        db_session_fixture, listing(entity_type, "Sungrow", "SH10RS")
+    )
+    assert await autocomplete_listings(prefix="SUN", field="manufacturer", limit=5) == [
+        "Sungrow"
+    ]
+    assert await autocomplete_listings(prefix="sh", field="model", limit=5) == [
+        "SH10RS"
+    ]
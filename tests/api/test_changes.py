@@ -0,0 +1,89 @@
+import json
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from open_cec_api.api.change_log import PRUNED_CHANGE_ID, prune_changes
+from open_cec_api.api.pagination import encode_cursor
+from open_cec_api.api.public_router import get_changes
+from open_cec_api.services.database.models import Change, EntityType
+
+
+def feed(session: Session, **kwargs) -> dict:
+    kwargs.setdefault("since", None)
+    kwargs.setdefault("limit", 100)
+    return json.loads(get_changes(session, **kwargs).body)
+
+
+@pytest.fixture
+def entity_types(db_session_fixture: Session) -> list[EntityType]:
+    entity_types = [
+        EntityType(name=name, description=f"dummy {name}")
+        for name in ["client", "server", "other"]
+    ]
+    db_session_fixture.add_all(entity_types)
+    db_session_fixture.flush()
+    return entity_types
+
+
+def test_changes_page_through_in_order(
+    db_session_fixture: Session, entity_types: list[EntityType]
+):
+    first = feed(db_session_fixture, limit=2)
+    assert [c["row_id"] for c in first["changes"]] == [e.id for e in entity_types[:2]]
+    assert first["changes"][0]["operation"] == "insert"
+    assert first["changes"][0]["data"]["name"] == "client"
+    assert first["has_more"]
+
+    rest = feed(db_session_fixture, since=first["next_cursor"])
+    assert [c["row_id"] for c in rest["changes"]] == [entity_types[2].id]
+    assert not rest["has_more"]
+
+
+def test_caught_up_feed_keeps_cursor(
+    db_session_fixture: Session, entity_types: list[EntityType]
+):
+    """An empty page hands back the cursor it was given, to poll from later"""
+    cursor = feed(db_session_fixture)["next_cursor"]
+    caught_up = feed(db_session_fixture, since=cursor)
+    assert caught_up == {"changes": [], "next_cursor": cursor, "has_more": False}
+
+    db_session_fixture.delete(entity_types[0])
+    db_session_fixture.flush()
+    later = feed(db_session_fixture, since=cursor)
+    assert [(c["row_id"], c["operation"], c["data"]) for c in later["changes"]] == [
+        (entity_types[0].id, "delete", None)
+    ]
+
+
+def test_changes_rejects_invalid_cursor(db_session_fixture: Session):
+    with pytest.raises(HTTPException) as e:
+        get_changes(db_session_fixture, since="bogus", limit=10)
+    assert e.value.status_code == 400
+
+
+def test_prune_changes(db_session_fixture: Session, entity_types: list[EntityType]):
+    """Changes older than the retention period are pruned, and cursors from before
+    them are rejected"""
+    cursor = feed(db_session_fixture)["next_cursor"]
+    ids = db_session_fixture.scalars(select(Change.id).order_by(Change.id)).all()
+    db_session_fixture.execute(
+        update(Change)
+        .where(Change.id.in_(ids[:2]))
+        .values(changed_at=func.now() - timedelta(days=100))
+    )
+
+    assert prune_changes(db_session_fixture, timedelta(days=90)) == 2
+    assert prune_changes(db_session_fixture, timedelta(days=90)) == 0
+    assert db_session_fixture.scalar(PRUNED_CHANGE_ID) == ids[1]
+    assert [c["id"] for c in feed(db_session_fixture)["changes"]] == ids[2:]
+
+    # a mirror that read the pruned changes carries on; one that did not starts over
+    assert feed(db_session_fixture, since=encode_cursor(ids[1]))["changes"]
+    with pytest.raises(HTTPException) as e:
+        feed(db_session_fixture, since=encode_cursor(ids[0]))
+    assert e.value.status_code == 410
+    assert feed(db_session_fixture, since=cursor)["changes"] == []
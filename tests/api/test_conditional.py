@@ -0,0 +1,96 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException, Request
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from open_cec_api.api.conditional import (
+    RegistryValidators,
+    get_registry_validators,
+    registry_validators,
+)
+from open_cec_api.services.database.models import EntityType, RegistryVersion
+
+VALIDATORS = RegistryValidators(
+    etag='"42"', last_modified=datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+)
+
+
+def request_with(**headers: str) -> Request:
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "headers": raw})
+
+
+def test_validator_headers():
+    assert VALIDATORS.headers == {
+        "ETag": '"42"',
+        "Last-Modified": "Fri, 02 Jan 2026 03:04:05 GMT",
+    }
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({}, False),
+        ({"if-none-match": '"42"'}, True),
+        ({"if-none-match": 'W/"42"'}, True),
+        ({"if-none-match": '"7", "42"'}, True),
+        ({"if-none-match": "*"}, True),
+        ({"if-none-match": '"41"'}, False),
+        ({"if-modified-since": "Fri, 02 Jan 2026 03:04:05 GMT"}, True),
+        ({"if-modified-since": "Sat, 03 Jan 2026 00:00:00 GMT"}, True),
+        ({"if-modified-since": "Fri, 02 Jan 2026 03:04:04 GMT"}, False),
+        ({"if-modified-since": "Fri, 02 Jan 2026 03:04:05 -0000"}, True),
+        ({"if-modified-since": "yesterday"}, False),
+        # If-None-Match wins over a matching If-Modified-Since
+        (
+            {
+                "if-none-match": '"41"',
+                "if-modified-since": "Sat, 03 Jan 2026 00:00:00 GMT",
+            },
+            False,
+        ),
+    ],
+)
+def test_is_current(headers: dict[str, str], expected: bool):
+    assert VALIDATORS.is_current(headers) is expected
+
+
+def test_get_registry_validators(db_session_fixture: Session):
+    db_session_fixture.execute(
+        update(RegistryVersion).values(
+            version=41, modified_at=datetime(2026, 1, 2, 3, 4, 5, 678, timezone.utc)
+        )
+    )
+    db_session_fixture.add(EntityType(name="client", description="dummy client"))
+    db_session_fixture.flush()
+
+    validators = get_registry_validators(db_session_fixture)
+    assert validators is not None
+    assert validators.etag == '"42"'  # bumped by the insert
+    assert validators.last_modified.tzinfo is not None
+    assert validators.last_modified.microsecond == 0
+
+
+def test_registry_validators_answers_304_when_current(db_session_fixture: Session):
+    headers = registry_validators(request_with(), db_session_fixture)
+    assert set(headers) == {"ETag", "Last-Modified"}
+
+    with pytest.raises(HTTPException) as e:
+        registry_validators(
+            request_with(if_none_match=headers["ETag"]), db_session_fixture
+        )
+    assert e.value.status_code == 304
+    assert e.value.headers == headers
+
+
+def test_registry_validators_after_a_write(db_session_fixture: Session):
+    headers = registry_validators(request_with(), db_session_fixture)
+    db_session_fixture.add(EntityType(name="client", description="dummy client"))
+    db_session_fixture.flush()
+
+    changed = registry_validators(
+        request_with(if_none_match=headers["ETag"]), db_session_fixture
+    )
+    assert changed["ETag"] != headers["ETag"]
@@ -1,9 +1,15 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 from typing import Protocol
 
 import pytest
+import sqlalchemy
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+import open_cec_api.api.crud.base as crud_base
 import open_cec_api.api.crud.crud as crud
 from open_cec_api.api.schema.create import (
     CertificateCreate,
@@ -16,6 +22,7 @@ from open_cec_api.api.schema.create import (
     ListingDeviceClassCreate,
 )
 from open_cec_api.api.schema.enums import AttributeTypeEnum, StatusEnum
+from open_cec_api.api.schema.read import ListingBase
 from open_cec_api.api.schema.update import (
     CertificateUpdate,
     DeviceClassAttributeUpdate,
@@ -133,7 +140,7 @@ class TestKeyCRUD:
 
         # Delete it
         result = crud.KeyCRUD.delete(db_session_fixture, created_key.id)
-        assert result is True
+        assert result is not None and result.id == created_key.id
 
         # Verify it's gone
         deleted_key = crud.KeyCRUD.get(db_session_fixture, id=created_key.id)
@@ -142,7 +149,7 @@ class TestKeyCRUD:
     def test_delete_not_found(self, db_session_fixture: Session):
         """Test deleting a non-existent Key."""
         result = crud.KeyCRUD.delete(db_session_fixture, 999)
-        assert result is False
+        assert result is None
 
 
 class TestEntityTypeCRUD:
@@ -229,7 +236,7 @@ class TestEntityTypeCRUD:
         created_entity = crud.EntityTypeCRUD.create(db_session_fixture, entity_data)
 
         result = crud.EntityTypeCRUD.delete(db_session_fixture, created_entity.id)
-        assert result is True
+        assert result is not None and result.id == created_entity.id
 
         deleted_entity = crud.EntityTypeCRUD.get(
             db_session_fixture, id=created_entity.id
@@ -239,7 +246,7 @@ class TestEntityTypeCRUD:
     def test_delete_not_found(self, db_session_fixture: Session):
         """Test deleting a non-existent EntityType."""
         result = crud.EntityTypeCRUD.delete(db_session_fixture, 999)
-        assert result is False
+        assert result is None
 
 
 class TestDeviceClassCRUD:
@@ -327,7 +334,7 @@ class TestDeviceClassCRUD:
         created_device = crud.DeviceClassCRUD.create(db_session_fixture, device_data)
 
         result = crud.DeviceClassCRUD.delete(db_session_fixture, created_device.id)
-        assert result is True
+        assert result is not None and result.id == created_device.id
 
         deleted_device = crud.DeviceClassCRUD.get(
             db_session_fixture, id=created_device.id
@@ -337,7 +344,7 @@ class TestDeviceClassCRUD:
     def test_delete_not_found(self, db_session_fixture: Session):
         """Test deleting a non-existent DeviceClass."""
         result = crud.DeviceClassCRUD.delete(db_session_fixture, 999)
-        assert result is False
+        assert result is None
 
 
 class TestListingCRUD:
@@ -404,6 +411,29 @@ class TestListingCRUD:
         assert any(listing.manufacturer == "Tesla" for listing in result)
         assert any(listing.manufacturer == "BYD" for listing in result)
 
+    def test_get_rows_by_ids(
+        self, db_session_fixture: Session, entity_type: EntityType
+    ):
+        """Test getting Listing rows by ids, in the order the ids are given."""
+        created = [
+            crud.ListingCRUD.create(
+                db_session_fixture,
+                ListingCreate(
+                    entity_type_id=entity_type.id, manufacturer="Tesla", model=model
+                ),
+            )
+            for model in ["Powerwall", "Powerwall 2", "Powerwall 3"]
+        ]
+        ids = [created[2].id, 999, created[0].id]
+
+        rows = crud.ListingCRUD.get_rows_by_ids(db_session_fixture, ListingBase, ids)
+
+        assert [row.model for row in rows] == ["Powerwall 3", "Powerwall"]
+        assert rows[0]._fields == tuple(ListingBase.model_fields)
+        assert (
+            crud.ListingCRUD.get_rows_by_ids(db_session_fixture, ListingBase, []) == []
+        )
+
     def test_get_with_filters(
         self, db_session_fixture: Session, entity_type: EntityType
     ):
@@ -435,6 +465,35 @@ class TestListingCRUD:
         assert len(result) == 1
         assert result[0].model == "Powerwall"
 
+    def test_get_paginated(self, db_session_fixture: Session, entity_type: EntityType):
+        """Test keyset pagination of Listings by id, with and without filters."""
+        created = [
+            crud.ListingCRUD.create(
+                db_session_fixture,
+                ListingCreate(
+                    entity_type_id=entity_type.id,
+                    manufacturer="Tesla" if i % 2 else "BYD",
+                    model=f"Model {i}",
+                ),
+            )
+            for i in range(5)
+        ]
+        ids = [listing.id for listing in created]
+
+        first = crud.ListingCRUD.get(db_session_fixture, limit=2)
+        assert isinstance(first, list)
+        assert [listing.id for listing in first] == ids[:2]
+
+        rest = crud.ListingCRUD.get(db_session_fixture, limit=10, after=first[-1].id)
+        assert isinstance(rest, list)
+        assert [listing.id for listing in rest] == ids[2:]
+
+        tesla = crud.ListingCRUD.get(
+            db_session_fixture, limit=10, after=ids[1], manufacturer="Tesla"
+        )
+        assert isinstance(tesla, list)
+        assert [listing.id for listing in tesla] == [ids[3]]
+
     def test_update(self, db_session_fixture: Session, entity_type: EntityType):
         """Test updating a Listing."""
         listing_data = ListingCreate(
@@ -468,17 +527,138 @@ class TestListingCRUD:
         created_listing = crud.ListingCRUD.create(db_session_fixture, listing_data)
 
         result = crud.ListingCRUD.delete(db_session_fixture, created_listing.id)
-        assert result is True
+        assert result is not None and result.id == created_listing.id
 
         deleted_listing = crud.ListingCRUD.get(
             db_session_fixture, id=created_listing.id
         )
         assert deleted_listing is None
 
+    def test_delete_cascades(
+        self, db_session_fixture: Session, entity_type: EntityType
+    ):
+        """Deleting a Listing removes its certificates in the same statement."""
+        created_listing = crud.ListingCRUD.create(
+            db_session_fixture,
+            ListingCreate(
+                entity_type_id=entity_type.id, manufacturer="Tesla", model="Powerwall"
+            ),
+        )
+        crud.CertificateCRUD.create(
+            db_session_fixture,
+            CertificateCreate(
+                listing_id=created_listing.id,
+                expiry=date(2025, 12, 31),
+                certification_date=date(2024, 1, 1),
+                certifying_body="TUV",
+                test_profiles=["AS4777"],
+            ),
+        )
+
+        result = crud.ListingCRUD.delete(db_session_fixture, created_listing.id)
+        assert result is not None and result.manufacturer == "Tesla"
+        assert crud.CertificateCRUD.get(db_session_fixture) == []
+
     def test_delete_not_found(self, db_session_fixture: Session):
         """Test deleting a non-existent Listing."""
         result = crud.ListingCRUD.delete(db_session_fixture, 999)
-        assert result is False
+        assert result is None
+
+    def test_get_with_test_profiles_filters(
+        self, db_session_fixture: Session, entity_type: EntityType
+    ):
+        """Listings can be filtered by the test profiles of their certificates."""
+        for model, profiles in [
+            ("Powerwall", ["AS4777", "IEEE1547"]),
+            ("Powerwall 2", ["AS4777"]),
+            ("Powerwall 3", []),
+        ]:
+            listing = crud.ListingCRUD.create(
+                db_session_fixture,
+                ListingCreate(
+                    entity_type_id=entity_type.id, manufacturer="Tesla", model=model
+                ),
+            )
+            if profiles:
+                crud.CertificateCRUD.create(
+                    db_session_fixture,
+                    CertificateCreate(
+                        listing_id=listing.id,
+                        expiry=date(2025, 12, 31),
+                        certification_date=date(2024, 1, 1),
+                        certifying_body="TUV",
+                        test_profiles=profiles,
+                    ),
+                )
+
+        def models(**filters) -> list[str]:
+            result = crud.ListingCRUD.get(db_session_fixture, **filters)
+            assert isinstance(result, list)
+            return [x.model for x in result]
+
+        assert models(test_profiles=["AS4777", "IEEE1547"]) == ["Powerwall"]
+        assert models(test_profiles_any=["AS4777", "IEC61215"]) == [
+            "Powerwall",
+            "Powerwall 2",
+        ]
+
+    def test_upsert(self, db_session_fixture: Session, entity_type: EntityType):
+        """Upserting the same manufacturer/model updates the existing Listing."""
+        listing_data = ListingCreate(
+            entity_type_id=entity_type.id, manufacturer="Tesla", model="Powerwall"
+        )
+        created = crud.ListingCRUD.upsert(db_session_fixture, listing_data)
+
+        listing_data.status = StatusEnum.suspended
+        result = crud.ListingCRUD.upsert(db_session_fixture, listing_data)
+
+        assert result.id == created.id
+        assert result.status == "suspended"
+        assert result.created_at == created.created_at
+        assert len(crud.ListingCRUD.get(db_session_fixture)) == 1  # type: ignore[arg-type]
+
+    def test_upsert_many(
+        self,
+        db_session_fixture: Session,
+        entity_type: EntityType,
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Bulk upsert inserts new Listings, updates existing ones and isolates errors."""
+        monkeypatch.setattr(crud_base, "BULK_CHUNK_SIZE", 2)
+        existing = crud.ListingCRUD.create(
+            db_session_fixture,
+            ListingCreate(
+                entity_type_id=entity_type.id, manufacturer="Tesla", model="Powerwall"
+            ),
+        )
+        listings = [
+            ListingCreate(
+                entity_type_id=entity_type_id,
+                manufacturer="Tesla",
+                model=model,
+                status=status,
+            )
+            for entity_type_id, model, status in [
+                (entity_type.id, "Powerwall", StatusEnum.expired),
+                (entity_type.id, "Powerwall 2", StatusEnum.active),
+                (999, "Powerwall 3", StatusEnum.active),  # no such entity type
+                (entity_type.id, "Powerwall 2", StatusEnum.suspended),
+            ]
+        ]
+
+        outcomes = crud.ListingCRUD.upsert_many(db_session_fixture, listings)
+
+        assert [o.error is None for o in outcomes] == [True, True, False, True]
+        assert outcomes[0].instance is not None
+        assert outcomes[0].instance.id == existing.id
+        assert "foreign key" in (outcomes[2].error or "")
+
+        stored = crud.ListingCRUD.get(db_session_fixture)
+        assert isinstance(stored, list)
+        assert [(x.model, x.status) for x in stored] == [
+            ("Powerwall", "expired"),
+            ("Powerwall 2", "suspended"),
+        ]
 
 
 class TestListingDeviceClassCRUD:
@@ -566,7 +746,7 @@ class TestListingDeviceClassCRUD:
         created_ldc = crud.ListingDeviceClassCRUD.create(db_session_fixture, ldc_data)
 
         result = crud.ListingDeviceClassCRUD.delete(db_session_fixture, created_ldc.id)
-        assert result is True
+        assert result is not None and result.id == created_ldc.id
 
         deleted_ldc = crud.ListingDeviceClassCRUD.get(
             db_session_fixture, id=created_ldc.id
@@ -678,7 +858,7 @@ class TestDeviceClassAttributeCRUD:
         result = crud.DeviceClassAttributeCRUD.delete(
             db_session_fixture, created_attr.id
         )
-        assert result is True
+        assert result is not None and result.id == created_attr.id
 
         deleted_attr = crud.DeviceClassAttributeCRUD.get(
             db_session_fixture, id=created_attr.id
@@ -698,10 +878,30 @@ class TestListingDeviceClassAttributeCRUD:
             db_session_fixture, device_class_data
         )
 
+        for name, attribute_type in [
+            ("capacity", AttributeTypeEnum.number),
+            ("voltage", AttributeTypeEnum.number),
+            ("to_delete", AttributeTypeEnum.string),
+        ]:
+            crud.DeviceClassAttributeCRUD.create(
+                db_session_fixture,
+                DeviceClassAttributeCreate(
+                    device_class_id=device_class.id,
+                    attribute_name=name,
+                    attribute_type=attribute_type,
+                ),
+            )
+
         listing_data = ListingCreate(
             entity_type_id=entity_type.id, manufacturer="Tesla", model="Powerwall"
         )
         listing = crud.ListingCRUD.create(db_session_fixture, listing_data)
+        crud.ListingDeviceClassCRUD.create(
+            db_session_fixture,
+            ListingDeviceClassCreate(
+                listing_id=listing.id, device_class_id=device_class.id
+            ),
+        )
 
         return {
             "entity_type": entity_type,
@@ -826,7 +1026,7 @@ class TestListingDeviceClassAttributeCRUD:
         result = crud.ListingDeviceClassAttributeCRUD.delete(
             db_session_fixture, created_attr.id
         )
-        assert result is True
+        assert result is not None and result.id == created_attr.id
 
         deleted_attr = crud.ListingDeviceClassAttributeCRUD.get(
             db_session_fixture, id=created_attr.id
@@ -1013,7 +1213,7 @@ class TestCertificateCRUD:
         created_cert = crud.CertificateCRUD.create(db_session_fixture, cert_data)
 
         result = crud.CertificateCRUD.delete(db_session_fixture, created_cert.id)
-        assert result is True
+        assert result is not None and result.id == created_cert.id
 
         deleted_cert = crud.CertificateCRUD.get(db_session_fixture, id=created_cert.id)
         assert deleted_cert is None
@@ -1021,7 +1221,43 @@ class TestCertificateCRUD:
     def test_delete_not_found(self, db_session_fixture: Session):
         """Test deleting a non-existent Certificate."""
         result = crud.CertificateCRUD.delete(db_session_fixture, 999)
-        assert result is False
+        assert result is None
+
+    def test_create_many(
+        self,
+        db_session_fixture: Session,
+        setup_data: dict[str, HasIdProtocol],
+        monkeypatch: pytest.MonkeyPatch,
+    ):
+        """Test bulk creation reports each item, isolating the failing rows."""
+        monkeypatch.setattr(crud_base, "BULK_CHUNK_SIZE", 2)
+        listing_ids = [setup_data["listing"].id] * 5
+        listing_ids[3] = 999  # no such listing
+        certs = [
+            CertificateCreate(
+                listing_id=listing_id,
+                expiry=date(2025, 12, 31),
+                certification_date=date(2024, 1, 1),
+                certifying_body=f"Body {i}",
+                test_profiles=["AS4777"],
+            )
+            for i, listing_id in enumerate(listing_ids)
+        ]
+
+        outcomes = crud.CertificateCRUD.create_many(db_session_fixture, certs)
+
+        assert [o.error is None for o in outcomes] == [True, True, True, False, True]
+        assert [o.instance.certifying_body for o in outcomes if o.instance] == [
+            "Body 0",
+            "Body 1",
+            "Body 2",
+            "Body 4",
+        ]
+        assert "foreign key" in (outcomes[3].error or "")
+
+        stored = crud.CertificateCRUD.get(db_session_fixture)
+        assert isinstance(stored, list)
+        assert len(stored) == 4
 
     def test_get_with_test_profiles_filter(
         self, db_session_fixture: Session, setup_data: dict[str, HasIdProtocol]
@@ -1052,3 +1288,272 @@ class TestCertificateCRUD:
         assert len(result) == 1
         assert result[0].certifying_body == "UL"
         assert "AS4777" in result[0].test_profiles
+
+    def test_get_with_test_profiles_all_and_any(
+        self, db_session_fixture: Session, setup_data: dict[str, HasIdProtocol]
+    ):
+        """Test all-of (@>) and any-of (&&) filtering on test profiles."""
+        for body, profiles in [
+            ("UL", ["AS4777", "IEEE1547"]),
+            ("TUV", ["AS4777", "IEC61730"]),
+            ("CSA", ["IEC61215"]),
+        ]:
+            crud.CertificateCRUD.create(
+                db_session_fixture,
+                CertificateCreate(
+                    listing_id=setup_data["listing"].id,
+                    expiry=date(2025, 12, 31),
+                    certification_date=date(2024, 1, 1),
+                    certifying_body=body,
+                    test_profiles=profiles,
+                ),
+            )
+
+        def bodies(**filters) -> list[str]:
+            result = crud.CertificateCRUD.get(db_session_fixture, **filters)
+            assert isinstance(result, list)
+            return [c.certifying_body for c in result]
+
+        assert bodies(test_profiles=["AS4777", "IEEE1547"]) == ["UL"]
+        assert bodies(test_profiles_any=["IEEE1547", "IEC61215"]) == ["UL", "CSA"]
+        assert bodies(test_profiles=["AS4777"], test_profiles_any=["IEC61730"]) == [
+            "TUV"
+        ]
+
+
+@pytest.mark.anyio
+class TestAsyncListingCRUD:
+    @pytest.fixture
+    async def entity_type(self, async_db_session_fixture: AsyncSession):
+        """Create an EntityType for testing Listings."""
+        entity_data = EntityTypeCreate(name="server", description="Server type")
+        return await crud.EntityTypeCRUD.acreate(async_db_session_fixture, entity_data)
+
+    async def test_acreate(
+        self, async_db_session_fixture: AsyncSession, entity_type: EntityType
+    ):
+        """Test creating a new Listing on an AsyncSession."""
+        listing_data = ListingCreate(
+            entity_type_id=entity_type.id, manufacturer="Tesla", model="Powerwall"
+        )
+        result = await crud.ListingCRUD.acreate(async_db_session_fixture, listing_data)
+
+        assert result.id is not None
+        assert result.manufacturer == "Tesla"
+        assert result.created_at is not None
+
+    async def test_aget(
+        self, async_db_session_fixture: AsyncSession, entity_type: EntityType
+    ):
+        """Test getting Listings by ID and by filter on an AsyncSession."""
+        for model in ["Powerwall", "Powerwall 2"]:
+            await crud.ListingCRUD.acreate(
+                async_db_session_fixture,
+                ListingCreate(
+                    entity_type_id=entity_type.id, manufacturer="Tesla", model=model
+                ),
+            )
+
+        result = await crud.ListingCRUD.aget(async_db_session_fixture, model="wall 2")
+        assert isinstance(result, list)
+        assert len(result) == 1
+
+        by_id = await crud.ListingCRUD.aget(async_db_session_fixture, id=result[0].id)
+        assert isinstance(by_id, Listing)
+        assert by_id.model == "Powerwall 2"
+
+        assert await crud.ListingCRUD.aget(async_db_session_fixture, id=999) is None
+
+    async def test_aget_rows(
+        self, async_db_session_fixture: AsyncSession, entity_type: EntityType
+    ):
+        """Test getting Listing rows of the read schema's fields on an AsyncSession."""
+        for model in ["Powerwall", "Powerwall 2"]:
+            await crud.ListingCRUD.acreate(
+                async_db_session_fixture,
+                ListingCreate(
+                    entity_type_id=entity_type.id, manufacturer="Tesla", model=model
+                ),
+            )
+
+        rows = await crud.ListingCRUD.aget_rows(
+            async_db_session_fixture, ListingBase, model="wall 2"
+        )
+        assert len(rows) == 1
+        assert rows[0]._fields == tuple(ListingBase.model_fields)
+        assert rows[0].model == "Powerwall 2"
+
+    async def test_aget_rows_by_ids(
+        self, async_db_session_fixture: AsyncSession, entity_type: EntityType
+    ):
+        """Test getting Listing rows by ids on an AsyncSession."""
+        created = [
+            await crud.ListingCRUD.acreate(
+                async_db_session_fixture,
+                ListingCreate(
+                    entity_type_id=entity_type.id, manufacturer="Tesla", model=model
+                ),
+            )
+            for model in ["Powerwall", "Powerwall 2"]
+        ]
+
+        rows = await crud.ListingCRUD.aget_rows_by_ids(
+            async_db_session_fixture, ListingBase, [created[1].id, created[0].id]
+        )
+        assert [row.model for row in rows] == ["Powerwall 2", "Powerwall"]
+
+    async def test_aupdate(
+        self, async_db_session_fixture: AsyncSession, entity_type: EntityType
+    ):
+        """Test updating a Listing on an AsyncSession."""
+        created = await crud.ListingCRUD.acreate(
+            async_db_session_fixture,
+            ListingCreate(
+                entity_type_id=entity_type.id, manufacturer="Tesla", model="Powerwall"
+            ),
+        )
+
+        result = await crud.ListingCRUD.aupdate(
+            async_db_session_fixture, created.id, ListingUpdate(model="Powerwall 3")
+        )
+
+        assert result is not None
+        assert result.model == "Powerwall 3"
+        assert result.manufacturer == "Tesla"
+        assert (
+            await crud.ListingCRUD.aupdate(
+                async_db_session_fixture, 999, ListingUpdate(model="x")
+            )
+            is None
+        )
+
+    async def test_adelete_cascades(
+        self, async_db_session_fixture: AsyncSession, entity_type: EntityType
+    ):
+        """Deleting a Listing on an AsyncSession also deletes its certificates."""
+        created = await crud.ListingCRUD.acreate(
+            async_db_session_fixture,
+            ListingCreate(
+                entity_type_id=entity_type.id, manufacturer="Tesla", model="Powerwall"
+            ),
+        )
+        await crud.CertificateCRUD.acreate(
+            async_db_session_fixture,
+            CertificateCreate(
+                listing_id=created.id,
+                expiry=date(2025, 12, 31),
+                certification_date=date(2024, 1, 1),
+                certifying_body="UL",
+                test_profiles=["AS4777"],
+            ),
+        )
+
+        assert await crud.ListingCRUD.adelete(async_db_session_fixture, created.id)
+        assert await crud.CertificateCRUD.aget(async_db_session_fixture) == []
+        assert not await crud.ListingCRUD.adelete(async_db_session_fixture, created.id)
+
+    async def test_acreate_many(
+        self, async_db_session_fixture: AsyncSession, entity_type: EntityType
+    ):
+        """Test bulk creation on an AsyncSession, with a duplicate listing."""
+        listings = [
+            ListingCreate(
+                entity_type_id=entity_type.id, manufacturer="Tesla", model=model
+            )
+            for model in ["Powerwall", "Powerwall 2", "Powerwall"]
+        ]
+
+        outcomes = await crud.ListingCRUD.acreate_many(
+            async_db_session_fixture, listings
+        )
+
+        assert [o.error is None for o in outcomes] == [True, True, False]
+        assert outcomes[0].instance is not None
+        assert outcomes[0].instance.created_at is not None
+        assert len(await crud.ListingCRUD.aget(async_db_session_fixture)) == 2  # type: ignore[arg-type]
+
+    async def test_aupsert(
+        self, async_db_session_fixture: AsyncSession, entity_type: EntityType
+    ):
+        """Test single and bulk upsert on an AsyncSession."""
+        created = await crud.ListingCRUD.aupsert(
+            async_db_session_fixture,
+            ListingCreate(
+                entity_type_id=entity_type.id, manufacturer="Tesla", model="Powerwall"
+            ),
+        )
+        outcomes = await crud.ListingCRUD.aupsert_many(
+            async_db_session_fixture,
+            [
+                ListingCreate(
+                    entity_type_id=entity_type.id,
+                    manufacturer="Tesla",
+                    model=model,
+                    status=StatusEnum.suspended,
+                )
+                for model in ["Powerwall", "Powerwall 2"]
+            ],
+        )
+
+        assert [o.error for o in outcomes] == [None, None]
+        assert outcomes[0].instance is not None
+        assert outcomes[0].instance.id == created.id
+        assert outcomes[0].instance.status == "suspended"
+        assert len(await crud.ListingCRUD.aget(async_db_session_fixture)) == 2  # type: ignore[arg-type]
+
+
+def wait_for_lock_waits(engine: sqlalchemy.Engine, count: int = 1) -> None:
+    """Wait until count sessions are waiting on a lock"""
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        # a new transaction each time, as pg_stat_activity is read once per transaction
+        with engine.connect() as conn:
+            waiting = conn.exec_driver_sql(
+                "SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock'"
+            ).scalar_one()
+        if waiting >= count:
+            return
+        time.sleep(0.01)
+    raise TimeoutError("No session is waiting on a lock")
+
+
+def test_writes_take_the_registry_lock_first(db_engine_fixture: sqlalchemy.Engine):
+    """A CRUD write queues for the registry version before locking any row, so another
+    transaction holding the version can still write that row and commit, rather than
+    the two deadlocking"""
+    with db_engine_fixture.begin() as conn:
+        first, second = conn.scalars(
+            insert(EntityType).returning(EntityType.id),
+            [{"name": f"lock {n}", "description": ""} for n in (1, 2)],
+        ).all()
+
+    try:
+        # the pool is left last, once other has let go of its locks
+        with (
+            ThreadPoolExecutor(1) as pool,
+            Session(db_engine_fixture) as session,
+            db_engine_fixture.connect() as other,
+        ):
+            # the registry trigger takes the version lock on this write
+            other.execute(
+                update(EntityType).where(EntityType.id == first).values(description="a")
+            )
+            pending = pool.submit(
+                crud.EntityTypeCRUD.update,
+                session,
+                second,
+                EntityTypeUpdate(description="crud"),
+            )
+            wait_for_lock_waits(db_engine_fixture)
+            other.execute(
+                update(EntityType)
+                .where(EntityType.id == second)
+                .values(description="b")
+            )
+            other.commit()
+
+            updated = pending.result(timeout=10)
+            assert updated is not None and updated.description == "crud"
+    finally:
+        with db_engine_fixture.begin() as conn:
+            conn.execute(delete(EntityType).where(EntityType.id.in_([first, second])))
@@ -0,0 +1,158 @@
+import json
+from typing import AsyncGenerator
+
+import pytest
+import sqlalchemy
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import open_cec_api.api.events as events_module
+import open_cec_api.api.public_router as public_router_module
+from open_cec_api.api.events import ChangeHub, Subscription, change_events
+from open_cec_api.api.pagination import decode_cursor, encode_cursor
+from open_cec_api.api.public_router import stream_changes
+from open_cec_api.services.database.models import EntityType, RegistryVersion
+
+pytestmark = pytest.mark.anyio
+
+# the hub only hears committed writes, so these tests commit and clean up after
+WAIT = 5.0
+
+
+@pytest.fixture
+async def hub(db_engine_fixture: sqlalchemy.Engine) -> AsyncGenerator[ChangeHub, None]:
+    engine = create_async_engine(
+        db_engine_fixture.url.set(drivername="postgresql+asyncpg")
+    )
+    hub = ChangeHub(engine, queue_size=10)
+    try:
+        yield hub
+    finally:
+        await hub.stop()
+        await engine.dispose()
+        with db_engine_fixture.begin() as conn:
+            conn.execute(delete(EntityType))
+
+
+def write_entity_types(engine: sqlalchemy.Engine, *names: str) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            insert(EntityType),
+            [{"name": name, "description": f"dummy {name}"} for name in names],
+        )
+
+
+async def next_event(events: AsyncGenerator[str, None]) -> dict:
+    """The next event in the stream, skipping the retry preamble and keepalives"""
+    while True:
+        message = await anext(events)
+        if message.startswith("id: "):
+            id_line, data_line = message.strip().split("\n")
+            change = json.loads(data_line.removeprefix("data: "))
+            assert decode_cursor(id_line.removeprefix("id: ")) == change["id"]
+            return change
+
+
+async def test_subscribers_share_one_listener(
+    hub: ChangeHub, db_engine_fixture: sqlalchemy.Engine
+):
+    async with hub.subscribe() as first, hub.subscribe() as second:
+        assert hub.subscriber_count == 2
+        assert hub.engine.pool.checkedout() == 1  # type: ignore[attr-defined]
+
+        write_entity_types(db_engine_fixture, "client")
+        received = [await first.get(WAIT), await second.get(WAIT)]
+
+    assert received[0] is not None and received[0] == received[1]
+    assert received[0].table_name == "entity_types"
+    assert received[0].data["name"] == "client"
+    assert hub.subscriber_count == 0
+
+
+async def test_uncommitted_writes_are_not_published(
+    hub: ChangeHub, db_engine_fixture: sqlalchemy.Engine
+):
+    async with hub.subscribe() as subscription:
+        with db_engine_fixture.connect() as conn:
+            conn.execute(insert(EntityType).values(name="client", description="x"))
+            conn.rollback()
+        assert await subscription.get(0.5) is None
+
+
+async def test_full_subscription_is_dropped(
+    hub: ChangeHub, db_engine_fixture: sqlalchemy.Engine
+):
+    hub.queue_size = 1
+    async with hub.subscribe() as subscription:
+        write_entity_types(db_engine_fixture, "client", "server")
+        first = await subscription.get(WAIT)
+
+        assert first is not None and first.data["name"] == "client"
+        assert subscription.exhausted
+        assert hub.subscriber_count == 0
+
+
+async def test_change_events_resume_after_last_event(
+    hub: ChangeHub, db_engine_fixture: sqlalchemy.Engine
+):
+    write_entity_types(db_engine_fixture, "client", "server")
+    await hub.start()  # the hub is ahead of the client, which replays from the log
+    async with hub.subscribe() as subscription:
+        write_entity_types(db_engine_fixture, "other")
+        live = await subscription.get(WAIT)
+    assert live is not None
+
+    events = change_events(hub, after=live.id - 2)
+    try:
+        assert await anext(events) == "retry: 5000\n\n"
+        replayed = [await next_event(events), await next_event(events)]
+        assert [c["data"]["name"] for c in replayed] == ["server", "other"]
+
+        write_entity_types(db_engine_fixture, "fourth")
+        change = await next_event(events)
+        assert change["id"] == live.id + 1
+        assert change["data"]["name"] == "fourth"
+    finally:
+        await events.aclose()
+
+
+async def test_change_events_filter_tables(
+    hub: ChangeHub, db_engine_fixture: sqlalchemy.Engine, monkeypatch
+):
+    monkeypatch.setattr(events_module, "KEEPALIVE_INTERVAL", 0.1)
+    write_entity_types(db_engine_fixture, "client")
+    events = change_events(hub, after=0, tables=["listings"])
+    try:
+        await anext(events)  # retry
+        assert await anext(events) == ": keepalive\n\n"  # nothing to replay
+    finally:
+        await events.aclose()
+
+
+async def test_subscription_buffers_until_dropped():
+    subscription = Subscription(maxsize=1)
+    assert subscription.offer("a")  # type: ignore[arg-type]
+    assert not subscription.offer("b")  # type: ignore[arg-type]
+    assert subscription.dropped and not subscription.exhausted
+
+
+async def test_stream_rejects_invalid_cursor():
+    with pytest.raises(HTTPException) as e:
+        await stream_changes(last_event_id="nonsense", since=encode_cursor(1))
+    assert e.value.status_code == 400
+
+
+async def test_stream_rejects_pruned_cursor(
+    hub: ChangeHub, db_engine_fixture: sqlalchemy.Engine, monkeypatch
+):
+    monkeypatch.setattr(public_router_module, "change_hub", hub)
+    with db_engine_fixture.begin() as conn:
+        conn.execute(update(RegistryVersion).values(pruned_change_id=5))
+    try:
+        with pytest.raises(HTTPException) as e:
+            await stream_changes(last_event_id=encode_cursor(4), since=None)
+        assert e.value.status_code == 410
+    finally:
+        with db_engine_fixture.begin() as conn:
+            conn.execute(update(RegistryVersion).values(pruned_change_id=0))
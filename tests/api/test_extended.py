@@ -0,0 +1,366 @@
+import json
+from datetime import date, datetime
+from typing import Any
+
+import pytest
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from open_cec_api.api.autocomplete import listing_completions
+from open_cec_api.api.crud.base import InvalidWriteError
+from open_cec_api.api.crud.extended import (
+    LISTING_RELATIONS,
+    acreate_listing_detail,
+    eager_get_listings,
+    get_listing_detail_json,
+    get_listing_details_json,
+    get_listing_documents_by_ids,
+    iter_listing_detail_lines,
+    listing_document,
+    listing_to_detail_dict,
+    parse_include,
+)
+from open_cec_api.api.reference import reference_data
+from open_cec_api.api.schema.create import ListingDetailCreate
+from open_cec_api.api.schema.read import ListingBase
+from open_cec_api.services.database.models import (
+    Certificate,
+    DeviceClass,
+    DeviceClassAttribute,
+    EntityType,
+    Listing,
+    ListingDeviceClass,
+    ListingDeviceClassAttribute,
+)
+
+
+def normalise_timestamps(value: Any) -> Any:
+    """Parse ISO timestamps, which Postgres and Python print to different precision"""
+    if isinstance(value, dict):
+        return {k: normalise_timestamps(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [normalise_timestamps(v) for v in value]
+    if isinstance(value, str) and "T" in value:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return value
+
+
+@pytest.fixture
+def listings(db_session_fixture: Session) -> list[Listing]:
+    """Three listings; the first two have a device class, attributes and certificates"""
+    entity_type = EntityType(name="client", description="dummy client")
+    device_class = DeviceClass(name="bess", description="dummy bess")
+    db_session_fixture.add_all([entity_type, device_class])
+    db_session_fixture.flush()
+    db_session_fixture.add_all(
+        [
+            DeviceClassAttribute(
+                device_class_id=device_class.id,
+                attribute_name=name,
+                attribute_type="number",
+                description=f"dummy {name}",
+            )
+            for name in ["capacity", "power"]
+        ]
+    )
+
+    listings = [
+        Listing(entity_type_id=entity_type.id, manufacturer="Tesla", model=model)
+        for model in ["Powerwall", "Powerwall 2", "Powerwall 3"]
+    ]
+    db_session_fixture.add_all(listings)
+    db_session_fixture.flush()
+
+    for i, listing in enumerate(listings[:2]):
+        db_session_fixture.add_all(
+            [
+                ListingDeviceClass(
+                    listing_id=listing.id, device_class_id=device_class.id
+                ),
+                ListingDeviceClassAttribute(
+                    listing_id=listing.id,
+                    device_class_id=device_class.id,
+                    attribute_name="capacity",
+                    attribute_value=str(10 + i),
+                ),
+                Certificate(
+                    listing_id=listing.id,
+                    expiry=date(2030, 1, 1),
+                    certification_date=date(2024, 1, 1),
+                    certifying_body="TUV",
+                    test_profiles=["AS4777", f"P{i}"],
+                ),
+            ]
+        )
+    db_session_fixture.commit()
+    return listings
+
+
+def test_detail_document_matches_eager_load(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    """The SQL-built document has the same content as the eager-loaded ORM graph"""
+    for listing in listings:
+        document = get_listing_detail_json(db_session_fixture, listing.id)
+        assert document is not None
+
+        expected = listing_to_detail_dict(
+            eager_get_listings(db_session_fixture, listing.id)  # type: ignore[arg-type]
+        )
+        assert normalise_timestamps(json.loads(document)) == normalise_timestamps(
+            expected
+        )
+
+
+def test_detail_document_not_found(db_session_fixture: Session):
+    assert get_listing_detail_json(db_session_fixture, 999) is None
+
+
+def test_detail_pages(db_session_fixture: Session, listings: list[Listing]):
+    """Pages are in id order and report whether another page follows"""
+    first = get_listing_details_json(db_session_fixture, limit=2)
+    assert [d["model"] for d in json.loads(first.documents)] == [
+        "Powerwall",
+        "Powerwall 2",
+    ]
+    assert first.has_more
+    assert first.last_id == listings[1].id
+
+    last = get_listing_details_json(db_session_fixture, limit=2, after=first.last_id)
+    assert [d["model"] for d in json.loads(last.documents)] == ["Powerwall 3"]
+    assert not last.has_more
+
+
+def test_detail_pages_with_filters(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    """Detail pages accept the same filters as ListingCRUD.get"""
+    page = get_listing_details_json(db_session_fixture, limit=10, test_profiles=["P1"])
+    assert [d["model"] for d in json.loads(page.documents)] == ["Powerwall 2"]
+
+    empty = get_listing_details_json(db_session_fixture, limit=10, model="nope")
+    assert json.loads(empty.documents) == []
+    assert empty.last_id is None
+    assert not empty.has_more
+
+
+def test_parse_include():
+    assert parse_include("certificates, entity_type,certificates") == [
+        "entity_type",
+        "certificates",
+    ]
+    assert parse_include("") == []
+    with pytest.raises(ValueError, match="bogus"):
+        parse_include("certificates,bogus")
+
+
+# the table only the relation's subquery reads
+RELATION_TABLES = {
+    "entity_type": "entity_types",
+    "device_classes": "listing_device_classes",
+    "attributes": "listing_device_class_attributes",
+    "certificates": "certificates",
+}
+
+
+@pytest.mark.parametrize("name", list(LISTING_RELATIONS))
+def test_listing_document_includes_only_requested_relation(
+    db_session_fixture: Session, listings: list[Listing], name: str
+):
+    """The relation is as in the detail document, and the others are not queried"""
+    document = listing_document([name])
+    sql = str(select(document))
+    for other, table in RELATION_TABLES.items():
+        assert (f"FROM {table}" in sql) == (other == name)
+
+    id = listings[0].id
+    found = json.loads(get_listing_detail_json(db_session_fixture, id, document) or "")
+    detail = json.loads(get_listing_detail_json(db_session_fixture, id) or "")
+    key = LISTING_RELATIONS[name].key
+    assert found[key] == detail[key]
+    assert set(found) == {key, *ListingBase.model_fields}
+    assert found["entity_type_id"] == listings[0].entity_type_id
+
+
+def test_listing_documents_pages_and_ids(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    document = listing_document(["certificates"])
+    page = get_listing_details_json(
+        db_session_fixture, limit=10, document=document, test_profiles=["P1"]
+    )
+    assert [len(d["certificates"]) for d in json.loads(page.documents)] == [1]
+
+    ids = [listings[2].id, 999, listings[0].id]
+    rows = get_listing_documents_by_ids(db_session_fixture, ids, document)
+    assert [row.id for row in rows] == [listings[2].id, listings[0].id]
+    assert json.loads(rows[0].document)["certificates"] == []
+
+
+def test_export_lines(db_session_fixture: Session, listings: list[Listing]):
+    """The export is each detail document on its own line, batch_size lines a chunk"""
+    chunks = list(iter_listing_detail_lines(db_session_fixture, batch_size=2))
+    assert [chunk.count("\n") for chunk in chunks] == [2, 1]
+
+    assert "".join(chunks).splitlines() == [
+        get_listing_detail_json(db_session_fixture, listing.id) for listing in listings
+    ]
+
+
+def test_export_lines_with_filters(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    lines = "".join(
+        iter_listing_detail_lines(db_session_fixture, test_profiles_any=["P0", "P1"])
+    ).splitlines()
+    assert [json.loads(line)["model"] for line in lines] == [
+        "Powerwall",
+        "Powerwall 2",
+    ]
+
+
+def test_export_reads_from_server_side_cursor(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    """Rows are fetched through a named (server-side) cursor, not loaded all at once"""
+    cursor_names = []
+
+    def record_cursor(conn, cursor, statement, parameters, context, executemany):
+        cursor_names.append(cursor.name)
+
+    connection = db_session_fixture.connection()
+    event.listen(connection, "before_cursor_execute", record_cursor)
+    try:
+        list(iter_listing_detail_lines(db_session_fixture, batch_size=1))
+    finally:
+        event.remove(connection, "before_cursor_execute", record_cursor)
+
+    assert len(cursor_names) == 1
+    assert cursor_names[0] is not None
+
+
+@pytest.fixture
+async def detail_references(
+    async_db_session_fixture: AsyncSession,
+) -> tuple[EntityType, DeviceClass]:
+    """An entity type and a device class with a number and an enum attribute"""
+    session = async_db_session_fixture
+    reference_data.load({})
+    listing_completions.load([])
+    entity_type = EntityType(name="client", description="dummy client")
+    device_class = DeviceClass(name="bess", description="dummy bess")
+    session.add_all([entity_type, device_class])
+    await session.flush()
+    session.add_all(
+        DeviceClassAttribute(
+            device_class_id=device_class.id,
+            attribute_name=name,
+            attribute_type=attribute_type,
+        )
+        for name, attribute_type in [("capacity", "number"), ("chemistry", "enum")]
+    )
+    await session.flush()
+    yield entity_type, device_class
+    reference_data.load({})
+    listing_completions.load([])
+
+
+def detail_create(
+    entity_type: EntityType, device_class_id: int, capacity: str
+) -> ListingDetailCreate:
+    return ListingDetailCreate.model_validate(
+        {
+            "entity_type_id": entity_type.id,
+            "manufacturer": "Tesla",
+            "model": "Powerwall 3",
+            "device_classes": [
+                {
+                    "device_class_id": device_class_id,
+                    "attributes": [
+                        {"attribute_name": "capacity", "attribute_value": capacity},
+                        {"attribute_name": "chemistry", "attribute_value": "LFP"},
+                    ],
+                }
+            ],
+            "certificates": [
+                {
+                    "expiry": "2030-01-01",
+                    "certification_date": "2025-01-01",
+                    "certifying_body": "TUV",
+                    "test_profiles": ["AS4777"],
+                }
+            ],
+        }
+    )
+
+
+async def count_listings(session: AsyncSession) -> int:
+    count = await session.scalar(select(func.count()).select_from(Listing))
+    return count or 0
+
+
+@pytest.mark.anyio
+async def test_create_listing_detail(
+    async_db_session_fixture: AsyncSession,
+    detail_references: tuple[EntityType, DeviceClass],
+):
+    """The listing and everything nested in it are created and returned as detail"""
+    entity_type, device_class = detail_references
+    document = json.loads(
+        await acreate_listing_detail(
+            async_db_session_fixture,
+            detail_create(entity_type, device_class.id, "13.5 kWh"),
+        )
+    )
+
+    assert document["entity_type"] == "client"
+    assert [d["device_class"]["name"] for d in document["device_classes"]] == ["bess"]
+    assert [
+        (a["attribute_name"], a["attribute_value"])
+        for a in document["listing_device_class_attributes"]
+    ] == [("capacity", "13.5 kWh"), ("chemistry", "LFP")]
+    assert [c["test_profiles"] for c in document["certificates"]] == [["AS4777"]]
+
+    stored = await async_db_session_fixture.get(
+        ListingDeviceClassAttribute,
+        document["listing_device_class_attributes"][0]["id"],
+    )
+    assert stored is not None and stored.listing_id == document["id"]
+    assert listing_completions.complete("model", "powerwall", 10) == ["Powerwall 3"]
+
+
+@pytest.mark.anyio
+async def test_create_listing_detail_rejects_invalid_attributes(
+    async_db_session_fixture: AsyncSession,
+    detail_references: tuple[EntityType, DeviceClass],
+):
+    """Invalid values are reported by position before anything is written"""
+    entity_type, device_class = detail_references
+    with pytest.raises(
+        InvalidWriteError, match=r"device_classes\[0\]\.attributes\[0\]: .*capacity"
+    ):
+        await acreate_listing_detail(
+            async_db_session_fixture,
+            detail_create(entity_type, device_class.id, "lots"),
+        )
+    assert await count_listings(async_db_session_fixture) == 0
+
+
+@pytest.mark.anyio
+async def test_create_listing_detail_is_all_or_nothing(
+    async_db_session_fixture: AsyncSession,
+    detail_references: tuple[EntityType, DeviceClass],
+):
+    """A failing nested insert leaves the listing uncommitted"""
+    entity_type, device_class = detail_references
+    schema = detail_create(entity_type, device_class.id, "13.5 kWh")
+    schema.device_classes.append(schema.device_classes[0])
+
+    with pytest.raises(IntegrityError):
+        await acreate_listing_detail(async_db_session_fixture, schema)
+    assert listing_completions.complete("model", "powerwall", 10) == []
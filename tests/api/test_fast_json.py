@@ -0,0 +1,170 @@
+from datetime import date, datetime
+from typing import Any, Union
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+import open_cec_api.api.crud.crud as crud
+import open_cec_api.api.schema.read as read_schema
+from open_cec_api.api.crud.base import CRUDClass
+from open_cec_api.api.fast_json import encode_rows, rows_page_response
+from open_cec_api.api.pagination import NEXT_CURSOR_HEADER, PageParams, split_page
+from open_cec_api.services.database.models import (
+    Certificate,
+    DeviceClass,
+    DeviceClassAttribute,
+    EntityType,
+    Key,
+    Listing,
+    ListingDeviceClass,
+    ListingDeviceClassAttribute,
+)
+
+CASES: list[tuple[type[CRUDClass], type[BaseModel]]] = [
+    (crud.KeyCRUD, read_schema.KeyBase),
+    (crud.EntityTypeCRUD, read_schema.EntityTypeBase),
+    (crud.DeviceClassCRUD, read_schema.DeviceClassBase),
+    (crud.ListingCRUD, read_schema.ListingBase),
+    (crud.ListingDeviceClassCRUD, read_schema.ListingDeviceClassBase),
+    (crud.DeviceClassAttributeCRUD, read_schema.DeviceClassAttributeBase),
+    (
+        crud.ListingDeviceClassAttributeCRUD,
+        read_schema.ListingDeviceClassAttributeBase,
+    ),
+    (crud.CertificateCRUD, read_schema.CertificateBase),
+]
+
+# escapes, non-ASCII and astral characters must come out exactly as json.dumps has them
+AWKWARD = 'Émile "quoted" \\ back/slash\nnew line \x01   😀'
+
+
+def fastapi_body(schema: type[BaseModel], instances: list[Any]) -> bytes:
+    """The body FastAPI sends when a list route returns these ORM instances."""
+    app = FastAPI()
+    app.get("/", response_model=Union[schema, list[schema]])(lambda: instances)
+    return TestClient(app).get("/").content
+
+
+@pytest.fixture
+def registry(db_session_fixture: Session) -> None:
+    """A few rows in every table, with nullable columns both set and null"""
+    session = db_session_fixture
+    session.add_all(
+        [
+            Key(value="hash-1", description=AWKWARD),
+            Key(value="hash-2", description="second", fingerprint="f" * 64),
+        ]
+    )
+    entity_types = [
+        EntityType(name="client", description=AWKWARD),
+        EntityType(name="server", description="server"),
+    ]
+    device_classes = [
+        DeviceClass(name="bess", description=AWKWARD),
+        # whole seconds, which both encoders write without a fraction
+        DeviceClass(
+            name="inverter", description="inverter", created_at=datetime(2024, 1, 1)
+        ),
+    ]
+    session.add_all(entity_types + device_classes)
+    session.flush()
+
+    session.add_all(
+        [
+            DeviceClassAttribute(
+                device_class_id=device_classes[0].id,
+                attribute_name="capacity",
+                attribute_type="number",
+                description=AWKWARD,
+            ),
+            DeviceClassAttribute(
+                device_class_id=device_classes[1].id,
+                attribute_name="phases",
+                attribute_type="enum",
+                description="phases",
+            ),
+        ]
+    )
+    listings = [
+        Listing(
+            entity_type_id=entity_types[i % 2].id,
+            manufacturer=AWKWARD if i == 0 else "Tesla",
+            model=f"Powerwall {i}",
+            status="active" if i % 2 else "expired",
+        )
+        for i in range(5)
+    ]
+    session.add_all(listings)
+    session.flush()
+
+    for i, listing in enumerate(listings):
+        session.add_all(
+            [
+                ListingDeviceClass(
+                    listing_id=listing.id, device_class_id=device_classes[0].id
+                ),
+                ListingDeviceClassAttribute(
+                    listing_id=listing.id,
+                    device_class_id=device_classes[0].id,
+                    attribute_name="capacity",
+                    attribute_value=AWKWARD if i == 0 else f"{i}.5",
+                ),
+                Certificate(
+                    listing_id=listing.id,
+                    expiry=date(2030, 1, i + 1),
+                    certification_date=date(2024, 1, 1),
+                    certifying_body=AWKWARD,
+                    test_profiles=[] if i == 0 else ["AS4777", f"P{i}"],
+                ),
+            ]
+        )
+    session.commit()
+
+
+@pytest.mark.parametrize(
+    "crud_class, schema", CASES, ids=[schema.__name__ for _, schema in CASES]
+)
+def test_rows_encode_like_response_model(
+    db_session_fixture: Session,
+    registry: None,
+    crud_class: type[CRUDClass],
+    schema: type[BaseModel],
+):
+    """The fast path writes byte for byte what response_model serialisation wrote"""
+    instances = crud_class.get(db_session_fixture)
+    assert instances
+
+    rows = crud_class.get_rows(db_session_fixture, schema)
+    expected = fastapi_body(schema, instances)  # type: ignore[arg-type]
+    assert encode_rows(rows) == expected
+
+
+def test_filtered_page_matches_split_page(db_session_fixture: Session, registry: None):
+    """A filtered page carries the same items and cursor as split_page produced"""
+    page = PageParams(limit=2, after=None)
+    filters = {"manufacturer": "tesla", "test_profiles_any": ["P2", "P3", "P4"]}
+
+    instances = crud.ListingCRUD.get(db_session_fixture, limit=3, **filters)
+    expected_headers = Response()
+    expected = split_page(instances, page, expected_headers)  # type: ignore[arg-type]
+
+    rows = crud.ListingCRUD.get_rows(
+        db_session_fixture, read_schema.ListingBase, limit=3, **filters
+    )
+    response = rows_page_response(rows, page)
+
+    assert response.body == fastapi_body(read_schema.ListingBase, expected)
+    assert (
+        response.headers[NEXT_CURSOR_HEADER]
+        == (expected_headers.headers[NEXT_CURSOR_HEADER])
+    )
+    assert response.media_type == "application/json"
+
+
+def test_last_page_has_no_cursor(db_session_fixture: Session, registry: None):
+    rows = crud.ListingCRUD.get_rows(db_session_fixture, read_schema.ListingBase)
+    response = rows_page_response(rows, PageParams(limit=len(rows), after=None))
+    assert NEXT_CURSOR_HEADER not in response.headers
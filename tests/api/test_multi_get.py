@@ -0,0 +1,63 @@
+import json
+from typing import NamedTuple
+
+import pytest
+from fastapi import HTTPException
+
+from open_cec_api.api.multi_get import (
+    MAX_IDS,
+    MISSING_IDS_HEADER,
+    ids_param,
+    parse_ids,
+    rows_by_ids_response,
+)
+
+
+class Row(NamedTuple):
+    id: int
+    model: str
+
+
+def test_parse_ids_keeps_order_and_drops_repeats():
+    assert parse_ids("3, 1,2,3") == [3, 1, 2]
+
+
+@pytest.mark.parametrize(
+    "ids", ["", "1,,2", "1,a", "-1", "1.5", "\u00b2", "0", "1,2147483648", "9" * 30]
+)
+def test_parse_ids_rejects_malformed(ids: str):
+    with pytest.raises(ValueError):
+        parse_ids(ids)
+
+
+def test_ids_param():
+    assert ids_param(None) is None
+    assert ids_param("2,1") == [2, 1]
+
+    with pytest.raises(HTTPException) as e:
+        ids_param("x")
+    assert e.value.status_code == 400
+
+    assert ids_param("2147483647") == [2147483647]
+    with pytest.raises(HTTPException) as e:
+        ids_param("2147483648")
+    assert e.value.status_code == 400
+
+    with pytest.raises(HTTPException) as e:
+        ids_param(",".join(str(i) for i in range(MAX_IDS + 1)))
+    assert e.value.status_code == 400
+
+
+def test_rows_by_ids_response_reports_missing_ids():
+    response = rows_by_ids_response([Row(3, "c"), Row(1, "a")], [3, 2, 1, 4])
+
+    assert json.loads(response.body) == [
+        {"id": 3, "model": "c"},
+        {"id": 1, "model": "a"},
+    ]
+    assert response.headers[MISSING_IDS_HEADER] == "2,4"
+
+
+def test_rows_by_ids_response_omits_header_when_all_found():
+    response = rows_by_ids_response([Row(1, "a")], [1])
+    assert MISSING_IDS_HEADER not in response.headers
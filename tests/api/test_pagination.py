@@ -0,0 +1,68 @@
+import pytest
+from fastapi import HTTPException, Response
+
+from open_cec_api.api.pagination import (
+    NEXT_CURSOR_HEADER,
+    PageParams,
+    decode_cursor,
+    decode_rank_cursor,
+    encode_cursor,
+    encode_rank_cursor,
+    page_params,
+    split_page,
+)
+
+
+class Row:
+    def __init__(self, id: int):
+        self.id = id
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(12345)) == 12345
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "eDox", "aWQ6LTE"])
+def test_decode_cursor_rejects_malformed(cursor: str):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_rank_cursor_round_trip():
+    rank = 0.10000000149011612  # a real rank, widened to double precision
+    assert decode_rank_cursor(encode_rank_cursor(rank, 7)) == (rank, 7)
+
+
+@pytest.mark.parametrize(
+    "cursor", ["", encode_cursor(1), "cmFuazpuYW46MQ", "cmFuazowLjU6LTE"]
+)
+def test_decode_rank_cursor_rejects_malformed(cursor: str):
+    """Including id cursors, a NaN rank and a negative id"""
+    with pytest.raises(ValueError):
+        decode_rank_cursor(cursor)
+
+
+def test_page_params_rejects_invalid_cursor():
+    with pytest.raises(HTTPException) as e:
+        page_params(limit=10, cursor="bogus")
+    assert e.value.status_code == 400
+
+
+def test_split_page_sets_next_cursor_when_more_rows():
+    """A page fetched with limit + 1 rows is trimmed and points past its last row."""
+    response = Response()
+    rows = [Row(1), Row(2), Row(3)]
+
+    items = split_page(rows, PageParams(limit=2, after=None), response)
+
+    assert [r.id for r in items] == [1, 2]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == 2
+
+
+def test_split_page_omits_cursor_on_last_page():
+    response = Response()
+
+    items = split_page([Row(1)], PageParams(limit=2, after=None), response)
+
+    assert [r.id for r in items] == [1]
+    assert NEXT_CURSOR_HEADER not in response.headers
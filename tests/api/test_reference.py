@@ -0,0 +1,146 @@
+from typing import Generator
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+
+import open_cec_api.api.crud.crud as crud
+from open_cec_api.api.public_router import listing_filters
+from open_cec_api.api.reference import load_reference_data, reference_data
+from open_cec_api.api.schema.create import (
+    DeviceClassAttributeCreate,
+    DeviceClassCreate,
+    EntityTypeCreate,
+    ListingCreate,
+    ListingDeviceClassCreate,
+)
+from open_cec_api.api.schema.enums import AttributeTypeEnum
+from open_cec_api.api.schema.update import (
+    DeviceClassAttributeUpdate,
+    EntityTypeUpdate,
+)
+from open_cec_api.services.database.models import DeviceClass, EntityType
+
+
+@pytest.fixture(autouse=True)
+def empty_reference_data() -> Generator[None, None, None]:
+    """The registry lives for the whole process, so start and finish each test empty"""
+    reference_data.load({})
+    yield
+    reference_data.load({})
+
+
+def test_writes_update_reference_data(db_session_fixture: Session):
+    session = db_session_fixture
+    client = crud.EntityTypeCRUD.create(
+        session, EntityTypeCreate(name="client", description="dummy")
+    )
+    bess = crud.DeviceClassCRUD.create(
+        session, DeviceClassCreate(name="BESS", description="battery")
+    )
+    capacity = crud.DeviceClassAttributeCRUD.create(
+        session,
+        DeviceClassAttributeCreate(
+            device_class_id=bess.id,
+            attribute_name="capacity",
+            attribute_type=AttributeTypeEnum.number,
+        ),
+    )
+    assert reference_data.entity_type_id("client") == client.id
+    assert reference_data.device_class_id("BESS") == bess.id
+    assert reference_data.attribute_types(bess.id) == {"capacity": "number"}
+
+    crud.EntityTypeCRUD.update(session, client.id, EntityTypeUpdate(name="server"))
+    crud.DeviceClassAttributeCRUD.update(
+        session, capacity.id, DeviceClassAttributeUpdate(attribute_type="string")
+    )
+    assert reference_data.entity_type_id("client") is None
+    assert reference_data.entity_type_id("server") == client.id
+    assert reference_data.attribute_types(bess.id) == {"capacity": "string"}
+
+    crud.DeviceClassAttributeCRUD.delete(session, capacity.id)
+    assert reference_data.attribute_types(bess.id) == {}
+
+
+def test_bulk_writes_update_reference_data(db_session_fixture: Session):
+    outcomes = crud.DeviceClassCRUD.create_many(
+        db_session_fixture,
+        [DeviceClassCreate(name=f"class {i}", description="dummy") for i in range(3)],
+    )
+    assert [reference_data.device_class_id(f"class {i}") for i in range(3)] == [
+        o.instance.id for o in outcomes if o.instance is not None
+    ]
+
+
+def test_load_reads_every_reference_table(db_session_fixture: Session):
+    session = db_session_fixture
+    session.add_all(
+        [
+            EntityType(name="client", description="dummy"),
+            DeviceClass(name="BESS", description="battery"),
+        ]
+    )
+    session.flush()
+
+    load_reference_data(session)
+    assert reference_data.entity_type_id("client") is not None
+    assert reference_data.device_class_id("BESS") is not None
+
+
+def test_listing_filters_resolve_names(db_session_fixture: Session):
+    session = db_session_fixture
+    client = crud.EntityTypeCRUD.create(
+        session, EntityTypeCreate(name="client", description="dummy")
+    )
+    bess = crud.DeviceClassCRUD.create(
+        session, DeviceClassCreate(name="BESS", description="battery")
+    )
+    request = Request({"type": "http", "query_string": b"", "headers": []})
+
+    filters = listing_filters(request, "client", "BESS", *[None] * 5)
+    assert filters == {"entity_type_id": client.id, "device_class_id": bess.id}
+
+    with pytest.raises(HTTPException) as e:
+        listing_filters(request, "nonsense", *[None] * 6, session=session)
+    assert e.value.status_code == 400
+
+
+def test_listing_filters_fetch_names_written_elsewhere(db_session_fixture: Session):
+    """A name written by another worker is found in the database, and kept"""
+    session = db_session_fixture
+    # written without the CRUD classes, so this worker does not hear of them
+    client = EntityType(name="client", description="dummy")
+    bess = DeviceClass(name="BESS", description="battery")
+    session.add_all([client, bess])
+    session.flush()
+    request = Request({"type": "http", "query_string": b"", "headers": []})
+
+    filters = listing_filters(request, "client", "BESS", *[None] * 5, session=session)
+    assert filters == {"entity_type_id": client.id, "device_class_id": bess.id}
+    assert reference_data.entity_type_id("client") == client.id
+    assert reference_data.device_class_id("BESS") == bess.id
+
+
+def test_device_class_filter(db_session_fixture: Session):
+    session = db_session_fixture
+    client = crud.EntityTypeCRUD.create(
+        session, EntityTypeCreate(name="client", description="dummy")
+    )
+    bess = crud.DeviceClassCRUD.create(
+        session, DeviceClassCreate(name="BESS", description="battery")
+    )
+    listings = [
+        crud.ListingCRUD.create(
+            session,
+            ListingCreate(entity_type_id=client.id, manufacturer="Acme", model=model),
+        )
+        for model in ("battery", "inverter")
+    ]
+    crud.ListingDeviceClassCRUD.create(
+        session,
+        ListingDeviceClassCreate(listing_id=listings[0].id, device_class_id=bess.id),
+    )
+
+    rows = crud.ListingCRUD.get(session, device_class_id=bess.id)
+    assert [row.id for row in rows] == [listings[0].id]
@@ -0,0 +1,175 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from open_cec_api.api.crud.search import search_listings
+from open_cec_api.api.pagination import NEXT_CURSOR_HEADER
+from open_cec_api.api.public_router import get_listing_search
+from open_cec_api.services.database.models import (
+    DeviceClass,
+    EntityType,
+    Listing,
+    ListingDeviceClass,
+    ListingDeviceClassAttribute,
+    ListingSearchDocument,
+)
+
+
+@pytest.fixture
+def listings(db_session_fixture: Session) -> list[Listing]:
+    """Three listings: a hybrid LiFePO4 battery, an inverter and an expired battery"""
+    session = db_session_fixture
+    entity_type = EntityType(name="client", description="dummy client")
+    hybrid = DeviceClass(name="hybrid", description="hybrid inverter")
+    inverter = DeviceClass(name="inverter", description="inverter")
+    session.add_all([entity_type, hybrid, inverter])
+    session.flush()
+
+    listings = [
+        Listing(
+            entity_type_id=entity_type.id, manufacturer="Acme", model="PowerStore 5kW"
+        ),
+        Listing(entity_type_id=entity_type.id, manufacturer="Volt", model="Inverter X"),
+        Listing(
+            entity_type_id=entity_type.id,
+            manufacturer="Acme",
+            model="Old Battery",
+            status="expired",
+        ),
+    ]
+    session.add_all(listings)
+    session.flush()
+
+    for listing, device_class, chemistry in [
+        (listings[0], hybrid, "LiFePO4"),
+        (listings[1], inverter, "none"),
+        (listings[2], hybrid, "LiFePO4"),
+    ]:
+        session.add_all(
+            [
+                ListingDeviceClass(
+                    listing_id=listing.id, device_class_id=device_class.id
+                ),
+                ListingDeviceClassAttribute(
+                    listing_id=listing.id,
+                    device_class_id=device_class.id,
+                    attribute_name="chemistry",
+                    attribute_value=chemistry,
+                ),
+            ]
+        )
+    session.flush()
+    return listings
+
+
+def ids(session: Session, q: str, **kwargs) -> list[int]:
+    return [row.id for row in search_listings(session, q, **kwargs)]
+
+
+def test_search_spans_listing_device_classes_and_attributes(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    """Each word may come from the model, a device class name or an attribute value"""
+    hits = ids(db_session_fixture, "LiFePO4 5kW hybrid")
+    assert hits == [listings[0].id]
+
+
+def test_search_ranks_listing_fields_first(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    """A match on the model ranks above a match on a device class name"""
+    db_session_fixture.execute(
+        update(Listing).where(Listing.id == listings[2].id).values(model="Inverter Y")
+    )
+    rows = search_listings(db_session_fixture, "inverter")
+    assert [row.id for row in rows] == [listings[1].id, listings[2].id]
+    assert rows[0].rank > rows[1].rank
+
+
+def test_search_stems_and_filters(db_session_fixture: Session, listings: list[Listing]):
+    assert ids(db_session_fixture, "batteries") == [listings[2].id]
+    assert ids(db_session_fixture, "hybrids", status="active") == [listings[0].id]
+    assert ids(db_session_fixture, "acme -old") == [listings[0].id]
+
+
+def test_search_documents_follow_writes(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    session = db_session_fixture
+    session.execute(
+        update(ListingDeviceClassAttribute)
+        .where(ListingDeviceClassAttribute.listing_id == listings[1].id)
+        .values(attribute_value="NMC")
+    )
+    assert ids(session, "nmc") == [listings[1].id]
+
+    session.execute(
+        update(DeviceClass)
+        .where(DeviceClass.name == "hybrid")
+        .values(name="ac coupled")
+    )
+    assert ids(session, "hybrid") == []
+    assert ids(session, "coupled") == [listings[0].id, listings[2].id]
+
+    session.execute(
+        delete(ListingDeviceClass).where(
+            ListingDeviceClass.listing_id == listings[0].id
+        )
+    )
+    assert ids(session, "coupled") == [listings[2].id]
+
+    session.execute(delete(Listing).where(Listing.id == listings[2].id))
+    documents = session.scalars(select(ListingSearchDocument.listing_id)).all()
+    assert sorted(documents) == [listings[0].id, listings[1].id]
+
+
+def test_search_pages_through_ties_in_id_order(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    """Resuming after each page's last (rank, id) visits every hit exactly once"""
+    everything = search_listings(db_session_fixture, "lifepo4 or inverter")
+    assert len(everything) == 3
+
+    seen, after = [], None
+    while True:
+        page = search_listings(
+            db_session_fixture, "lifepo4 or inverter", limit=1, after=after
+        )
+        if not page:
+            break
+        seen.extend(page)
+        after = (page[-1].rank, page[-1].id)
+    assert seen == everything
+
+
+def test_search_route_pages_with_cursor(
+    db_session_fixture: Session, listings: list[Listing]
+):
+    def search(**kwargs):
+        kwargs.setdefault("cursor", None)
+        return get_listing_search(db_session_fixture, {}, {}, q="acme", **kwargs)
+
+    first = search(limit=1)
+    cursor = first.headers[NEXT_CURSOR_HEADER]
+    rest = search(limit=1, cursor=cursor)
+    assert NEXT_CURSOR_HEADER not in rest.headers
+
+    hits = json.loads(first.body) + json.loads(rest.body)
+    assert [hit["id"] for hit in hits] == [listings[0].id, listings[2].id]
+    assert set(hits[0]) == {
+        "id",
+        "entity_type_id",
+        "manufacturer",
+        "model",
+        "status",
+        "created_at",
+        "updated_at",
+        "rank",
+    }
+
+    with pytest.raises(HTTPException) as e:
+        search(limit=1, cursor="bogus")
+    assert e.value.status_code == 400
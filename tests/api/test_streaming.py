@@ -0,0 +1,47 @@
+import gzip
+
+import pytest
+from fastapi import Request
+
+from open_cec_api.api.streaming import (
+    NDJSON_MEDIA_TYPE,
+    accepts_gzip,
+    gzip_chunks,
+    ndjson_response,
+)
+
+
+def request_with(accept_encoding: str) -> Request:
+    headers = [(b"accept-encoding", accept_encoding.encode())]
+    return Request({"type": "http", "headers": headers})
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [("gzip, deflate, br", True), ("br", False), ("", False)],
+)
+def test_accepts_gzip(accept_encoding: str, expected: bool):
+    assert accepts_gzip(request_with(accept_encoding)) is expected
+
+
+def test_gzip_chunks_round_trip():
+    chunks = [f'{{"id": {i}, "model": "Powerwall é"}}\n' * 100 for i in range(50)]
+    compressed = list(gzip_chunks(chunks))
+
+    assert len(compressed) > 1  # output is streamed, not buffered until the end
+    assert gzip.decompress(b"".join(compressed)).decode() == "".join(chunks)
+
+
+def test_gzip_chunks_of_nothing_is_an_empty_gzip_stream():
+    assert gzip.decompress(b"".join(gzip_chunks([]))) == b""
+
+
+def test_ndjson_response_compresses_only_when_accepted():
+    plain = ndjson_response(request_with("br"), iter(["{}\n"]))
+    assert plain.media_type == NDJSON_MEDIA_TYPE
+    assert "content-encoding" not in plain.headers
+
+    compressed = ndjson_response(request_with("gzip"), iter(["{}\n"]))
+    assert compressed.media_type == NDJSON_MEDIA_TYPE
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["vary"] == "Accept-Encoding"
@@ -0,0 +1,253 @@
+from typing import Generator
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import open_cec_api.api.crud.crud as crud
+from open_cec_api.api.crud.base import InvalidWriteError
+from open_cec_api.api.reference import reference_data
+from open_cec_api.api.schema.create import ListingDeviceClassAttributeCreate
+from open_cec_api.api.schema.update import ListingDeviceClassAttributeUpdate
+from open_cec_api.api.validation import AttributeValidator, validate_attributes
+from open_cec_api.services.database.models import (
+    DeviceClass,
+    DeviceClassAttribute,
+    EntityType,
+    Listing,
+    ListingDeviceClass,
+)
+
+ATTRIBUTE_TYPES = {
+    "capacity": "number",
+    "grid_forming": "boolean",
+    "chemistry": "enum",
+    "notes": "string",
+}
+
+
+@pytest.mark.parametrize(
+    ("name", "value", "valid"),
+    [
+        ("capacity", "13.5 kWh", True),
+        ("capacity", "200-800V", True),
+        ("capacity", "1,000", True),
+        ("capacity", "lots", False),
+        ("capacity", "\u0661\u0662\u0663", False),  # Arabic-Indic digits
+        ("capacity", "\u0665 kWh", False),
+        ("grid_forming", " Yes ", True),
+        ("grid_forming", "sometimes", False),
+        ("chemistry", "LiFePO4", True),
+        ("chemistry", "  ", False),
+        ("chemistry", "x" * 256, False),
+        ("notes", "anything at all", True),
+        ("capacity", None, True),
+        ("voltage", "400V", False),
+    ],
+)
+def test_validator_checks_values_by_type(name: str, value: str, valid: bool):
+    error = AttributeValidator(ATTRIBUTE_TYPES)(name, value)
+    assert (error is None) == valid, error
+
+
+def test_validate_attributes_reports_each_row():
+    validators = {1: AttributeValidator(ATTRIBUTE_TYPES)}
+    rows = [
+        {"device_class_id": 1, "attribute_name": "capacity", "attribute_value": "5"},
+        {"device_class_id": 1, "attribute_name": "capacity", "attribute_value": "x"},
+        {"device_class_id": 2, "attribute_name": "capacity", "attribute_value": "5"},
+        {"device_class_id": 1, "attribute_name": "capacity", "attribute_value": "x"},
+    ]
+    errors = validate_attributes(validators, rows)
+    assert errors[0] is None and errors[2] is not None
+    assert errors[1] is not None and errors[1] == errors[3]
+
+
+@pytest.fixture(autouse=True)
+def empty_reference_data() -> Generator[None, None, None]:
+    reference_data.load({})
+    yield
+    reference_data.load({})
+
+
+@pytest.fixture
+def listing_and_class(db_session_fixture: Session) -> tuple[Listing, DeviceClass]:
+    """A listing of a device class that defines ATTRIBUTE_TYPES, written around the
+    CRUD classes so the reference data has not seen them"""
+    session = db_session_fixture
+    entity_type = EntityType(name="client", description="dummy client")
+    device_class = DeviceClass(name="BESS", description="battery")
+    session.add_all([entity_type, device_class])
+    session.flush()
+    listing = Listing(entity_type_id=entity_type.id, manufacturer="Acme", model="X")
+    session.add(listing)
+    session.flush()
+    session.add(
+        ListingDeviceClass(listing_id=listing.id, device_class_id=device_class.id)
+    )
+    session.add_all(
+        DeviceClassAttribute(
+            device_class_id=device_class.id,
+            attribute_name=name,
+            attribute_type=attribute_type,
+        )
+        for name, attribute_type in ATTRIBUTE_TYPES.items()
+    )
+    session.flush()
+    return listing, device_class
+
+
+def attribute(
+    listing_and_class: tuple[Listing, DeviceClass], name: str, value: str
+) -> ListingDeviceClassAttributeCreate:
+    listing, device_class = listing_and_class
+    return ListingDeviceClassAttributeCreate(
+        listing_id=listing.id,
+        device_class_id=device_class.id,
+        attribute_name=name,
+        attribute_value=value,
+    )
+
+
+def test_create_checks_value(
+    db_session_fixture: Session, listing_and_class: tuple[Listing, DeviceClass]
+):
+    """Definitions unknown to the worker are loaded before values are rejected"""
+    created = crud.ListingDeviceClassAttributeCRUD.create(
+        db_session_fixture, attribute(listing_and_class, "capacity", "10 kWh")
+    )
+    assert created.number_min == 10
+
+    with pytest.raises(InvalidWriteError, match="grid_forming"):
+        crud.ListingDeviceClassAttributeCRUD.create(
+            db_session_fixture, attribute(listing_and_class, "grid_forming", "maybe")
+        )
+
+
+def test_only_missing_definitions_are_fetched(
+    db_session_fixture: Session, listing_and_class: tuple[Listing, DeviceClass]
+):
+    """A miss fetches just the named definition, and an undefined name changes
+    nothing, rather than reloading all the reference data"""
+    _, device_class = listing_and_class
+    crud.ListingDeviceClassAttributeCRUD.create(
+        db_session_fixture, attribute(listing_and_class, "capacity", "10 kWh")
+    )
+    assert reference_data.attribute_types(device_class.id) == {"capacity": "number"}
+    assert reference_data.device_class_id("BESS") is None
+
+    snapshot = reference_data.snapshot
+    for _ in range(2):
+        with pytest.raises(InvalidWriteError, match="voltage"):
+            crud.ListingDeviceClassAttributeCRUD.create(
+                db_session_fixture, attribute(listing_and_class, "voltage", "400V")
+            )
+    assert reference_data.snapshot is snapshot
+
+
+def test_create_many_rejects_invalid_rows_before_inserting(
+    db_session_fixture: Session, listing_and_class: tuple[Listing, DeviceClass]
+):
+    outcomes = crud.ListingDeviceClassAttributeCRUD.create_many(
+        db_session_fixture,
+        [
+            attribute(listing_and_class, "capacity", "lots"),
+            attribute(listing_and_class, "chemistry", "NMC"),
+            attribute(listing_and_class, "voltage", "400V"),
+            attribute(listing_and_class, "notes", "compact"),
+        ],
+    )
+    assert [o.error is None for o in outcomes] == [False, True, False, True]
+    assert outcomes[1].instance is not None
+    assert outcomes[1].instance.attribute_name == "chemistry"
+    assert outcomes[3].instance is not None
+    assert outcomes[3].instance.attribute_name == "notes"
+
+
+def test_listing_must_have_the_device_class(
+    db_session_fixture: Session, listing_and_class: tuple[Listing, DeviceClass]
+):
+    listing, device_class = listing_and_class
+    other = DeviceClass(name="inverter", description="inverter")
+    db_session_fixture.add(other)
+    db_session_fixture.flush()
+    db_session_fixture.add(
+        DeviceClassAttribute(
+            device_class_id=other.id, attribute_name="phases", attribute_type="number"
+        )
+    )
+    db_session_fixture.flush()
+
+    outcomes = crud.ListingDeviceClassAttributeCRUD.create_many(
+        db_session_fixture,
+        [
+            ListingDeviceClassAttributeCreate(
+                listing_id=listing.id,
+                device_class_id=other.id,
+                attribute_name="phases",
+                attribute_value="3",
+            )
+        ],
+    )
+    assert outcomes[0].error is not None
+    assert "listing_device_classes" in outcomes[0].error
+
+
+def test_update_checks_value(
+    db_session_fixture: Session, listing_and_class: tuple[Listing, DeviceClass]
+):
+    created = crud.ListingDeviceClassAttributeCRUD.create(
+        db_session_fixture, attribute(listing_and_class, "capacity", "10 kWh")
+    )
+    updated = crud.ListingDeviceClassAttributeCRUD.update(
+        db_session_fixture,
+        created.id,
+        ListingDeviceClassAttributeUpdate(attribute_value="20 kWh"),
+    )
+    assert updated is not None and updated.number_max == 20
+
+    with pytest.raises(InvalidWriteError):
+        crud.ListingDeviceClassAttributeCRUD.update(
+            db_session_fixture,
+            created.id,
+            ListingDeviceClassAttributeUpdate(attribute_value="lots"),
+        )
+
+
+@pytest.mark.anyio
+async def test_async_writes_check_values(async_db_session_fixture: AsyncSession):
+    session = async_db_session_fixture
+    entity_type = EntityType(name="client", description="dummy client")
+    device_class = DeviceClass(name="BESS", description="battery")
+    session.add_all([entity_type, device_class])
+    await session.flush()
+    listing = Listing(entity_type_id=entity_type.id, manufacturer="Acme", model="X")
+    session.add_all(
+        [
+            listing,
+            DeviceClassAttribute(
+                device_class_id=device_class.id,
+                attribute_name="capacity",
+                attribute_type="number",
+            ),
+        ]
+    )
+    await session.flush()
+    session.add(
+        ListingDeviceClass(listing_id=listing.id, device_class_id=device_class.id)
+    )
+    await session.flush()
+
+    outcomes = await crud.ListingDeviceClassAttributeCRUD.acreate_many(
+        session,
+        [
+            attribute((listing, device_class), "capacity", value)
+            for value in ("5", "five")
+        ],
+    )
+    assert [o.error is None for o in outcomes] == [True, False]
+
+    with pytest.raises(InvalidWriteError):
+        await crud.ListingDeviceClassAttributeCRUD.acreate(
+            session, attribute((listing, device_class), "capacity", "five")
+        )
@@ -1,8 +1,9 @@
 from datetime import date
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 import pytest
 import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 from testcontainers.postgres import PostgresContainer
 
@@ -56,6 +57,31 @@ def db_session_fixture(
         connection.close()
 
 
+@pytest.fixture(scope="function")
+async def async_db_session_fixture(
+    db_engine_fixture: sqlalchemy.Engine,
+) -> AsyncGenerator[AsyncSession, None]:
+    engine = create_async_engine(
+        db_engine_fixture.url.set(drivername="postgresql+asyncpg")
+    )
+    connection = await engine.connect()
+    transaction = await connection.begin()
+
+    session = AsyncSession(
+        autoflush=False,
+        expire_on_commit=False,
+        bind=connection,
+    )
+    try:
+        yield session
+    finally:
+        await session.close()
+        if transaction.is_active:
+            await transaction.rollback()
+        await connection.close()
+        await engine.dispose()
+
+
 @pytest.fixture
 def dummy_entity_type_factory(db_session_fixture: Session):
     def _create(**kwargs):
@@ -0,0 +1,85 @@
+-- The schema of a database created before deploy/migrations existed, as create_all
+-- made it from the original models. The migration tests upgrade it.
+
+CREATE TABLE device_classes (
+    id SERIAL NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    description TEXT NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (name)
+);
+
+CREATE TABLE entity_types (
+    id SERIAL NOT NULL,
+    name VARCHAR(50) NOT NULL,
+    description TEXT NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (name)
+);
+
+CREATE TABLE keys (
+    id SERIAL NOT NULL,
+    value VARCHAR(50) NOT NULL,
+    description TEXT NOT NULL,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE device_class_attributes (
+    id SERIAL NOT NULL,
+    device_class_id INTEGER NOT NULL,
+    attribute_name VARCHAR(100) NOT NULL,
+    attribute_type VARCHAR(50) NOT NULL,
+    description TEXT,
+    PRIMARY KEY (id),
+    UNIQUE (device_class_id, attribute_name),
+    FOREIGN KEY(device_class_id) REFERENCES device_classes (id)
+);
+
+CREATE TABLE listings (
+    id SERIAL NOT NULL,
+    entity_type_id INTEGER NOT NULL,
+    manufacturer VARCHAR(255) NOT NULL,
+    model VARCHAR(255) NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    updated_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (manufacturer, model),
+    FOREIGN KEY(entity_type_id) REFERENCES entity_types (id)
+);
+
+CREATE TABLE certificates (
+    id SERIAL NOT NULL,
+    listing_id INTEGER NOT NULL,
+    expiry DATE NOT NULL,
+    certification_date DATE NOT NULL,
+    certifying_body VARCHAR(100) NOT NULL,
+    test_profiles VARCHAR[] NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(listing_id) REFERENCES listings (id)
+);
+
+CREATE TABLE listing_device_class_attributes (
+    id SERIAL NOT NULL,
+    listing_id INTEGER NOT NULL,
+    device_class_id INTEGER NOT NULL,
+    attribute_name VARCHAR(100) NOT NULL,
+    attribute_value TEXT NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (listing_id, device_class_id, attribute_name),
+    FOREIGN KEY(listing_id) REFERENCES listings (id),
+    FOREIGN KEY(device_class_id) REFERENCES device_classes (id)
+);
+
+CREATE TABLE listing_device_classes (
+    id SERIAL NOT NULL,
+    listing_id INTEGER NOT NULL,
+    device_class_id INTEGER NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (listing_id, device_class_id),
+    FOREIGN KEY(listing_id) REFERENCES listings (id),
+    FOREIGN KEY(device_class_id) REFERENCES device_classes (id)
+);
@@ -0,0 +1,75 @@
+import logging
+import time
+from unittest import mock
+
+import pytest
+
+from open_cec_api.services.database.db import (
+    ENGINES_PER_WORKER,
+    CheckoutTimingQueuePool,
+    DatabaseSettings,
+    db_settings,
+)
+
+
+def test_pool_limits_split_budget_across_workers():
+    """Derived pool sizes share the connection budget between every engine."""
+    settings = DatabaseSettings(
+        connection_budget=90, replicas=1, OPEN_CEC_API_WORKERS_COUNT=4
+    )
+
+    pool_size, max_overflow = settings.pool_limits
+
+    assert (pool_size, max_overflow) == (5, 6)
+    assert 4 * ENGINES_PER_WORKER * (pool_size + max_overflow) <= 90
+
+
+def test_pool_limits_account_for_replicas():
+    settings = DatabaseSettings(
+        connection_budget=90, replicas=3, OPEN_CEC_API_WORKERS_COUNT=4
+    )
+
+    pool_size, max_overflow = settings.pool_limits
+
+    assert 3 * 4 * ENGINES_PER_WORKER * (pool_size + max_overflow) <= 90
+
+
+def test_pool_limits_respect_explicit_sizes_within_budget():
+    settings = DatabaseSettings(connection_budget=60, pool_size=10, max_overflow=5)
+
+    assert settings.pool_limits == (10, 5)
+
+
+def test_pool_limits_clamp_explicit_sizes_over_budget():
+    settings = DatabaseSettings(connection_budget=40, pool_size=15, max_overflow=15)
+
+    assert settings.pool_limits == (15, 5)
+
+
+def test_pool_limits_never_below_one_connection():
+    settings = DatabaseSettings(connection_budget=1, OPEN_CEC_API_WORKERS_COUNT=8)
+
+    assert settings.pool_limits == (1, 0)
+
+
+def test_slow_checkout_is_logged(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+):
+    """Checkouts slower than pool_checkout_warn are logged."""
+    from loguru import logger
+
+    handler_id = logger.add(caplog.handler, format="{message}")
+    monkeypatch.setattr(db_settings, "pool_checkout_warn", 0.01)
+
+    def slow_connect():
+        time.sleep(0.02)
+        return mock.MagicMock()  # stands in for a DBAPI connection
+
+    pool = CheckoutTimingQueuePool(slow_connect, pool_size=1)
+    try:
+        with caplog.at_level(logging.WARNING):
+            pool.connect()
+    finally:
+        logger.remove(handler_id)
+
+    assert "Waited" in caplog.text
@@ -0,0 +1,437 @@
+"""Tests that the SQL migrations in deploy/migrations bring a database created before
+they existed up to date, and can be re-run"""
+
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+import sqlalchemy
+from sqlalchemy import delete, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from open_cec_api.api.crud.search import search_listings
+from open_cec_api.services.database.models import (
+    Base,
+    Certificate,
+    Change,
+    DeviceClass,
+    DeviceClassAttribute,
+    EntityType,
+    Listing,
+    ListingDeviceClass,
+    ListingDeviceClassAttribute,
+    RegistryVersion,
+)
+
+MIGRATIONS_DIR = Path(__file__).parents[3] / "deploy" / "migrations"
+MIGRATIONS = sorted(MIGRATIONS_DIR.glob("*.sql"))
+BASELINE_SCHEMA = Path(__file__).with_name("baseline_schema.sql")
+
+
+def statements(script: str) -> Iterator[str]:
+    """The statements of a migration, split as psql splits them: at a semicolon ending
+    a line outside a $$ quoted body."""
+    lines: list[str] = []
+    quoted = False
+    for line in script.splitlines():
+        if not lines and (not line.strip() or line.startswith("--")):
+            continue
+        lines.append(line)
+        quoted ^= line.count("$$") % 2 == 1
+        if not quoted and line.rstrip().endswith(";"):
+            yield "\n".join(lines)
+            lines = []
+
+
+def run_migration(engine: sqlalchemy.Engine, name: str) -> None:
+    """Run a migration one statement at a time, outside any transaction it does not
+    begin itself, as psql does; CREATE INDEX CONCURRENTLY needs both."""
+    script = (MIGRATIONS_DIR / name).read_text()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # without parameters, as psql runs it, so % is not a placeholder
+        with conn.connection.dbapi_connection.cursor() as cursor:
+            for statement in statements(script):
+                cursor.execute(statement)
+
+
+def run_sql(engine: sqlalchemy.Engine, sql: str) -> None:
+    with engine.begin() as conn:
+        conn.exec_driver_sql(sql)
+
+
+def reset_to_baseline(engine: sqlalchemy.Engine) -> None:
+    """Replace the schema with the one databases had before the migrations"""
+    Base.metadata.drop_all(bind=engine)
+    run_sql(engine, "DROP TABLE IF EXISTS orphaned_listing_device_class_attributes")
+    run_sql(engine, BASELINE_SCHEMA.read_text())
+
+
+def migrate(engine: sqlalchemy.Engine, through: str) -> None:
+    """Run the migrations in order, up to and including the one called through"""
+    for path in MIGRATIONS:
+        run_migration(engine, path.name)
+        if path.name == through:
+            return
+    raise ValueError(f"No migration {through}")
+
+
+@pytest.mark.parametrize("path", MIGRATIONS, ids=lambda p: p.name)
+def test_migration_is_repeatable(db_engine_fixture: sqlalchemy.Engine, path: Path):
+    """Every migration runs cleanly again once applied"""
+    reset_to_baseline(db_engine_fixture)
+    migrate(db_engine_fixture, path.name)
+    run_migration(db_engine_fixture, path.name)
+
+
+def test_key_fingerprint(db_engine_fixture: sqlalchemy.Engine):
+    reset_to_baseline(db_engine_fixture)
+    migrate(db_engine_fixture, "0001_key_fingerprint.sql")
+
+    inspector = inspect(db_engine_fixture)
+    assert "fingerprint" in {c["name"] for c in inspector.get_columns("keys")}
+    assert any(
+        i["name"] == "ix_keys_fingerprint" and i["unique"]
+        for i in inspector.get_indexes("keys")
+    )
+
+
+LISTING_KEYS = (
+    "certificates_listing_id_fkey",
+    "listing_device_classes_listing_id_fkey",
+    "listing_device_class_attributes_listing_id_fkey",
+)
+
+
+def test_listing_cascades(db_engine_fixture: sqlalchemy.Engine):
+    """Deleting a listing deletes the rows that refer to it"""
+    reset_to_baseline(db_engine_fixture)
+    with db_engine_fixture.begin() as conn:
+        conn.execute(insert(EntityType), [{"name": "client", "description": ""}])
+        conn.execute(insert(DeviceClass), [{"name": "BESS", "description": ""}])
+        conn.execute(
+            insert(Listing),
+            {"entity_type_id": 1, "manufacturer": "Acme", "model": "X"},
+        )
+        conn.execute(
+            insert(ListingDeviceClass), {"listing_id": 1, "device_class_id": 1}
+        )
+        conn.execute(
+            insert(ListingDeviceClassAttribute),
+            {
+                "listing_id": 1,
+                "device_class_id": 1,
+                "attribute_name": "capacity",
+                "attribute_value": "5",
+            },
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO certificates"
+            " (listing_id, expiry, certification_date, certifying_body, test_profiles)"
+            " VALUES (1, '2030-01-01', '2025-01-01', 'CEC', '{A}')"
+        )
+
+    migrate(db_engine_fixture, "0002_listing_cascades.sql")
+
+    with db_engine_fixture.begin() as conn:
+        conn.execute(delete(Listing).where(Listing.id == 1))
+        for model in (Certificate, ListingDeviceClass, ListingDeviceClassAttribute):
+            assert conn.scalars(select(model.id)).all() == []
+        keys = conn.exec_driver_sql(
+            "SELECT conname, confdeltype, convalidated FROM pg_constraint"
+            " WHERE confrelid = 'listings'::regclass"
+            " ORDER BY conname"
+        )
+        assert [tuple(row) for row in keys] == [
+            (key, "c", True) for key in sorted(LISTING_KEYS)
+        ]
+
+
+def test_trigram_indexes(db_engine_fixture: sqlalchemy.Engine):
+    """Every ILIKE-filtered column gets the trigram index the models declare"""
+    reset_to_baseline(db_engine_fixture)
+    migrate(db_engine_fixture, "0003_trigram_indexes.sql")
+
+    declared = {
+        index.name
+        for table in Base.metadata.tables.values()
+        for index in table.indexes
+        if "gin_trgm_ops" in index.dialect_options["postgresql"]["ops"].values()
+    }
+    with db_engine_fixture.connect() as conn:
+        built = conn.exec_driver_sql(
+            "SELECT indexname FROM pg_indexes WHERE indexdef LIKE '%%gin_trgm_ops%%'"
+        )
+        assert set(built.scalars()) == declared
+    assert len(declared) == 8
+
+
+def test_foreign_key_indexes(db_engine_fixture: sqlalchemy.Engine):
+    reset_to_baseline(db_engine_fixture)
+    migrate(db_engine_fixture, "0004_foreign_key_indexes.sql")
+
+    inspector = inspect(db_engine_fixture)
+    indexes = {
+        index["name"]: index
+        for table in ("listings", "certificates", "listing_device_classes")
+        + ("listing_device_class_attributes",)
+        for index in inspector.get_indexes(table)
+    }
+    assert {
+        "ix_listings_entity_type_id",
+        "ix_certificates_listing_id",
+        "ix_listing_device_classes_device_class_id",
+        "ix_listing_device_class_attributes_device_class_id",
+        "ix_listings_active_id",
+    } <= set(indexes)
+    where = indexes["ix_listings_active_id"]["dialect_options"]["postgresql_where"]
+    assert "status" in where and "'active'" in where
+
+
+def test_registry_version(db_engine_fixture: sqlalchemy.Engine):
+    """The version row the ETags are read from is created once"""
+    reset_to_baseline(db_engine_fixture)
+    migrate(db_engine_fixture, "0006_registry_version.sql")
+    run_migration(db_engine_fixture, "0006_registry_version.sql")
+
+    with db_engine_fixture.connect() as conn:
+        rows = conn.execute(select(RegistryVersion.id, RegistryVersion.version)).all()
+    assert [tuple(row) for row in rows] == [(1, 1)]
+
+
+def function_definition(engine: sqlalchemy.Engine, name: str) -> str:
+    """The definition of a function, with whitespace normalised"""
+    with engine.connect() as conn:
+        definition = conn.exec_driver_sql(
+            f"SELECT pg_get_functiondef('{name}'::regproc)"
+        ).scalar_one()
+    return " ".join(definition.split())
+
+
+def test_change_log(db_engine_fixture: sqlalchemy.Engine):
+    """Registry writes are recorded and bump the version, by the models' function"""
+    reset_to_baseline(db_engine_fixture)
+    migrate(db_engine_fixture, "0007_change_log.sql")
+    migrated = function_definition(db_engine_fixture, "record_registry_changes")
+
+    with db_engine_fixture.begin() as conn:
+        conn.execute(insert(EntityType), [{"name": "client", "description": ""}])
+        conn.execute(update(EntityType).where(EntityType.id == 999).values(name="x"))
+        assert conn.scalar(select(RegistryVersion.version)) == 2
+        assert conn.execute(select(Change.table_name, Change.operation)).all() == [
+            ("entity_types", "insert")
+        ]
+
+    (ddl,) = [
+        listener.statement
+        for listener in Base.metadata.dispatch.before_create
+        if "FUNCTION record_registry_changes()" in getattr(listener, "statement", "")
+    ]
+    run_sql(db_engine_fixture, ddl)
+    assert function_definition(db_engine_fixture, "record_registry_changes") == migrated
+
+
+def test_typed_attribute_values(db_engine_fixture: sqlalchemy.Engine):
+    """Existing values are typed, and retyped when their definition changes"""
+    reset_to_baseline(db_engine_fixture)
+    with db_engine_fixture.begin() as conn:
+        conn.execute(insert(EntityType), [{"name": "client", "description": ""}])
+        conn.execute(insert(DeviceClass), [{"name": "BESS", "description": ""}])
+        conn.execute(
+            insert(DeviceClassAttribute),
+            [
+                {"device_class_id": 1, "attribute_name": name, "attribute_type": type_}
+                for name, type_ in (("capacity", "number"), ("grid_forming", "string"))
+            ],
+        )
+        conn.execute(
+            insert(Listing),
+            {"entity_type_id": 1, "manufacturer": "Acme", "model": "X"},
+        )
+        conn.execute(
+            insert(ListingDeviceClass), {"listing_id": 1, "device_class_id": 1}
+        )
+        conn.execute(
+            insert(ListingDeviceClassAttribute),
+            [
+                {
+                    "listing_id": 1,
+                    "device_class_id": 1,
+                    "attribute_name": name,
+                    "attribute_value": value,
+                }
+                for name, value in (("capacity", "5-10 kWh"), ("grid_forming", "Yes"))
+            ],
+        )
+
+    migrate(db_engine_fixture, "0008_typed_attribute_values.sql")
+
+    attribute = ListingDeviceClassAttribute
+    typed = select(
+        attribute.number_min,
+        attribute.number_max,
+        attribute.boolean_value,
+        attribute.text_value,
+    ).order_by(attribute.attribute_name)
+    with db_engine_fixture.begin() as conn:
+        assert [tuple(row) for row in conn.execute(typed)] == [
+            (5, 10, None, None),
+            (None, None, None, "yes"),
+        ]
+        conn.execute(
+            update(DeviceClassAttribute)
+            .where(DeviceClassAttribute.attribute_name == "grid_forming")
+            .values(attribute_type="boolean")
+        )
+        assert tuple(conn.execute(typed).all()[1]) == (None, None, True, None)
+
+    indexes = {
+        i["name"]
+        for i in inspect(db_engine_fixture).get_indexes(attribute.__tablename__)
+    }
+    assert {
+        f"ix_listing_device_class_attributes_{column}"
+        for column in ("number_min", "number_max", "boolean_value", "text_value")
+    } <= indexes
+
+
+def test_listing_search_documents(db_engine_fixture: sqlalchemy.Engine):
+    """Existing listings are indexed, and later writes keep their documents current"""
+    reset_to_baseline(db_engine_fixture)
+    with db_engine_fixture.begin() as conn:
+        conn.execute(insert(EntityType), [{"name": "client", "description": ""}])
+        conn.execute(insert(DeviceClass), [{"name": "inverter", "description": ""}])
+        conn.execute(
+            insert(Listing),
+            [
+                {"entity_type_id": 1, "manufacturer": "Acme", "model": model}
+                for model in ("PowerStore", "HomeCell")
+            ],
+        )
+        conn.execute(
+            insert(ListingDeviceClass), {"listing_id": 1, "device_class_id": 1}
+        )
+
+    migrate(db_engine_fixture, "0009_listing_search_documents.sql")
+
+    with Session(db_engine_fixture) as session:
+        assert [row.id for row in search_listings(session, "inverter")] == [1]
+        session.execute(update(Listing).where(Listing.id == 2).values(model="Inverter"))
+        assert [row.id for row in search_listings(session, "inverter")] == [2, 1]
+    assert "ix_listing_search_documents_document" in {
+        i["name"]
+        for i in inspect(db_engine_fixture).get_indexes("listing_search_documents")
+    }
+
+
+ATTRIBUTE_KEY = "listing_device_class_attributes_listing_id_device_class_id_fkey"
+
+
+def test_listing_attribute_device_class_key(db_engine_fixture: sqlalchemy.Engine):
+    """Values for device classes their listing lacks are set aside, then the key is
+    added and cascades from the device class link"""
+    reset_to_baseline(db_engine_fixture)
+    with db_engine_fixture.begin() as conn:
+        conn.execute(insert(EntityType), [{"name": "client", "description": ""}])
+        linked, unlinked = conn.scalars(
+            insert(DeviceClass).returning(DeviceClass.id),
+            [{"name": name, "description": ""} for name in ("linked", "unlinked")],
+        ).all()
+        listing_id = conn.scalar(
+            insert(Listing).returning(Listing.id),
+            {"entity_type_id": 1, "manufacturer": "Acme", "model": "Orphans"},
+        )
+        conn.execute(
+            insert(ListingDeviceClass),
+            {"listing_id": listing_id, "device_class_id": linked},
+        )
+        conn.execute(
+            insert(ListingDeviceClassAttribute),
+            [
+                {
+                    "listing_id": listing_id,
+                    "device_class_id": device_class_id,
+                    "attribute_name": "colour",
+                    "attribute_value": "red",
+                }
+                for device_class_id in (linked, unlinked)
+            ],
+        )
+
+    migrate(db_engine_fixture, "0010_listing_attribute_device_class_key.sql")
+
+    attribute = ListingDeviceClassAttribute
+    with db_engine_fixture.begin() as conn:
+        assert conn.scalars(select(attribute.device_class_id)).all() == [linked]
+        orphaned = conn.exec_driver_sql(
+            "SELECT device_class_id FROM orphaned_listing_device_class_attributes"
+        )
+        assert orphaned.scalars().all() == [unlinked]
+        assert conn.exec_driver_sql(
+            f"SELECT convalidated FROM pg_constraint WHERE conname = '{ATTRIBUTE_KEY}'"
+        ).scalar_one()
+
+        conn.execute(
+            delete(ListingDeviceClass).where(
+                ListingDeviceClass.listing_id == listing_id
+            )
+        )
+        assert conn.scalars(select(attribute.id)).all() == []
+
+
+SCHEMA_QUERIES = {
+    "columns": """
+        SELECT table_name, column_name, udt_name, is_nullable, column_default
+        FROM information_schema.columns WHERE table_schema = 'public'
+    """,
+    "indexes": "SELECT tablename, indexdef FROM pg_indexes WHERE schemaname = 'public'",
+    "constraints": """
+        SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+        FROM pg_constraint WHERE connamespace = 'public'::regnamespace
+    """,
+    "triggers": """
+        SELECT tgrelid::regclass::text, pg_get_triggerdef(oid)
+        FROM pg_trigger WHERE NOT tgisinternal
+    """,
+    "functions": """
+        SELECT p.proname, pg_get_functiondef(p.oid) FROM pg_proc p
+        WHERE p.pronamespace = 'public'::regnamespace AND NOT EXISTS (
+            SELECT 1 FROM pg_depend d WHERE d.objid = p.oid AND d.deptype = 'e'
+        )
+    """,
+}
+
+
+def schema(engine: sqlalchemy.Engine) -> dict[str, set[tuple]]:
+    """The tables, indexes, constraints, triggers and functions of the database, less
+    the table of orphaned attribute values a migration sets aside"""
+    with engine.connect() as conn:
+        return {
+            kind: {
+                tuple(" ".join(str(v).split()) for v in row)
+                for row in conn.exec_driver_sql(query)
+                if row[0] != "orphaned_listing_device_class_attributes"
+            }
+            for kind, query in SCHEMA_QUERIES.items()
+        }
+
+
+def recreate_schema(engine: sqlalchemy.Engine) -> None:
+    """Start from an empty schema, so nothing one side created survives into the
+    other"""
+    run_sql(engine, "DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+
+
+def test_migrations_reach_the_models(db_engine_fixture: sqlalchemy.Engine):
+    """A database created before the migrations ends up with the schema the models
+    create, once they have all run"""
+    recreate_schema(db_engine_fixture)
+    run_sql(db_engine_fixture, BASELINE_SCHEMA.read_text())
+    migrate(db_engine_fixture, MIGRATIONS[-1].name)
+    migrated = schema(db_engine_fixture)
+
+    recreate_schema(db_engine_fixture)
+    Base.metadata.create_all(bind=db_engine_fixture)
+    created = schema(db_engine_fixture)
+
+    for kind in SCHEMA_QUERIES:
+        assert migrated[kind] == created[kind], kind
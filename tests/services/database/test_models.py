@@ -4,16 +4,22 @@ from datetime import date
 from typing import Any, Callable
 
 import pytest
+from sqlalchemy import delete, func, select, text, update
 from sqlalchemy.orm import Session
 
 from open_cec_api.services.database.models import (
+    REGISTRY_TABLES,
+    REGISTRY_TRIGGERS,
     Certificate,
+    Change,
     DeviceClass,
     DeviceClassAttribute,
     EntityType,
+    Key,
     Listing,
     ListingDeviceClass,
     ListingDeviceClassAttribute,
+    RegistryVersion,
 )
 
 
@@ -111,6 +117,7 @@ def test_listing_device_class_attribute_creation(
     dummy_entity_type_factory: Callable[[Any], EntityType],
     dummy_device_class_factory: Callable[[Any], DeviceClass],
     dummy_listing_factory: Callable[[Any], Listing],
+    dummy_listing_device_class_factory: Callable[[Any], ListingDeviceClass],
     dummy_listing_device_class_attribute_factory: Callable[
         [Any], ListingDeviceClassAttribute
     ],
@@ -120,6 +127,10 @@ def test_listing_device_class_attribute_creation(
     d_et = dummy_entity_type_factory()  # type: ignore
     d_dc = dummy_device_class_factory()  # type: ignore
     d_l = dummy_listing_factory(entity_type_id=d_et.id)  # type: ignore
+    dummy_listing_device_class_factory(
+        listing_id=d_l.id,  # type: ignore
+        device_class_id=d_dc.id,  # type: ignore
+    )
     d_ldca = dummy_listing_device_class_attribute_factory(
         listing_id=d_l.id,  # type: ignore
         device_class_id=d_dc.id,  # type: ignore
@@ -263,6 +274,7 @@ def test_listing_listing_device_class_attribute_relationship(
     dummy_device_class_factory: Callable[[Any], DeviceClass],
     dummy_entity_type_factory: Callable[[Any], EntityType],
     dummy_listing_factory: Callable[[Any], Listing],
+    dummy_listing_device_class_factory: Callable[[Any], ListingDeviceClass],
     dummy_listing_device_class_attribute_factory: Callable[
         [Any], ListingDeviceClassAttribute
     ],
@@ -273,6 +285,10 @@ def test_listing_listing_device_class_attribute_relationship(
     d_et = dummy_entity_type_factory()  # type: ignore
     d_dc = dummy_device_class_factory()  # type: ignore
     d_l = dummy_listing_factory(entity_type_id=d_et.id)  # type: ignore
+    dummy_listing_device_class_factory(
+        listing_id=d_l.id,  # type: ignore
+        device_class_id=d_dc.id,  # type: ignore
+    )
 
     retr = db_session_fixture.query(Listing).filter_by(id=d_l.id).first()
     assert retr.listing_device_class_attributes == []  # type: ignore
@@ -428,3 +444,127 @@ def test_device_class_attribute_unique_constraint():
 def test_listing_device_class_attribute_unique_constraint():
     # TODO
     pass
+
+
+def registry_version(session: Session) -> int:
+    return session.scalar(
+        select(RegistryVersion.version).where(RegistryVersion.id == 1)
+    )
+
+
+def test_registry_version_starts_at_one(db_session_fixture: Session):
+    assert db_session_fixture.scalars(select(RegistryVersion.id)).all() == [1]
+    assert registry_version(db_session_fixture) >= 1
+
+
+def test_registry_writes_bump_version(
+    db_session_fixture: Session,
+    dummy_entity_type_factory: Callable[[Any], EntityType],
+    dummy_listing_factory: Callable[[Any], Listing],
+):
+    """Every insert, update and delete statement on a registry table is counted"""
+    before = registry_version(db_session_fixture)
+    d_et = dummy_entity_type_factory()
+    d_l = dummy_listing_factory(entity_type_id=d_et.id)
+    assert registry_version(db_session_fixture) == before + 2
+
+    db_session_fixture.execute(
+        update(Listing).where(Listing.id == d_l.id).values(model="changed")
+    )
+    assert registry_version(db_session_fixture) == before + 3
+
+    # the cascade to child tables fires their triggers as well
+    db_session_fixture.execute(delete(Listing).where(Listing.id == d_l.id))
+    assert registry_version(db_session_fixture) > before + 3
+
+
+def test_statements_writing_no_rows_do_not_bump_version(db_session_fixture: Session):
+    """An update or delete matching nothing, e.g. of a missing id, changes nothing"""
+    count_changes = select(func.count()).select_from(Change)
+    before = registry_version(db_session_fixture)
+    changes = db_session_fixture.scalar(count_changes)
+
+    db_session_fixture.execute(
+        update(Listing).where(Listing.id == 999).values(model="changed")
+    )
+    db_session_fixture.execute(delete(Listing).where(Listing.id == 999))
+
+    assert registry_version(db_session_fixture) == before
+    assert db_session_fixture.scalar(count_changes) == changes
+
+
+def test_registry_version_stamps_modified_at(db_session_fixture: Session):
+    db_session_fixture.execute(
+        update(RegistryVersion).values(modified_at=text("'2000-01-01'"))
+    )
+    db_session_fixture.add(EntityType(name="client", description="dummy client"))
+    db_session_fixture.flush()
+
+    modified_at = db_session_fixture.scalar(select(RegistryVersion.modified_at))
+    assert modified_at.year > 2000  # type: ignore[union-attr]
+
+
+def test_key_writes_do_not_bump_version(db_session_fixture: Session):
+    """Keys are not part of the registry served to clients"""
+    before = registry_version(db_session_fixture)
+    db_session_fixture.add(Key(value="hash", description="key"))
+    db_session_fixture.flush()
+    assert registry_version(db_session_fixture) == before
+
+
+@pytest.mark.parametrize("table", REGISTRY_TABLES, ids=lambda t: t.name)
+def test_registry_tables_have_change_triggers(db_session_fixture: Session, table):
+    triggers = db_session_fixture.scalars(
+        text(
+            "SELECT tgname FROM pg_trigger "
+            "WHERE tgrelid = CAST(:table AS regclass) "
+            "AND tgfoid = CAST('record_registry_changes' AS regproc) "
+            "ORDER BY tgname"
+        ),
+        {"table": table.name},
+    ).all()
+    assert triggers == sorted(REGISTRY_TRIGGERS)
+
+
+def recorded_changes(session: Session, after: int) -> list[tuple]:
+    return session.execute(
+        select(Change.table_name, Change.row_id, Change.operation, Change.data)
+        .where(Change.id > after)
+        .order_by(Change.id)
+    ).all()  # type: ignore[return-value]
+
+
+def test_registry_writes_are_recorded(
+    db_session_fixture: Session,
+    dummy_entity_type_factory: Callable[[Any], EntityType],
+    dummy_listing_factory: Callable[[Any], Listing],
+    dummy_certificate_factory: Callable[[Any], Certificate],
+):
+    """Inserts and updates record the row as written; deletes leave tombstones"""
+    start = db_session_fixture.scalar(select(func.coalesce(func.max(Change.id), 0)))
+    d_et = dummy_entity_type_factory()
+    d_l = dummy_listing_factory(entity_type_id=d_et.id)
+    d_c = dummy_certificate_factory(listing_id=d_l.id, test_profiles=["AS4777"])
+    db_session_fixture.execute(
+        update(EntityType).where(EntityType.id == d_et.id).values(name="renamed")
+    )
+    # cascades to the certificate, which gets a tombstone too
+    db_session_fixture.execute(delete(Listing).where(Listing.id == d_l.id))
+
+    changes = recorded_changes(db_session_fixture, start)
+    assert [c[:3] for c in changes] == [
+        ("entity_types", d_et.id, "insert"),
+        ("listings", d_l.id, "insert"),
+        ("certificates", d_c.id, "insert"),
+        ("entity_types", d_et.id, "update"),
+        ("listings", d_l.id, "delete"),
+        ("certificates", d_c.id, "delete"),
+    ]
+    assert changes[0].data == {
+        "id": d_et.id,
+        "name": "client",
+        "description": "dummy client",
+    }
+    assert changes[2].data["test_profiles"] == ["AS4777"]
+    assert changes[3].data["name"] == "renamed"
+    assert changes[4].data is None
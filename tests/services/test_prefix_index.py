@@ -0,0 +1,55 @@
+import open_cec_api.services.prefix_index as prefix_index
+from open_cec_api.services.prefix_index import PrefixIndex, normalize
+
+
+def test_normalize_ignores_case_accents_and_spacing():
+    assert normalize("  Énergie   SOLAIRE ") == "energie solaire"
+
+
+def test_complete_matches_the_start_of_any_word():
+    index = PrefixIndex(["Tesla Powerwall 2", "Enphase IQ Battery", "Powerplus"])
+
+    assert index.complete("pow", 10) == ["Powerplus", "Tesla Powerwall 2"]
+    assert index.complete("iq b", 10) == ["Enphase IQ Battery"]
+    assert index.complete("esla", 10) == []
+    assert index.complete("  ", 10) == []
+
+
+def test_complete_returns_distinct_values_up_to_limit():
+    index = PrefixIndex(["Sungrow SG", "Sungrow SH", "Sunpower"])
+
+    assert index.complete("s", 2) == ["Sungrow SG", "Sungrow SH"]
+    assert index.complete("s", 10) == ["Sungrow SG", "Sungrow SH", "Sunpower"]
+
+
+def test_values_are_reference_counted():
+    index = PrefixIndex(["Tesla", "Tesla"])
+    index.update(removed=["Tesla"])
+    assert index.complete("te", 10) == ["Tesla"]
+
+    index.update(removed=["Tesla", "unknown"])
+    assert index.complete("te", 10) == []
+    assert len(index) == 0
+
+
+def test_bulk_update_matches_incremental_update(monkeypatch):
+    added = [f"Model {i}" for i in range(10)]
+    incremental = PrefixIndex(["Old"])
+    incremental.update(added=added, removed=["Old"])
+
+    monkeypatch.setattr(prefix_index, "BULK_UPDATE_SIZE", 1)
+    rebuilt = PrefixIndex(["Old"])
+    rebuilt.update(added=added, removed=["Old"])
+
+    assert incremental._keys == rebuilt._keys
+    assert rebuilt.complete("mo", 3) == ["Model 0", "Model 1", "Model 2"]
+
+
+def test_bulk_update_merges_adds_and_removals_between_existing_keys():
+    values = [f"Brand {i} Model {i % 7}" for i in range(200)]
+    index = PrefixIndex(values)
+    added = [f"Brand {i} Model x" for i in range(50)] + ["brand 5 Model 5"]
+    index.update(added=added, removed=values[::3])
+
+    expected = PrefixIndex([v for v in values if v not in values[::3]] + added)
+    assert index._keys == expected._keys